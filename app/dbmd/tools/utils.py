@@ -2,11 +2,13 @@ __all__ = [
     "FinancialReportDB", "render_miner_index", "get_request_data", 
     "create_dbrequest", "render_pdf_file_miner",
     "render_direct_input_miner", "convert_empty_strings_to_none",
+    "render_report_page",
     "render_batch_index", "render_batch_uploader"
 ]
 
 import io
 import os
+import re
 import json
 from datetime import datetime
 
@@ -17,8 +19,13 @@ from dateutil.parser import parse
 from app import db
 from app.models import DBRequest
 from db import models, serializers
-from db.tools import get_records_reprs, get_companies_reprs
-from rparser.core import FinancialReport, PDFFileIO, FinancialStatement
+from db.tools import RecordSpecIndex
+from rparser.core import (
+    FinancialReport, PDFFileIO, FinancialStatement, Profiler, NULL_PROFILER,
+    get_executor
+)
+from rparser.cache import ParseCache
+from rparser.pagestore import PageStore
 
 from .forms import ReportUploaderForm, DirectInputForm, BatchUploaderForm
 
@@ -28,29 +35,22 @@ from .forms import ReportUploaderForm, DirectInputForm, BatchUploaderForm
 #-------------------------------------------------------------------------------
 
 class FinancialReportDB(FinancialReport):
-    def __init__(self, *args, session, **kwargs):
+    def __init__(self, *args, session, spec_index=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.session = session
+        self.spec_index = spec_index or RecordSpecIndex.get(session)
             
     def get_bls_spec(self):
-        return self._get_records_reprs("bls")
+        return self.spec_index.get_records_spec("bls")
     
     def get_ics_spec(self):
-        return self._get_records_reprs("ics")
+        return self.spec_index.get_records_spec("ics")
     
     def get_cfs_spec(self):
-        return self._get_records_reprs("cfs")
+        return self.spec_index.get_records_spec("cfs")
         
     def get_companies_spec(self):
-        return get_companies_reprs(self.session)
-
-    def _get_records_reprs(self, name):
-        return get_records_reprs(self.session, ftype=self._get_ftype(name))
-
-    def _get_ftype(self, name):
-        ftype = self.session.query(models.FinancialStatement).\
-                    filter_by(name=name).one()        
-        return ftype
+        return self.spec_index.companies_spec
 
 #-------------------------------------------------------------------------------
 # HELPER FUNCTIONS
@@ -65,27 +65,82 @@ def render_miner_index(pdf_file_form=None, direct_input_form=None):
 
 
 def render_pdf_file_miner(form, session):
-    file = convert_to_pdf_file(
-        filename=form.get_filename() or "temp.pdf", 
-        content=form.get_file()
-    )
-    report = FinancialReportDB(
-        io.TextIOWrapper(file), session=session,
-        timestamp=form.data["report_timestamp"] or None,
-        timerange=form.data["report_timerange"] or None
-    )
+    filename = form.get_filename() or "temp.pdf"
+    profiler = get_profiler()
+    with profiler.stage("load_specs"):
+        spec_index = get_spec_index(session)
+    cache = get_parse_cache()
+    executor = get_parser_executor()
+    if cache:
+        report = cache.load_report(
+            FinancialReportDB, save_uploaded_file(filename, form.get_file()),
+            spec_version=spec_index.version, session=session,
+            spec_index=spec_index, profiler=profiler, executor=executor,
+            timestamp=form.data["report_timestamp"] or None,
+            timerange=form.data["report_timerange"] or None
+        )
+    else:
+        with profiler.stage("read_pages"):
+            file = convert_to_pdf_file(
+                filename=filename, content=form.get_file()
+            )
+        report = FinancialReportDB(
+            io.TextIOWrapper(file), session=session, spec_index=spec_index,
+            profiler=profiler,
+            timestamp=form.data["report_timestamp"] or None,
+            timerange=form.data["report_timerange"] or None
+        )
+        try:
+            for name in report.statements:
+                getattr(report, "{}_pages".format(name))
+        except AttributeError: # e.g. missing model of classifier
+            pass
+        else:
+            report.extract_all(executor)
 
-    company = form.data["company"]
-    if not company and (report.company and "isin" in report.company):
-        company = get_company(report.company["isin"], session)
+    try:
+        company = form.data["company"]
+        if not company and (report.company and "isin" in report.company):
+            company = get_company(report.company["isin"], session)
+
+        rtypes = get_record_types(session)
+        companies = session.query(models.Company.id, models.Company.name).all()
+
+        # only pages of statements are rendered when the other pages can be
+        # loaded on request from the cache (see render_report_page)
+        html = render_template(
+            "admin/tools/pdf_file_miner.html", report=report, 
+            company=company, rtypes=rtypes, companies=companies,
+            stm_by_page=get_statements_by_pages(report),
+            sha256=getattr(report, "sha256", None)
+        )
+    finally:
+        if isinstance(report.pages, PageStore): # opened by the cache
+            report.pages.close()
+    if profiler is not NULL_PROFILER: # including stages of workers
+        current_app.logger.info(
+            "Profile of '%s':\n%s", filename, profiler.format()
+        )
+    return html
 
-    rtypes = get_record_types(session)
-    companies = session.query(models.Company.id, models.Company.name).all()
 
-    return render_template(
-        "admin/tools/pdf_file_miner.html", report=report, 
-        company=company, rtypes=rtypes, companies=companies
-    )
+def render_report_page(sha256, page):
+    '''Render rows of the page of the report from the cache.'''
+    cache = get_parse_cache()
+    if not cache or not re.match(r"^[0-9a-f]{64}$", sha256):
+        return None
+    pages = cache.get_pages(sha256)
+    if pages is None:
+        return None
+    with pages:
+        if not 0 <= page < len(pages):
+            return None
+        first_row = pages.get_first_row(page)
+        rows = [
+            (first_row + page_row, page, page_row, content)
+            for page_row, content in enumerate(pages[page].split("\n"))
+        ]
+    return render_template("admin/tools/report_page.html", rows=rows)
 
 
 def render_direct_input_miner(form, session):
@@ -113,25 +168,60 @@ def render_direct_input_miner(form, session):
     )
 
 
+def get_statements_by_pages(report):
+    '''Return dict of pages of statements and names of statements.'''
+    stm_by_page = dict()
+    for name in ("cfs", "bls", "ics"): # ics is the first one on the page
+        try:
+            pages = getattr(report, "{}_pages".format(name))
+        except AttributeError: # e.g. missing model of classifier
+            continue
+        stm_by_page.update((page, name) for page in pages)
+    return stm_by_page
+
+
 def get_records_spec(session, spec_name=None):
-    spec = list()
-    ftype_query = session.query(models.FinancialStatement)
-    if spec_name in ("bls", None):
-        ftype = ftype_query.filter_by(name="bls").one()    
-        spec.extend(get_records_reprs(session, ftype))
-    if spec_name in ("ics", None):
-        ftype = ftype_query.filter_by(name="ics").one() 
-        spec.extend(get_records_reprs(session, ftype))
-    if spec_name in ("cfs", None):
-        ftype = ftype_query.filter_by(name="cfs").one()  
-        spec.extend(get_records_reprs(session, ftype))
-    return spec
+    return get_spec_index(session).get_records_spec(spec_name)
 
 
-def convert_to_pdf_file(filename, content):
+def get_spec_index(session):
+    return RecordSpecIndex.get(
+        session, cache_dir=current_app.config.get("SPEC_INDEX_FOLDER")
+    )
+
+
+def get_profiler():
+    if not current_app.config.get("PROFILE_PARSER"):
+        return NULL_PROFILER
+    return Profiler(
+        trace_memory=current_app.config.get("PROFILE_PARSER_MEMORY", False)
+    )
+
+
+def get_parser_executor():
+    workers = current_app.config.get("PARSER_WORKERS")
+    if not workers:
+        return None
+    return get_executor(workers)
+
+
+def get_parse_cache():
+    directory = current_app.config.get("PARSE_CACHE_FOLDER")
+    if not directory:
+        return None
+    return ParseCache(
+        directory, max_size=current_app.config.get("PARSE_CACHE_SIZE", 2**28)
+    )
+
+
+def save_uploaded_file(filename, content):
     path = os.path.join(current_app.config.get("UPLOAD_FOLDER"), filename)
-    content.save(path)     
-    return PDFFileIO(path)
+    content.save(path)
+    return path
+
+
+def convert_to_pdf_file(filename, content):
+    return PDFFileIO(save_uploaded_file(filename, content))
         
         
 def get_company(isin, session):
@@ -1,4 +1,4 @@
-from flask import url_for, redirect, flash, render_template
+from flask import url_for, redirect, flash, render_template, abort
 from flask_login import current_user, login_required
 
 from app.dbmd.tools import dbmd_tools
@@ -26,6 +26,16 @@ def pdf_file_miner():
     return render_miner_index(pdf_file_form=form)
 
 
+@dbmd_tools.route("/miner/pages/<sha256>/<int:page>", methods=("GET",))
+@login_required
+@permission_required(Permission.CREATE_REQUESTS)
+def report_page(sha256, page):
+    html = render_report_page(sha256, page)
+    if html is None:
+        abort(404)
+    return html
+
+
 @dbmd_tools.route("/miner/direct_input", methods=("POST",))
 @login_required
 @permission_required(Permission.CREATE_REQUESTS)
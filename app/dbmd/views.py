@@ -440,7 +440,7 @@ class DBRequestView(PermissionRequiredMixin, sqla.ModelView):
         successes_counter = 0
         requests_counter = 0
 
-        new_records = list()
+        models.Record.track_changes(db.session)
         for request_id in ids:
             request = db.session.query(DBRequest).get(request_id)
             if request:
@@ -448,15 +448,13 @@ class DBRequestView(PermissionRequiredMixin, sqla.ModelView):
                 result = request.execute(current_user, records_factory)
                 requests_counter += self._count_requests(result)
                 successes_counter += self._count_successful_requests(result)
-                new_records.extend(self._extract_records(result))
 
-        new_records = [ record for record in new_records if record.id is not None ]
-
-        synthetic_records = list()
-        if len(new_records) > 0:
-            synthetic_records = models.Record.create_synthetic_records(
-                db.session, new_records
-            )
+        # recompute synthetic records affected by created, updated and 
+        # deleted records
+        db.session.flush()
+        created, updated, deleted = models.Record.update_synthetic_records(
+            db.session
+        )
         db.session.commit()
 
         msg = "%d of %d requests have been successfuly executed."
@@ -464,9 +462,10 @@ class DBRequestView(PermissionRequiredMixin, sqla.ModelView):
             msg += " The errors can be view in details of the requests."
         flash(msg % (successes_counter, requests_counter))
         
-        if len(synthetic_records) > 0:
-            msg = "%d synthetic records have been created."
-            flash(msg % len(synthetic_records))
+        if created or updated or deleted:
+            msg = "%d synthetic records have been created, %d updated and " \
+                  "%d deleted."
+            flash(msg % (created, updated, deleted))
 
     def _count_requests(self, result):
         counter = sum(
@@ -482,14 +481,6 @@ class DBRequestView(PermissionRequiredMixin, sqla.ModelView):
         ) + (0 if result["errors"] else 1)
         return counter
 
-    def _extract_records(self, result):
-        records = list()
-        if isinstance(result["instance"], models.Record):
-            records.append(result["instance"])
-        for subrequest in result["subrequests"]:
-            records.extend(self._extract_records(subrequest))
-        return records
-
     def get_query(self):
         # Return only main requests, ommit subrequests
         return self.session.query(self.model)\
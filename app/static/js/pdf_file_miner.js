@@ -44,6 +44,14 @@ $(document).ready(function() {
         }
     );
 
+    // Pages without statements are loaded on request
+    $(document).on("click", ".page-loader-btn", function() {
+        var $loader = $(this).closest("tr");
+        $.get($loader.data("url"), function(rows) {
+            $loader.replaceWith(rows);
+        });
+    });
+
     $(document).on("click", ".btn-to-row", function() {
         var recordType = $(this).closest("tr").attr("data-record-rtype");
         focusOnRow("*[data-row-name='" + recordType + "']");
@@ -101,7 +109,7 @@ $(document).ready(function() {
     });
 
 
-    $(".selector > input").change(function() {
+    $(document).on("change", ".selector > input", function() {
         refreshReportUI();
     });
 
@@ -0,0 +1,51 @@
+'''
+Benchmark of splitting text into columns (rparser.utils.split_text_into_columns)
+on wide, multi-period cash flow statements (FinancialStatement.identify_names)
+and on the whole statement.
+'''
+import random
+
+from rparser.specs.records import finrecords
+from rparser import utils
+
+from benchmarks.common import bench
+
+
+def sample_cfs(periods=8, rows=60, seed=0):
+    '''Return layout text of cash flow statement with many periods.'''
+    rnd = random.Random(seed)
+    labels = [
+        item["value"] for record in finrecords
+                      if record["statement"] == "cfs"
+                      for item in record.get("repr", ())
+    ]
+    years = range(2016, 2016 - periods, -1)
+    lines = [
+        "{:<55}{}".format("", "".join(
+            "{:>24}".format("01.01-31.12.{}".format(year)) for year in years
+        )),
+        "{:<55}{}".format("Nota", "".join(
+            "{:>24}".format("31.12.{}".format(year)) for year in years
+        ))
+    ]
+    for label in (rnd.choice(labels) for _ in range(rows)):
+        lines.append("{:<55}{}".format(label[:53], "".join(
+            "{:>24}".format(
+                "{:,}".format(rnd.randint(-10**7, 10**8)).replace(",", " ")
+            ) for _ in years
+        )))
+    return "\n".join(lines)
+
+
+def main():
+    for periods in (2, 8, 16):
+        text = sample_cfs(periods)
+        header = "\n".join(text.split("\n")[:12])
+        bench("split_text_into_columns ({} periods, names)".format(periods),
+              lambda: utils.split_text_into_columns(header), number=50)
+        bench("split_text_into_columns ({} periods, table)".format(periods),
+              lambda: utils.split_text_into_columns(text), number=50)
+
+
+if __name__ == "__main__":
+    main()
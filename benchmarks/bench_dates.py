@@ -0,0 +1,25 @@
+'''
+Benchmark of dates & timeranges recognition (rparser.utils) on 100-page 
+report: the whole document (FinancialReport.recognize_timestamp) and single
+rows (FinancialStatement.identify_names).
+'''
+from rparser import utils
+
+from benchmarks.common import load_report, bench
+
+
+def main():
+    text = utils.remove_non_ascii(load_report())
+    rows = text.replace("\x0c", "\n").split("\n")
+    print("Report: {} pages, {} rows".format(text.count("\x0c") + 1, len(rows)))
+
+    bench("find_dates (document, days 28-31)", 
+          lambda: utils.find_dates(text, re_days=r"(28|29|30|31)"))
+    bench("find_dates (row by row)", 
+          lambda: [utils.find_dates(row) for row in rows])
+    bench("determine_timerange (row by row)",
+          lambda: [utils.determine_timerange(row) for row in rows])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+'''
+Benchmark of tokenisation (rparser.nlp.find_ngrams) on full pages of 100-page
+report: unigrams & bigrams of pages (SelfSearchingPage) and labels of rows
+(RecordsCollector.identify_records). Cold runs clear the caches of tokens
+classification and n-grams before every run.
+'''
+from rparser import nlp
+
+from benchmarks.common import load_report, bench
+
+
+def clear_caches():
+    nlp.is_noise_token.cache_clear()
+    nlp.intern_ngram.cache_clear()
+
+
+def cold(func):
+    def wrapper():
+        clear_caches()
+        return func()
+    return wrapper
+
+
+def main():
+    pages = load_report().split("\x0c")
+    rows = [ row for page in pages for row in page.split("\n") ]
+    print("Report: {} pages, {} rows".format(len(pages), len(rows)))
+
+    bigrams = lambda: [ nlp.find_ngrams(page, n=2) for page in pages ]
+    unigrams = lambda: [ nlp.find_ngrams(page, n=1) for page in pages ]
+    labels = lambda: [ 
+        nlp.find_ngrams(row, n=1, min_len=2, remove_non_alphabetic=True) 
+        for row in rows
+    ]
+
+    bench("find_ngrams (pages, n=2, cold)", cold(bigrams))
+    bench("find_ngrams (pages, n=2)", bigrams)
+    bench("find_ngrams (pages, n=1)", unigrams)
+    bench("find_ngrams (rows, labels)", labels)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+'''
+Benchmark of the parser on synthetic reports (rparser.generator): time of
+FinancialStatement on generated statements and of FinancialReport on whole
+reports together with accuracy against the ground truth. Results can be
+saved as JSON to compare runs, e.g.:
+
+    python -m benchmarks.bench_parser [reports] [results.json]
+
+Pages are classified by the models of FinancialReport (in one batch for all
+reports) when they can be loaded, otherwise the pages of statements are taken
+from the ground truth.
+'''
+import datetime
+import random
+import time
+import json
+import sys
+
+from rparser.core import FinancialReport, FinancialStatement, classify_pages
+from rparser.generator import (
+    generate_report, create_records_spec, score_statement
+)
+
+
+STATEMENTS = ("bls", "ics", "cfs")
+
+REPORTS_TYPES = (
+    (datetime.date(2016, 12, 31), 12), (datetime.date(2016, 6, 30), 6),
+    (datetime.date(2016, 9, 30), 3), (datetime.date(2017, 3, 31), 3)
+)
+
+
+def generate_reports(count, pages=10, seed=0):
+    '''Return reports generated with random options of statements.'''
+    rnd = random.Random(seed)
+    reports = list()
+    for index in range(count):
+        timestamp, timerange = rnd.choice(REPORTS_TYPES)
+        reports.append(generate_report(
+            pages=pages, timestamp=timestamp, timerange=timerange,
+            seed=seed + index, rows=rnd.randint(20, 50),
+            periods=rnd.choice((2, 2, 3, 4)), note_column=rnd.random() < 0.7,
+            uom=rnd.choice((1, 1000, 1000, 1000000)),
+            split_labels=rnd.choice((0, 0.1, 0.3))
+        ))
+    return reports
+
+
+def mean(values):
+    values = list(values)
+    return sum(values) / (len(values) or 1)
+
+
+def summarize(scores):
+    return {
+        key: round(mean(float(score[key]) for score in scores), 4)
+        for key in scores[0]
+    }
+
+
+def models_available():
+    try:
+        return all(
+            getattr(FinancialReport, "{}_pages".format(name)).model
+            for name in STATEMENTS
+        )
+    except Exception: # e.g. models pickled with other version of sklearn
+        return False
+
+
+def bench_statements(reports, spec):
+    scores = list()
+    start = time.perf_counter()
+    for report in reports:
+        for name, truth in report.statements.items():
+            statement = FinancialStatement(
+                truth.text, spec[name], timerange=report.timerange,
+                timestamp=report.timestamp
+            )
+            scores.append(score_statement(statement, truth))
+    elapsed = time.perf_counter() - start
+    return {
+        "statements": len(scores), "time": round(elapsed, 4),
+        "statements_per_second": round(len(scores) / elapsed, 2),
+        "accuracy": summarize(scores)
+    }
+
+
+def bench_reports(reports, spec, classify):
+    scores, pages, recognized = list(), list(), list()
+    start = time.perf_counter()
+    parsed = [ FinancialReport(truth.text, records_spec=spec)
+               for truth in reports ]
+    if classify: # one prediction of every model for all reports
+        classify_pages(parsed)
+    for truth, report in zip(reports, parsed):
+        recognized.append({
+            "timestamp": report.timestamp == truth.timestamp,
+            "timerange": report.timerange == truth.timerange
+        })
+        for name in STATEMENTS:
+            storage_name = "{}_pages".format(name)
+            if classify:
+                pages.append(
+                    getattr(report, storage_name) ==
+                    truth.statements_pages[name]
+                )
+            else:
+                report.__dict__[storage_name] = truth.statements_pages[name]
+            scores.append(score_statement(
+                getattr(report, name), truth.statements[name]
+            ))
+    elapsed = time.perf_counter() - start
+    number_of_pages = sum(len(report.pages) for report in reports)
+    results = {
+        "reports": len(reports), "pages": number_of_pages,
+        "classified": classify, "time": round(elapsed, 4),
+        "pages_per_second": round(number_of_pages / elapsed, 2),
+        "accuracy": dict(summarize(scores), **summarize(recognized))
+    }
+    if classify:
+        results["accuracy"]["pages"] = round(mean(pages), 4)
+    return results
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    count = int(argv[0]) if argv else 200
+    reports = generate_reports(count)
+    spec = create_records_spec()
+
+    results = {
+        "FinancialStatement": bench_statements(reports, spec),
+        "FinancialReport": bench_reports(reports, spec, models_available())
+    }
+    for name, result in results.items():
+        print(name)
+        for key, value in sorted(result.items()):
+            print("    {:<24} {}".format(key, value))
+
+    if len(argv) > 1:
+        with open(argv[1], "w") as file:
+            json.dump(results, file, indent=4, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+'''
+Benchmark of creating synthetic records (rparser.synthetic) with the stack
+based evaluator against the former recursive one, on formulas of records
+(rparser.specs.formulas) expanded with timeframes and on long chains of
+formulas. Both evaluators must create the same records. Computing values of
+many entities (companies and fiscal years) with FormulasArray is compared 
+with the same fixed point computed entity by entity in Python; both must 
+compute the same cells.
+'''
+from collections import UserDict, deque
+import itertools
+import random
+import sys
+
+import numpy as np
+
+from rparser.specs.records import finrecords
+from rparser.specs import formulas as fspec
+from rparser import synthetic
+from rparser.utils import concatenate_lists
+
+from benchmarks.common import bench
+
+
+class DictRecordsDataset(synthetic.RecordsDataset, UserDict):
+
+    def get_value(self, item):
+        return self[item][0]
+
+    def exists(self, item):
+        return item in self
+
+    def is_synthetic(self, item):
+        return self[item][1]
+
+    def insert(self, items, synthetic=None):
+        for item in items:
+            self.data[item.spec] = (
+                item.value, getattr(item, "synthetic", synthetic)
+            )
+
+
+def create_synthetic_records_recursive(spec, dataset, formulas, exclude=None):
+    '''Former recursive implementation of create_synthetic_records.'''
+    exclude = set() if exclude is None else set(exclude)
+    if spec in exclude: return list()
+
+    record_formulas = formulas.get(spec, None)
+    if not record_formulas: return list()
+
+    calculable_formulas = [
+        formula for formula in record_formulas
+        if formula.is_calculable(dataset) \
+           and (not dataset.exists(formula.spec)
+                or dataset.is_synthetic(formula.spec)) \
+           and not formula.spec in exclude
+    ]
+
+    if len(calculable_formulas) == 0: return list()
+
+    synthetic_records = [
+        synthetic.Record(
+            spec=formula.spec, value=formula.calculate(dataset),
+            synthetic=False
+        )
+        for formula in calculable_formulas
+    ]
+
+    exclude.update(
+        item.spec for formula in calculable_formulas for item in formula.rhs
+    )
+    exclude.add(spec)
+    dataset.insert(synthetic_records)
+
+    synthetic_records_2nd = concatenate_lists(
+        create_synthetic_records_recursive(
+            record.spec, dataset, formulas, exclude
+        )
+        for record in synthetic_records
+    )
+
+    synthetic_records.extend(synthetic_records_2nd)
+    return synthetic_records
+
+
+def entity_formulas():
+    '''Return inverted mapping of formulas of records with timeframes.'''
+    formulas = list()
+    for lhs, rhs in fspec.entity_formulas:
+        formula = synthetic.Formula(lhs)
+        for spec, sign in rhs:
+            formula.add_component(synthetic.FormulaComponent(spec, sign))
+        formulas.append(formula)
+    specs = [ record["name"] for record in finrecords
+                             if record.get("timeframe") == "pot" ]
+    return synthetic.create_inverted_mapping(
+        synthetic.create_pot_formulas(formulas, specs)
+    )
+
+
+def chain_formulas(length):
+    '''Return inverted mapping of formulas R[i] = R[i-1] + C.'''
+    formulas = list()
+    for index in range(1, length):
+        formula = synthetic.Formula(index)
+        formula.add_component(synthetic.FormulaComponent(index - 1, 1))
+        formula.add_component(synthetic.FormulaComponent("C", 1))
+        formulas.append(formula)
+    return synthetic.create_inverted_mapping(formulas)
+
+
+def sample_records(formulas, fraction=0.3, seed=0):
+    '''Return genuine records for fraction of specs in formulas.'''
+    rnd = random.Random(seed)
+    specs = sorted(
+        set(formulas) | set(
+            formula.spec for items in formulas.values() for formula in items
+        ), key=repr
+    )
+    return {
+        spec: (float(rnd.randint(1, 10**6)), False)
+        for spec in specs if rnd.random() < fraction
+    }
+
+
+def run(func, formulas, records):
+    dataset = DictRecordsDataset(dict(records))
+    return [
+        func(spec, dataset, formulas) for spec in sorted(records, key=repr)
+    ]
+
+
+def compare(name, formulas, records, number=5):
+    assert run(synthetic.create_synthetic_records, formulas, records) == \
+           run(create_synthetic_records_recursive, formulas, records)
+    bench("{} (recursive)".format(name),
+          lambda: run(create_synthetic_records_recursive, formulas, records),
+          number=number)
+    bench("{} (stack)".format(name),
+          lambda: run(synthetic.create_synthetic_records, formulas, records),
+          number=number)
+
+
+def compute_entity(formulas, dependants, values):
+    '''
+    Compute missing values of one entity (dict spec -> value) with the queue
+    of formulas (target, components, signs) like FormulasArray.compute, 
+    value by value.
+    '''
+    queue = deque(range(len(formulas)))
+    queued = set(queue)
+    while queue:
+        index = queue.popleft()
+        queued.discard(index)
+        target, components, signs = formulas[index]
+        if target in values or \
+           not all(spec in values for spec in components):
+            continue
+        values[target] = sum(
+            sign * values[spec] for spec, sign in zip(components, signs)
+        )
+        for dependant in dependants.get(target, ()):
+            if dependant not in queued:
+                queued.add(dependant)
+                queue.append(dependant)
+    return values
+
+
+def compare_entities(formulas, entities, fraction=0.3):
+    records = [ sample_records(formulas, fraction, seed=seed)
+                for seed in range(entities) ]
+    array = synthetic.FormulasArray(itertools.chain.from_iterable(
+        items for items in formulas.values()
+    ))
+
+    # formulas of the array (in the same order) with specs instead of columns
+    specs = list(array.columns)
+    entity_formulas, dependants = list(), dict()
+    for index, (target, components, signs) in enumerate(array.formulas):
+        components = [ specs[column] for column in components ]
+        entity_formulas.append((specs[target], components, signs.tolist()))
+        for spec in set(components):
+            dependants.setdefault(spec, list()).append(index)
+
+    def by_entities():
+        return [
+            compute_entity(entity_formulas, dependants, { 
+                spec: value for spec, (value, _) in items.items() 
+            }) for items in records
+        ]
+
+    def by_array():
+        values = array.create_array(entities)
+        for row, items in enumerate(records):
+            for spec, (value, _) in items.items():
+                values[row, array.columns[spec]] = value
+        array.compute(values)
+        return values
+
+    expected = array.create_array(entities)
+    for row, values in enumerate(by_entities()):
+        for spec, value in values.items():
+            expected[row, array.columns[spec]] = value
+    actual = by_array()
+    # the same cells are computed, values differ only when formulas of the
+    # cell are not consistent for sampled records (the first formula wins)
+    np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected))
+    computed = ~np.isnan(expected)
+    print("{} entities: {} of {} computed values differ".format(
+        entities, np.sum(~np.isclose(actual, expected)[computed]), 
+        np.sum(computed)
+    ))
+
+    name = "{} entities".format(entities)
+    bench("{} (entity by entity)".format(name), by_entities, 
+          number=1, repeat=1)
+    bench("{} (FormulasArray)".format(name), by_array, number=1, repeat=1)
+
+
+def main():
+    formulas = entity_formulas()
+    for seed in range(3):
+        compare("entity formulas (seed {})".format(seed), formulas,
+                sample_records(formulas, seed=seed))
+
+    for entities in (100, 1000):
+        compare_entities(formulas, entities)
+
+    sys.setrecursionlimit(10000) # the recursive version needs deep stack
+    for length in (500, 2000):
+        formulas = chain_formulas(length)
+        compare("chain of {} formulas".format(length), formulas,
+                { 0: (1.0, False), "C": (1.0, False) }, number=1)
+
+    formulas = chain_formulas(100000)
+    bench("chain of 100000 formulas (stack)", lambda: run(
+        synthetic.create_synthetic_records, formulas,
+        { 0: (1.0, False), "C": (1.0, False) }
+    ), number=1, repeat=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+'''
+Helpers shared by the benchmarks. Benchmarks are plain scripts, run them from
+the root of the repository, e.g.:
+
+    python -m benchmarks.bench_dates [report.pdf|report.txt]
+'''
+import itertools
+import random
+import timeit
+import sys
+
+from rparser.specs.records import finrecords
+from rparser import utils
+
+
+SAMPLE_HEADER = (
+    "                 SKONSOLIDOWANE SPRAWOZDANIE Z SYTUACJI FINANSOWEJ\n"
+    "                 na dzień 30 września 2016 roku (w tys. PLN)\n"
+    "\n"
+    "                                      Nota   za III kwartały 2016"
+    "   01.01.2015 - 31.12.2015\n"
+    "                                             30.09.2016          "
+    "   31.12.2015\n"
+)
+
+
+def sample_page(statement="bls", rows=40, seed=0):
+    '''Return layout text of a page resembling financial statement.'''
+    rnd = random.Random(seed)
+    labels = [
+        item["value"] for record in finrecords 
+                      if record["statement"] == statement
+                      for item in record.get("repr", ())
+    ]
+    lines = [SAMPLE_HEADER]
+    for label in rnd.sample(labels, min(rows, len(labels))):
+        numbers = ("{:,}".format(rnd.randint(-10**6, 10**7)).replace(",", " ")
+                   for _ in range(2))
+        lines.append("{:<50}{:>5}{:>16}{:>16}".format(
+            label[:48], rnd.choice(["", "", "12", "4.1"]), *numbers
+        ))
+    return "\n".join(lines)
+
+
+def sample_report(pages=100, seed=0):
+    '''Return text of a report (pages separated by form feed).'''
+    statements = itertools.cycle(("bls", "ics", "cfs"))
+    return "\x0c".join(
+        sample_page(next(statements), seed=seed+page) for page in range(pages)
+    )
+
+
+def load_report(argv=None, pages=100):
+    '''Load report given in command line (pdf or txt) or create sample one.'''
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        return sample_report(pages)
+    path = argv[0]
+    if path.endswith(".pdf"):
+        output, _ = utils.read_pdf(path)
+        return output.decode("utf-8")
+    with open(path, encoding="utf-8") as file:
+        return file.read()
+
+
+def bench(name, func, number=5, repeat=3):
+    '''Run func and print the best time of a single call.'''
+    best = min(timeit.repeat(func, number=number, repeat=repeat)) / number
+    print("{:<50} {:>10.2f} ms".format(name, best * 1000))
+    return best
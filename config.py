@@ -32,6 +32,12 @@ class DevelopmentConfig(Config):
 		#or 'sqlite:///' + os.path.join(basedir, 'data-dev.sqlite')
 	)
 	UPLOAD_FOLDER = os.path.join(basedir, "uploads_dev")
+	SPEC_INDEX_FOLDER = os.path.join(basedir, "cache_dev")
+	PARSE_CACHE_FOLDER = os.path.join(basedir, "cache_dev", "reports")
+	PARSE_CACHE_SIZE = 2**28 # bytes
+	PROFILE_PARSER = True # log times of parsing stages in the miner
+	PROFILE_PARSER_MEMORY = False # and peaks of memory (slow)
+	PARSER_WORKERS = 3 # processes creating statements of uploaded reports
 	DEBUG_TB_PROFILER_ENABLED = True
 
 
@@ -1,6 +1,10 @@
-from collections import UserDict, namedtuple
+from collections import UserDict, OrderedDict, namedtuple
 from datetime import date, timedelta
 import itertools
+import math
+
+from sqlalchemy import func
+import numpy as np
 
 from rparser import synthetic
 from db import utils
@@ -45,11 +49,13 @@ class DictRecordsDataset(synthetic.RecordsDataset, UserDict):
         return dataset
 
 
-def convert_db_formula(db_formula):
-    formula = synthetic.Formula(spec=db_formula.rtype)
+def convert_db_formula(db_formula, by_id=False):
+    formula = synthetic.Formula(
+        spec=db_formula.rtype_id if by_id else db_formula.rtype
+    )
     for item in db_formula.rhs:
         formula.add_component(synthetic.FormulaComponent(
-            spec=item.rtype, sign=item.sign
+            spec=item.rtype_id if by_id else item.rtype, sign=item.sign
         ))
     return formula
 
@@ -58,17 +64,20 @@ def convert_db_formulas(db_formulas):
     return [ convert_db_formula(formula) for formula in db_formulas ]
 
 
-def convert_db_record(db_record, fiscal_year=None):
+def convert_db_record(db_record, fiscal_year=None, by_id=False):
     timeframe = synthetic.Timeframe(*db_record.project_onto_fiscal_year(fiscal_year))
-    spec = synthetic.TimeframeSpec(spec=db_record.rtype, timeframe=timeframe)
+    spec = synthetic.TimeframeSpec(
+        spec=db_record.rtype_id if by_id else db_record.rtype, 
+        timeframe=timeframe
+    )
     record = synthetic.Record(
         spec=spec, value=db_record.value, synthetic=db_record.synthetic
     )
     return record
 
 
-def convert_db_records(records):
-    return [ convert_db_record(record) for record in records ]
+def convert_db_records(records, by_id=False):
+    return [ convert_db_record(record, by_id=by_id) for record in records ]
     
 ################################################################################
 
@@ -124,31 +133,421 @@ def project_timeframe_onto_fiscal_year(timeframe, fiscal_year):
 # CREATE SYNTHETIC RECORDS
 ################################################################################
 
-def create_synthetic_records(base_records, db_records, db_formulas):
-    dataset = DictRecordsDataset.create_from_db_records(db_records)
-    records_spec = set(
-        record.rtype for record in itertools.chain(base_records, db_records)
-                     if record.rtype.timeframe == models.RecordType.POT
-    )
+class FormulaPlan:
+    '''
+    Formulas for synthetic records compiled once: every formula expanded with
+    its transformations and timeframes (for PIT and POT records), timeframe
+    formulas of POT records and inverted mappings of selected formulas. 
+    Types of records are identified by ids, so the plan can be shared by 
+    sessions. The plan is identified by the version of tables with formulas
+    and cached in-process. Flushing formulas edited in the process (e.g.
+    through the API) clears the cache, edits made by other processes change
+    the version.
+    '''
+    model_names = ("RecordFormula", "FormulaComponent")
+    max_mappings = 1024 # limit of cached inverted mappings
 
-    formulas = convert_db_formulas(db_formulas)
-    formulas = {
-        models.RecordType.POT: synthetic.create_inverted_mapping(
-            synthetic.create_pot_formulas(formulas, records_spec)
-        ),
-        models.RecordType.PIT: synthetic.create_inverted_mapping(
-            synthetic.create_pit_formulas(formulas)
+    _cache = dict() # (db url, version) -> plan
+
+    def __init__(self, db_formulas, version=None):
+        self.version = version
+        formulas = { 
+            formula.id: [convert_db_formula(formula, by_id=True)] 
+            for formula in db_formulas
+        }
+        self.formulas = {
+            models.RecordType.POT: {
+                formula_id: synthetic.create_pot_formulas(items, specs=())
+                for formula_id, items in formulas.items()
+            },
+            models.RecordType.PIT: {
+                formula_id: synthetic.create_pit_formulas(items)
+                for formula_id, items in formulas.items()
+            }
+        }
+        self.timeframe_formulas = dict() # rtype id -> formulas
+        self.mappings = dict() # (timeframe, formulas, specs) -> mapping
+        self.arrays = dict() # specs -> FormulasArray
+
+    def get_timeframe_formulas(self, spec):
+        formulas = self.timeframe_formulas.get(spec, None)
+        if formulas is None:
+            formulas = self.timeframe_formulas[spec] = [
+                synthetic.Formula.create_timeframe_formula(spec, item)
+                for item in synthetic.fspec.timeframe_formulas
+            ]
+        return formulas
+
+    def get_mapping(self, timeframe, formulas, specs=()):
+        '''
+        Return inverted mapping of expanded formulas (ids) together with
+        timeframe formulas of specs (ids of POT records).
+        '''
+        if timeframe != models.RecordType.POT:
+            specs = ()
+        key = (timeframe, frozenset(formulas), frozenset(specs))
+        mapping = self.mappings.get(key, None)
+        if mapping is None:
+            expanded = list(itertools.chain.from_iterable(
+                self.formulas[timeframe][formula_id] 
+                for formula_id in key[1]
+            ))
+            expanded.extend(itertools.chain.from_iterable(
+                self.get_timeframe_formulas(spec) for spec in key[2]
+            ))
+            mapping = synthetic.create_inverted_mapping(
+                synthetic.remove_duplicate_formulas(expanded)
+            )
+            if len(self.mappings) >= self.max_mappings:
+                self.mappings.clear()
+            self.mappings[key] = mapping
+        return mapping
+
+    def get_formulas_array(self, specs=()):
+        '''
+        Return all formulas (PIT and POT) together with timeframe formulas 
+        of specs (ids of POT records) compiled into FormulasArray.
+        '''
+        key = frozenset(specs)
+        array = self.arrays.get(key, None)
+        if array is None:
+            formulas = list()
+            for timeframe in (models.RecordType.POT, models.RecordType.PIT):
+                for items in self.formulas[timeframe].values():
+                    formulas.extend(items)
+            for spec in sorted(key):
+                formulas.extend(self.get_timeframe_formulas(spec))
+            self.arrays.clear() # keep only the latest array
+            array = self.arrays[key] = synthetic.FormulasArray(formulas)
+        return array
+
+    @classmethod
+    def clear(cls):
+        '''Remove plans from the cache.'''
+        cls._cache.clear()
+
+    @classmethod
+    def get_version(cls, session):
+        '''
+        Return version of tables with formulas. Number of rows, max id and
+        sum of versions reflect insertions, deletions and updates.
+        '''
+        version = list()
+        for name in cls.model_names:
+            model = getattr(models, name)
+            version.extend(session.query(
+                func.count(model.id), func.max(model.id), 
+                func.sum(model.version)
+            ).one())
+        return tuple(version)
+
+    @classmethod
+    def get(cls, session):
+        '''Return plan for the current version of formulas in db.'''
+        url = str(session.get_bind().url)
+        version = cls.get_version(session)
+        plan = cls._cache.get((url, version), None)
+        if plan is None:
+            plan = cls(session.query(models.RecordFormula).all(), version)
+
+            # Keep only the latest version of plan for every db
+            for key in [ key for key in cls._cache if key[0] == url ]:
+                del cls._cache[key]
+            cls._cache[(url, version)] = plan
+        return plan
+
+
+def create_synthetic_records(base_records, db_records, db_formulas, plan=None):
+    '''
+    Create synthetic records (rparser.synthetic.Record) from formulas 
+    involving base records. Formulas are taken from the plan (FormulaPlan) 
+    or compiled for the call when the plan is not given.
+    '''
+    if plan is None:
+        plan = FormulaPlan(db_formulas)
+
+    rtypes = { 
+        rtype.id: rtype for rtype in itertools.chain(
+            (record.rtype for record in base_records),
+            (record.rtype for record in db_records),
+            (formula.rtype for formula in db_formulas),
+            (item.rtype for formula in db_formulas for item in formula.rhs)
         )
     }
-    
+    dataset = DictRecordsDataset.create_from_records(
+        convert_db_records(db_records, by_id=True)
+    )
+    records_spec = set(
+        record.rtype_id for record in itertools.chain(base_records, db_records)
+                        if record.rtype.timeframe == models.RecordType.POT
+    )
+    formulas = set(formula.id for formula in db_formulas)
+
     synthetic_records = utils.concatenate_lists(
         synthetic.create_synthetic_records(
-            spec=convert_db_record(record).spec, dataset=dataset, 
-            formulas=formulas[record.rtype.timeframe]
+            spec=convert_db_record(record, by_id=True).spec, dataset=dataset, 
+            formulas=plan.get_mapping(
+                record.rtype.timeframe, formulas, records_spec
+            )
         ) 
         for record in base_records
     )
     
-    return synthetic_records
+    return [ # types of records from the session of records
+        record._replace(
+            spec=record.spec._replace(spec=rtypes[record.spec.spec])
+        )
+        for record in synthetic_records
+    ]
+    
+
+def project_record(timestamp, timerange, fiscal_year_start_month, pit=False):
+    '''
+    Return start of fiscal year and timeframe of the record (like 
+    Record.determine_fiscal_year and Record.project_onto_fiscal_year, 
+    without ORM objects). Return None when the record starts before the 
+    fiscal year.
+    '''
+    year = timestamp.year
+    if timestamp.month < fiscal_year_start_month:
+        year -= 1
+    fy_start = date(year, fiscal_year_start_month, 1)
+
+    if pit:
+        projection = (timestamp.month - fiscal_year_start_month) % 12 + 1
+        return fy_start, synthetic.Timeframe(projection, projection)
+
+    start_year, start_month = timestamp.year, timestamp.month - timerange + 1
+    if start_month < 1:
+        start_year, start_month = start_year - 1, start_month + 12
+    if date(start_year, start_month, 1) < fy_start:
+        return None
+    pstart = (start_month - fiscal_year_start_month) % 12 + 1
+    return fy_start, synthetic.Timeframe(pstart, pstart + timerange - 1)
+
+
+def get_formulas_array(session, plan):
+    '''
+    Return timeframes of types of records (rtype id -> timeframe) and 
+    FormulasArray of the plan (with timeframe formulas of all POT records).
+    '''
+    RecordType = models.RecordType
+    rtypes = dict(session.query(RecordType.id, RecordType.timeframe))
+    array = plan.get_formulas_array(
+        rtype_id for rtype_id, timeframe in rtypes.items()
+                 if timeframe == RecordType.POT
+    )
+    return rtypes, array
+
+
+def create_synthetic_mapping(entity, spec, value, rtypes):
+    '''
+    Return mapping (column -> value) of synthetic record of the entity 
+    (company id, start of fiscal year) and spec (rtype id, timeframe).
+    '''
+    (company_id, fy_start), (rtype_id, timeframe) = entity, spec
+    return {
+        "company_id": company_id, "rtype_id": rtype_id, "value": value,
+        "synthetic": True, "timestamp": project_timeframe_onto_fiscal_year(
+            timeframe, utils.FiscalYear(start=fy_start, end=None)
+        ).end,
+        "timerange": (
+            0 if rtypes[rtype_id] == models.RecordType.PIT
+            else timeframe.end - timeframe.start + 1
+        )
+    }
+
+
+def compute_synthetic_records(session, companies=None, since=None, plan=None):
+    '''
+    Compute synthetic records of all companies (or selected companies) and
+    fiscal years (or fiscal years ending on or after since) at once with 
+    FormulasArray. Genuine records are loaded into
+    array (company & fiscal year x type of record & timeframe), formulas are
+    applied until no new values appear. Only new records and synthetic 
+    records with changed values are written to the session. Return tuple 
+    with numbers of created and updated records.
+    '''
+    if plan is None:
+        plan = FormulaPlan.get(session)
+    Record, Company, RecordType = models.Record, models.Company, \
+                                  models.RecordType
+    rtypes, array = get_formulas_array(session, plan)
+
+    query = session.query(
+        Record.id, Record.company_id, Record.rtype_id, Record.timestamp,
+        Record.timerange, Record.value, Record.synthetic, 
+        Company.fiscal_year_start_month
+    ).join(Company)
+    if companies is not None:
+        query = query.filter(Record.company_id.in_([
+            getattr(company, "id", company) for company in companies
+        ]))
+    if since is not None: # records of fiscal years ending after since
+        query = query.filter(
+            Record.timestamp >= date(since.year - 1, since.month, 1)
+        )
+    records = query.all()
+
+    rows = OrderedDict() # (company id, start of fiscal year) -> row
+    cells, existing = list(), dict() # cell -> (id, value) of synthetic record
+    for (record_id, company_id, rtype_id, timestamp, timerange, value, 
+         is_synthetic, fy_start_month) in records:
+        projection = project_record(
+            timestamp, timerange, fy_start_month, 
+            pit=rtypes[rtype_id] == RecordType.PIT
+        )
+        if projection is None or (
+            since is not None and date(
+                projection[0].year + 1, projection[0].month, 1
+            ) <= since
+        ):
+            continue
+        column = array.columns.get(
+            synthetic.TimeframeSpec(rtype_id, projection[1]), None
+        )
+        if column is None: # not involved in formulas
+            continue
+        row = rows.setdefault((company_id, projection[0]), len(rows))
+        if is_synthetic:
+            existing[(row, column)] = (record_id, value)
+        else:
+            cells.append((row, column, value))
+
+    values = array.create_array(len(rows))
+    if cells:
+        row_index, column_index, cell_values = zip(*cells)
+        values[row_index, column_index] = cell_values
+    computed = array.compute(values)
+
+    specs = list(array.columns)
+    entities = list(rows)
+    new_records, updated_records = list(), dict()
+    for row, column in zip(*np.nonzero(computed)):
+        value = float(values[row, column])
+        if (row, column) in existing:
+            record_id, old_value = existing[(row, column)]
+            if not math.isclose(value, old_value, rel_tol=1e-9, abs_tol=1e-9):
+                updated_records[record_id] = value
+            continue
+        new_records.append(create_synthetic_mapping(
+            entities[row], specs[column], value, rtypes
+        ))
+
+    session.bulk_insert_mappings(Record, new_records)
+    ids = list(updated_records)
+    for start in range(0, len(ids), 500): # versioned updates
+        for record in session.query(Record).filter(
+            Record.id.in_(ids[start:start + 500])
+        ):
+            record.value = updated_records[record.id]
+    return len(new_records), len(updated_records)
+
+
+def update_synthetic_records(session, cells, plan=None):
+    '''
+    Update synthetic records after genuine records have been created, 
+    changed or deleted. Cells are tuples (company id, rtype id, timestamp,
+    timerange) of the changed records (before and after the change). Only
+    synthetic records computed (directly or indirectly) from the cells 
+    (FormulasArray.get_downstream) within fiscal years of the cells are
+    computed again, so the cost does not depend on the length of history of
+    the company. Synthetic records which cannot be computed anymore are 
+    deleted. Return tuple with numbers of created, updated and deleted 
+    records.
+    '''
+    Record, Company, RecordType = models.Record, models.Company, \
+                                  models.RecordType
+    cells = set(cells)
+    if not cells:
+        return 0, 0, 0
+    if plan is None:
+        plan = FormulaPlan.get(session)
+    rtypes, array = get_formulas_array(session, plan)
+    fy_start_months = dict(
+        session.query(Company.id, Company.fiscal_year_start_month).filter(
+            Company.id.in_(set(cell[0] for cell in cells))
+        )
+    )
+
+    changes = dict() # (company id, start of fiscal year) -> changed columns
+    for company_id, rtype_id, timestamp, timerange in cells:
+        if company_id not in fy_start_months or rtype_id not in rtypes:
+            continue # deleted together with the company or type of record
+        projection = project_record(
+            timestamp, timerange, fy_start_months[company_id],
+            pit=rtypes[rtype_id] == RecordType.PIT
+        )
+        if projection is None:
+            continue
+        column = array.columns.get(
+            synthetic.TimeframeSpec(rtype_id, projection[1]), None
+        )
+        if column is not None:
+            changes.setdefault(
+                (company_id, projection[0]), set()
+            ).add(column)
+
+    specs = list(array.columns)
+    new_records, updated_records, deleted_records = list(), dict(), list()
+    for (company_id, fy_start), columns in changes.items():
+        columns = columns | array.get_downstream(columns)
+        values = array.create_array(1)
+        existing = dict() # column -> (id, value) of synthetic record
+        for record_id, rtype_id, timestamp, timerange, value, is_synthetic \
+            in session.query(
+                Record.id, Record.rtype_id, Record.timestamp, 
+                Record.timerange, Record.value, Record.synthetic
+            ).filter(
+                Record.company_id == company_id, 
+                Record.timestamp >= fy_start,
+                Record.timestamp < date(fy_start.year + 1, fy_start.month, 1)
+            ):
+            projection = project_record(
+                timestamp, timerange, fy_start.month,
+                pit=rtypes[rtype_id] == RecordType.PIT
+            )
+            if projection is None:
+                continue
+            column = array.columns.get(
+                synthetic.TimeframeSpec(rtype_id, projection[1]), None
+            )
+            if column is None:
+                continue
+            if is_synthetic and column in columns: # computed again
+                existing[column] = (record_id, value)
+            else:
+                values[0, column] = value
+
+        columns = [ column for column in columns 
+                           if column in existing or np.isnan(values[0, column]) ]
+        array.compute(values, columns)
+
+        for column in columns:
+            value = float(values[0, column])
+            if column in existing:
+                record_id, old_value = existing[column]
+                if math.isnan(value):
+                    deleted_records.append(record_id)
+                elif not math.isclose(
+                    value, old_value, rel_tol=1e-9, abs_tol=1e-9
+                ):
+                    updated_records[record_id] = value
+            elif not math.isnan(value):
+                new_records.append(create_synthetic_mapping(
+                    (company_id, fy_start), specs[column], value, rtypes
+                ))
+
+    session.add_all(Record(**mapping) for mapping in new_records)
+    ids = list(updated_records) + deleted_records
+    for start in range(0, len(ids), 500): # versioned updates and deletes
+        for record in session.query(Record).filter(
+            Record.id.in_(ids[start:start + 500])
+        ):
+            if record.id in updated_records:
+                record.value = updated_records[record.id]
+            else:
+                session.delete(record)
+    return len(new_records), len(updated_records), len(deleted_records)
     
 ################################################################################
\ No newline at end of file
@@ -0,0 +1,167 @@
+'''
+Backfill of synthetic records. Companies are split into chunks computed by a
+pool of worker processes (db.adapters.rparser.compute_synthetic_records),
+every worker uses its own session and commits every chunk. Finished chunks
+are written to the progress file as JSON lines, so the backfill can be
+resumed without computing the same companies again (computing is
+idempotent, an interrupted chunk is computed again).
+'''
+import multiprocessing
+import traceback
+import datetime
+import time
+import json
+import os
+
+from rparser.batch import ends_with_newline
+from db.core import SQLAlchemy
+from db.core.history_meta import versioned_session
+from db.models import Company
+import db.adapters.rparser as adapter
+
+
+def get_company_ids(session, companies=None):
+    '''Return sorted ids of companies (all or given by ISIN or name).'''
+    query = session.query(Company.id)
+    if companies:
+        query = query.filter(
+            Company.isin.in_(companies) | Company.name.in_(companies)
+        )
+    return sorted(company_id for company_id, in query)
+
+
+def read_backfilled_companies(progress):
+    '''Return ids of companies backfilled without errors.'''
+    companies = set()
+    if not os.path.exists(progress):
+        return companies
+    with open(progress, encoding="utf-8") as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except ValueError: # line truncated by interrupted run
+                continue
+            if not record.get("error"):
+                companies.update(record["companies"])
+    return companies
+
+
+def create_session(url):
+    '''Create session with versioning like the session of the app.'''
+    session = SQLAlchemy(url).session
+    versioned_session(session)
+    return session
+
+
+def backfill_companies(session, companies, since=None):
+    '''
+    Compute synthetic records of companies and commit them. Return record
+    with numbers of created and updated records, time (in seconds) and error
+    (type, message and traceback) when computing failed.
+    '''
+    record = { "companies": list(companies), "created": 0, "updated": 0,
+               "time": None, "error": None }
+    start = time.perf_counter()
+    try:
+        record["created"], record["updated"] = \
+            adapter.compute_synthetic_records(
+                session, companies=companies, since=since
+            )
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        record["error"] = {
+            "type": type(e).__name__, "message": str(e),
+            "traceback": traceback.format_exc()
+        }
+    record["time"] = round(time.perf_counter() - start, 6)
+    return record
+
+
+# Session and options of the worker, set by init_worker.
+_worker_options = dict()
+
+
+def init_worker(url, since):
+    '''Create session of the worker.'''
+    _worker_options.clear()
+    _worker_options.update(session=create_session(url), since=since)
+
+
+def backfill_task(companies):
+    return backfill_companies(companies=companies, **_worker_options)
+
+
+def backfill(
+    url, progress, companies=None, since=None, workers=None, chunk_size=10,
+    resume=False, report=print
+):
+    '''
+    Backfill synthetic records of companies (all or given by ISIN or name)
+    in chunks of chunk_size companies with the pool of workers (serially
+    when workers is 0). When since (date) is given, only fiscal years ending
+    on or after since are computed. Progress and throughput are reported
+    with report after every chunk. Return dict with numbers of companies,
+    created and updated records and failed chunks.
+    '''
+    session = create_session(url)
+    try:
+        company_ids = get_company_ids(session, companies)
+    finally:
+        session.close()
+    done = read_backfilled_companies(progress) if resume else set()
+    totals = { "companies": 0, "skipped": sum(
+                   company in done for company in company_ids
+               ), "created": 0, "updated": 0, "failed": 0 }
+    company_ids = [ company for company in company_ids if company not in done ]
+    chunks = [ company_ids[index:index + chunk_size]
+               for index in range(0, len(company_ids), chunk_size) ]
+
+    start = time.perf_counter()
+    with open(progress, "a" if resume else "w", encoding="utf-8") as file:
+        if resume and not ends_with_newline(progress): # interrupted run
+            file.write("\n")
+        if workers == 0:
+            init_worker(url, since)
+            records = map(backfill_task, chunks)
+            pool = None
+        else:
+            pool = multiprocessing.Pool(
+                workers, initializer=init_worker, initargs=(url, since)
+            )
+            records = pool.imap_unordered(backfill_task, chunks)
+        try:
+            for record in records:
+                file.write(json.dumps(record) + "\n")
+                file.flush()
+                if record["error"]:
+                    totals["failed"] += 1
+                    report("Failed companies {}: {}".format(
+                        record["companies"], record["error"]["message"]
+                    ))
+                    continue
+                totals["companies"] += len(record["companies"])
+                totals["created"] += record["created"]
+                totals["updated"] += record["updated"]
+                elapsed = time.perf_counter() - start
+                report(
+                    "{}/{} companies, created: {}, updated: {} "
+                    "({:.1f} companies/s, {:.0f} records/s)".format(
+                        totals["companies"], len(company_ids),
+                        totals["created"], totals["updated"],
+                        totals["companies"] / elapsed,
+                        (totals["created"] + totals["updated"]) / elapsed
+                    )
+                )
+        finally:
+            if pool:
+                pool.terminate()
+                pool.join()
+            elif _worker_options.get("session"):
+                _worker_options["session"].close()
+
+    return totals
+
+
+def parse_date(text):
+    return datetime.datetime.strptime(text, "%Y-%m-%d").date()
@@ -12,7 +12,7 @@ from sqlalchemy import (
 )
 from sqlalchemy.orm.query import Query
 from sqlalchemy import func, cast, inspect, event, and_, or_, extract, select
-from sqlalchemy.orm import relationship, backref, remote, foreign
+from sqlalchemy.orm import relationship, backref, remote, foreign, Session
 from sqlalchemy.schema import ForeignKey
 from sqlalchemy.dialects.postgresql import INTERVAL 
 from sqlalchemy.ext.hybrid import hybrid_property
@@ -447,9 +447,11 @@ class Record(VersionedModel):
         return pstart, pend        
     
     @staticmethod
-    def create_synthetic_records(session, base_records):
+    def create_synthetic_records(session, base_records, plan=None):
         if not isinstance(base_records, collections.Iterable):
             base_records = [base_records]
+        if plan is None: # formulas compiled once for all companies
+            plan = adapter.FormulaPlan.get(session)
         
         records_by_company = utils.group_objects(
             base_records, key=operator.attrgetter("company")
@@ -457,15 +459,19 @@ class Record(VersionedModel):
         
         return utils.concatenate_lists(
             Record.create_synthetic_records_for_company(
-                session, company, records
+                session, company, records, plan
             )
             for company, records in records_by_company.items()
         )
 
     @staticmethod
-    def create_synthetic_records_for_company(session, company, base_records):
+    def create_synthetic_records_for_company(
+        session, company, base_records, plan=None
+    ):
         if not isinstance(base_records, collections.Iterable):
             base_records = [base_records]   
+        if plan is None:
+            plan = adapter.FormulaPlan.get(session)
             
         records_by_fy = utils.group_objects(
             base_records, key=lambda item: item.determine_fiscal_year()
@@ -473,17 +479,19 @@ class Record(VersionedModel):
         
         return utils.concatenate_lists(
             Record.create_synthetic_records_for_company_within_fiscal_year(
-                session, company, fiscal_year, records
+                session, company, fiscal_year, records, plan
             )
             for fiscal_year, records in records_by_fy.items()
         )  
 
     @staticmethod
     def create_synthetic_records_for_company_within_fiscal_year(
-        session, company, fiscal_year, base_records
+        session, company, fiscal_year, base_records, plan=None
     ):
         if not isinstance(base_records, collections.Iterable):
             base_records = [base_records]      
+        if plan is None:
+            plan = adapter.FormulaPlan.get(session)
     
         formulas = utils.concatenate_lists(
             record.rtype.revformulas for record in base_records
@@ -497,12 +505,34 @@ class Record(VersionedModel):
                 session, record, company, fiscal_year
             ) 
             for record in adapter.create_synthetic_records(
-                base_records, records_db, formulas
+                base_records, records_db, formulas, plan
             )
         ]
         session.add_all(synthetic_records)
         return synthetic_records
 
+    @staticmethod
+    def track_changes(session):
+        '''
+        Collect cells of genuine records created, changed or deleted in the
+        session until the end of the transaction (or until 
+        update_synthetic_records).
+        '''
+        session.info.setdefault("changed_records", set())
+
+    @staticmethod
+    def update_synthetic_records(session, cells=None, plan=None):
+        '''
+        Update synthetic records computed from genuine records created,
+        changed or deleted in the session since track_changes (or from 
+        given cells, see db.adapters.rparser.update_synthetic_records). 
+        Changes have to be flushed before. Return tuple with numbers of 
+        created, updated and deleted synthetic records.
+        '''
+        if cells is None:
+            cells = session.info.pop("changed_records", set())
+        return adapter.update_synthetic_records(session, cells, plan)
+
     @staticmethod
     def get_records_for_company_within_fiscal_year(
         session, company, fiscal_year
@@ -514,7 +544,9 @@ class Record(VersionedModel):
         #     Record.timestamp <= fiscal_year.end
         # ).all()
         records = session.query(Record).filter(
-            Record.company == company
+            Record.company == company,
+            Record.timestamp >= fiscal_year.start,
+            Record.timestamp <= fiscal_year.end
         ).all()
         records = list(filter(
             lambda record: record.timestamp_start >= fiscal_year.start \
@@ -566,6 +598,63 @@ def after_insert(mapper, connection, target):
             values(timerange=0)
         )
 
+
+# cells (company id, rtype id, timestamp, timerange) of genuine records 
+# created, changed or deleted in sessions tracking changes (see 
+# Record.track_changes), used for updating synthetic records (see 
+# Record.update_synthetic_records)
+RECORD_CELL = ("company_id", "rtype_id", "timestamp", "timerange")
+
+
+def get_record_cells(record):
+    '''Return cells of the record before and after changes.'''
+    state = inspect(record)
+    history = { name: state.attrs[name].history 
+                for name in RECORD_CELL + ("synthetic",) }
+    was_synthetic = history["synthetic"].deleted[0] \
+                    if history["synthetic"].deleted else record.synthetic
+    if record.synthetic and was_synthetic:
+        return set()
+    return set([
+        tuple(getattr(record, name) for name in RECORD_CELL),
+        tuple(
+            history[name].deleted[0] if history[name].deleted 
+            else getattr(record, name) for name in RECORD_CELL
+        )
+    ])
+
+
+# deleted records are tracked before flush (rows exist, attributes can be 
+# loaded), new records after flush (ids of companies and types are set)
+@event.listens_for(Session, "before_flush")
+def track_deleted_records(session, flush_context, instances):
+    cells = session.info.get("changed_records", None)
+    if cells is None:
+        return
+    for obj in session.deleted:
+        if isinstance(obj, Record):
+            cells.update(get_record_cells(obj))
+
+
+@event.listens_for(Session, "after_flush")
+def track_changed_records(session, flush_context):
+    cells = session.info.get("changed_records", None)
+    if cells is None:
+        return
+    for obj in itertools.chain(session.new, session.dirty):
+        if isinstance(obj, Record) and obj not in session.deleted \
+           and session.is_modified(obj):
+            cells.update(get_record_cells(obj))
+
+
+# tracking ends with commit or rollback of the session (savepoints included
+# in the transaction do not end it)
+@event.listens_for(Session, "after_transaction_end")
+def stop_tracking_records(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("changed_records", None)
+
+
 class RecordFormula(VersionedModel):
 
     id = Column(Integer, primary_key=True)
@@ -695,6 +784,17 @@ class FormulaComponent(VersionedModel):
         return True
 
 
+# compiled formulas (see db.adapters.rparser.FormulaPlan) are outdated when
+# formulas are edited in this process (e.g. through the API)
+@event.listens_for(Session, "after_flush")
+def invalidate_formula_plan(session, flush_context):
+    if any(
+        isinstance(obj, (RecordFormula, FormulaComponent)) 
+        for obj in itertools.chain(session.new, session.dirty, session.deleted)
+    ):
+        adapter.FormulaPlan.clear()
+
+
 class FinancialStatementLayout(GetDefaultReprMixin, Model):
 
     DEFAULT_SCHEMAS = [
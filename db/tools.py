@@ -3,9 +3,13 @@ from datetime import datetime, date
 from concurrent import futures
 import warnings
 from collections import namedtuple
+import hashlib
+import pickle
 import csv
+import os
 
 import requests
+from sqlalchemy import func
 from sqlalchemy.exc import IntegrityError
 from bs4 import BeautifulSoup
 
@@ -15,6 +19,7 @@ from db.models import (
 )
 import db.utils as utils
 from rparser.nlp import find_ngrams
+from rparser.core import RecordsSpec, CompaniesSpec, FinancialReport
 import rparser.utils as putil
 
 
@@ -109,6 +114,126 @@ def get_companies_reprs(session):
     return cspec
 
 
+class RecordSpecIndex:
+    '''
+    Records and companies specifications compiled for parsers (tokenised
+    representations, vocabulary, bigrams and companies patterns). The index
+    is identified by the version of tables with representations, cached 
+    in-process and on disk, and rebuilt only when some representation 
+    changes.
+    '''
+    statements = ("bls", "ics", "cfs")
+    models = (RecordType, RecordTypeRepr, Company, CompanyRepr)
+    format_version = 2 # changed with the format of pickled index
+
+    _cache = dict() # (db url, version) -> index
+
+    def __init__(self, version, records_spec, companies_spec):
+        self.version = version
+        self.records_spec = records_spec
+        self.companies_spec = companies_spec
+        self.full_records_spec = RecordsSpec(
+            itertools.chain.from_iterable(
+                records_spec.get(name, list()) for name in self.statements
+            )
+        )
+        self.voc = self.full_records_spec.words
+
+    def get_records_spec(self, name=None):
+        '''Return spec of selected statement or spec of all statements.'''
+        if name is None:
+            return self.full_records_spec
+        return self.records_spec[name]
+
+    @classmethod
+    def get_version(cls, session):
+        '''
+        Return version of tables with representations. Number of rows, max id
+        and sum of versions reflect insertions, deletions and updates.
+        '''
+        version = list()
+        for model in cls.models:
+            version.extend(session.query(
+                func.count(model.id), func.max(model.id), 
+                func.sum(model.version)
+            ).one())
+        return tuple(version)
+
+    @classmethod
+    def build(cls, session, version=None):
+        '''Build index from representations in db.'''
+        if version is None:
+            version = cls.get_version(session)
+
+        records_spec = dict()
+        for name in cls.statements:
+            ftype = session.query(FinancialStatement).\
+                        filter_by(name=name).first()
+            records_spec[name] = RecordsSpec(
+                get_records_reprs(session, ftype) if ftype else list()
+            )
+
+        companies_spec = get_companies_reprs(session)
+        for company in companies_spec:
+            company["pattern"] = FinancialReport.compile_company_pattern(
+                company["repr"]
+            )
+            company["ngrams"] = find_ngrams(company["repr"], n=1, min_len=2)
+
+        return cls(version, records_spec, CompaniesSpec(companies_spec))
+
+    @classmethod
+    def get(cls, session, cache_dir=None):
+        '''
+        Return index for the current version of db. Look for the index in 
+        memory, then in cache_dir (if given) and build it when not found.
+        '''
+        url = str(session.get_bind().url)
+        version = cls.get_version(session)
+        index = cls._cache.get((url, version), None)
+
+        if index is None and cache_dir:
+            path = cls.get_cache_path(cache_dir, url, version)
+            index = cls.load(path)
+            if index is None:
+                index = cls.build(session, version)
+                index.dump(path)
+
+        if index is None:
+            index = cls.build(session, version)
+
+        # Keep only the latest version of index for every db
+        for key in [ key for key in cls._cache if key[0] == url ]:
+            del cls._cache[key]
+        cls._cache[(url, version)] = index
+
+        return index
+
+    @classmethod
+    def get_cache_path(cls, cache_dir, url, version):
+        key = hashlib.sha1(
+            repr((url, version, cls.format_version)).encode("utf-8")
+        ).hexdigest()
+        return os.path.join(cache_dir, "spec-index-{}.pkl".format(key))
+
+    @staticmethod
+    def load(path):
+        '''Load index from file. Return None when not possible.'''
+        try:
+            with open(path, "rb") as file:
+                return pickle.load(file)
+        except Exception:
+            return None
+
+    def dump(self, path):
+        '''Save index to file (atomically, the file can be shared).'''
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temp_path = "{}.{}.tmp".format(path, os.getpid())
+        with open(temp_path, "wb") as file:
+            pickle.dump(self, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+
+
 def create_vocabulary(session, min_len=2, remove_non_alphabetic=True,
                       remove_non_ascii=True, extra_words=None):
     '''Create vocabulary from finrecord representations.'''
@@ -1,7 +1,7 @@
 #!/usr/bin/env python
 import os
 
-from flask_script import Manager, Shell
+from flask_script import Manager, Shell, Command, Option
 from flask_migrate import Migrate, MigrateCommand
 
 from app import create_app, db
@@ -17,6 +17,81 @@ def make_shell_context():
 manager.add_command("shell", Shell(make_context=make_shell_context))
 manager.add_command("db", MigrateCommand)
 
+
+class ParseReports(Command):
+	'''Parse PDF reports in the directory into JSON lines.'''
+	
+	option_list = (
+		Option("directory"),
+		Option("-o", "--output", dest="output", default="reports.jsonl"),
+		Option("-w", "--workers", dest="workers", type=int, default=None,
+		       help="number of worker processes (0 - parse serially)"),
+		Option("--resume", dest="resume", action="store_true", 
+		       help="skip reports already parsed into the output file"),
+		Option("--no-specs", dest="use_specs", action="store_false",
+		       help="do not load specifications of records from db"),
+		Option("--trace-memory", dest="trace_memory", action="store_true",
+		       help="profile peaks of memory of parsing stages")
+	)
+	
+	def run(self, directory, output, workers, resume, use_specs, 
+	        trace_memory):
+		from rparser.batch import find_reports, parse_reports
+		from db.tools import RecordSpecIndex
+		
+		options = dict(trace_memory=trace_memory)
+		if use_specs:
+			spec_index = RecordSpecIndex.get(
+				db.session, cache_dir=app.config.get("SPEC_INDEX_FOLDER")
+			)
+			options.update(
+				records_spec=spec_index.records_spec,
+				companies_spec=spec_index.companies_spec,
+				voc=spec_index.voc
+			)
+		parsed, failed, skipped = parse_reports(
+			find_reports(directory), output, workers=workers, resume=resume, 
+			**options
+		)
+		print("Parsed: {}, failed: {}, skipped: {}".format(
+			parsed, failed, skipped
+		))
+manager.add_command("parse-reports", ParseReports())
+
+
+class SyntheticBackfill(Command):
+	'''Create synthetic records of companies in the db.'''
+	
+	option_list = (
+		Option("-c", "--company", dest="companies", action="append",
+		       help="ISIN or name of company (can be repeated)"),
+		Option("--since", dest="since", default=None,
+		       help="backfill fiscal years ending on or after YYYY-MM-DD"),
+		Option("-o", "--progress", dest="progress", 
+		       default="synthetic-backfill.jsonl"),
+		Option("-w", "--workers", dest="workers", type=int, default=None,
+		       help="number of worker processes (0 - backfill serially)"),
+		Option("--chunk-size", dest="chunk_size", type=int, default=10,
+		       help="number of companies committed at once"),
+		Option("--resume", dest="resume", action="store_true", 
+		       help="skip companies already backfilled in the progress file")
+	)
+	
+	def run(self, companies, since, progress, workers, chunk_size, resume):
+		from db.backfill import backfill, parse_date
+		
+		totals = backfill(
+			app.config["SQLALCHEMY_DATABASE_URI"], progress, 
+			companies=companies, since=since and parse_date(since), 
+			workers=workers, chunk_size=chunk_size, resume=resume
+		)
+		print(
+			"Companies: {companies}, skipped: {skipped}, created: {created}, "
+			"updated: {updated}, failed chunks: {failed}".format(**totals)
+		)
+manager.add_command("synthetic-backfill", SyntheticBackfill())
+
+
 @manager.command
 def tests():
 	'''Run the unit tests.'''
@@ -0,0 +1,201 @@
+'''
+Batch parsing of PDF reports. Reports are parsed by a pool of worker
+processes with models loaded once per worker. Results are written as JSON
+lines (one per report) with timings of parsing stages, profile of the report
+(see rparser.core.Profiler) and errors, so the parsing can be resumed without
+parsing the same reports again.
+'''
+from contextlib import contextmanager
+import multiprocessing
+import traceback
+import warnings
+import datetime
+import time
+import json
+import os
+
+from rparser.core import FinancialReport, PDFPages, Profiler
+from rparser.cache import CachedPages, file_sha256
+
+
+STATEMENTS = ("ics", "bls", "cfs")
+
+
+@contextmanager
+def timer(timings, stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = round(time.perf_counter() - start, 6)
+
+
+def json_default(obj):
+    if isinstance(obj, (datetime.date, datetime.datetime)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    return str(obj)
+
+
+def find_reports(directory, ext=".pdf"):
+    '''Return sorted paths of reports in the directory and subdirectories.'''
+    paths = list()
+    for root, _, files in os.walk(directory):
+        paths.extend(
+            os.path.join(root, name) for name in files
+            if name.lower().endswith(ext)
+        )
+    return sorted(paths)
+
+
+def read_parsed_reports(output):
+    '''Return paths of reports parsed without errors in the output file.'''
+    parsed = set()
+    if not os.path.exists(output):
+        return parsed
+    with open(output, encoding="utf-8") as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except ValueError: # line truncated by interrupted run
+                continue
+            if not record.get("error"):
+                parsed.add(record["path"])
+    return parsed
+
+
+def ends_with_newline(path):
+    with open(path, "rb") as file:
+        file.seek(0, os.SEEK_END)
+        if file.tell() == 0:
+            return True
+        file.seek(-1, os.SEEK_END)
+        return file.read(1) == b"\n"
+
+
+def parse_report(
+    path, report_cls=FinancialReport, pdf_options=None, trace_memory=False,
+    **kwargs
+):
+    '''
+    Parse the report and return record with data of the report (as_dict),
+    timings of stages (in seconds), profile of the report (also when parsing
+    failed, with peaks of memory when trace_memory is True) and error (stage,
+    type, message and traceback) when parsing failed.
+    '''
+    record = { "path": path, "sha256": None, "timings": dict(),
+               "profile": None, "error": None, "data": None }
+    timings = record["timings"]
+    profiler = Profiler(trace_memory)
+    stage = "hash"
+    try:
+        with timer(timings, stage):
+            record["sha256"] = file_sha256(path)
+
+        stage = "extract"
+        with timer(timings, stage), profiler.stage("read_pages"):
+            stream = PDFPages(path, **(pdf_options or dict()))
+            pages = CachedPages(stream, stream.file_info)
+
+        stage = "recognize"
+        with timer(timings, stage):
+            report = report_cls(pages, profiler=profiler, **kwargs)
+
+        stage = "classify"
+        with timer(timings, stage):
+            for name in STATEMENTS:
+                getattr(report, "{}_pages".format(name))
+
+        stage = "company"
+        with timer(timings, stage):
+            report.company
+
+        stage = "statements"
+        with timer(timings, stage):
+            for name in STATEMENTS:
+                getattr(report, name)
+
+        stage = "serialize"
+        with timer(timings, stage):
+            data = report.as_dict()
+            del data["profile"] # reported in the record
+            if data["company"]: # skip compiled patterns of recognizer
+                data["company"] = {
+                    key: value for key, value in data["company"].items()
+                    if key not in ("pattern", "ngrams")
+                }
+            record["data"] = data
+    except Exception as e:
+        record["error"] = {
+            "stage": stage, "type": type(e).__name__, "message": str(e),
+            "traceback": traceback.format_exc()
+        }
+    record["profile"] = profiler.as_dict()
+    return record
+
+
+# Options of reports parsed by the worker, set by init_worker.
+_worker_options = dict()
+
+
+def init_worker(options):
+    '''Set options of parsing and load models once in the worker.'''
+    _worker_options.clear()
+    _worker_options.update(options)
+    report_cls = options.get("report_cls", FinancialReport)
+    for name in STATEMENTS:
+        page = getattr(report_cls, "{}_pages".format(name))
+        try:
+            page.model # loaded by the registry of the page
+        except Exception as e: # reported for every report by parse_report
+            warnings.warn("Model not loaded: {!r}".format(e))
+
+
+def parse_report_task(path):
+    return parse_report(path, **_worker_options)
+
+
+def parse_reports(
+    paths, output, workers=None, resume=False, report_cls=FinancialReport,
+    **kwargs
+):
+    '''
+    Parse reports with the pool of workers (serially when workers is 0) and
+    append records to the output file as JSON lines. When resume is True,
+    the reports parsed without errors in the output file are skipped. Return
+    tuple with numbers of parsed, failed and skipped reports.
+    '''
+    paths = list(paths)
+    parsed_reports = read_parsed_reports(output) if resume else set()
+    skipped = sum(path in parsed_reports for path in paths)
+    paths = [ path for path in paths if path not in parsed_reports ]
+    options = dict(kwargs, report_cls=report_cls)
+
+    parsed = failed = 0
+    with open(output, "a" if resume else "w", encoding="utf-8") as file:
+        if resume and not ends_with_newline(output): # interrupted run
+            file.write("\n")
+        if workers == 0:
+            init_worker(options)
+            records = map(parse_report_task, paths)
+            pool = None
+        else:
+            pool = multiprocessing.Pool(
+                workers, initializer=init_worker, initargs=(options,)
+            )
+            records = pool.imap_unordered(parse_report_task, paths)
+        try:
+            for record in records:
+                file.write(json.dumps(record, default=json_default) + "\n")
+                file.flush()
+                if record["error"]:
+                    failed += 1
+                else:
+                    parsed += 1
+        finally:
+            if pool:
+                pool.terminate()
+                pool.join()
+
+    return parsed, failed, skipped
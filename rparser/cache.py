@@ -0,0 +1,213 @@
+'''
+Content-addressed on-disk cache of results of parsing financial reports.
+Results of every stage (pages of PDF, recognized timestamp & timerange, pages
+of statements, company and financial statements) are stored under keys
+composed of SHA-256 of the file and the inputs of the stage, so only the
+stages whose inputs changed are rerun. Pages are stored in page-indexed files
+(see rparser.pagestore), so single pages can be read without loading the
+whole document.
+'''
+import hashlib
+import pickle
+import os
+
+from rparser.core import PDFPages, NULL_PROFILER
+from rparser.pagestore import PageStore
+
+
+class CachedPages(list):
+    '''Pages of document with metadata of the file (see PDFFileIO).'''
+
+    def __init__(self, pages, file_info=None):
+        super().__init__(pages)
+        self.file_info = file_info
+
+
+def file_sha256(path, chunk_size=2**20):
+    sha = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class ParseCache:
+    '''
+    Cache of pickled objects in directory. Every entry is stored in a file
+    named with SHA-256 of its key (tuple). When the size of the cache
+    exceeds max_size (bytes), the least recently used entries are removed.
+    '''
+    statements = ("ics", "bls", "cfs")
+    extensions = (".pkl", ".pages")
+
+    def __init__(self, directory, max_size=256*2**20):
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+
+    def get_path(self, key):
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest + ".pkl")
+
+    def get(self, key, default=None):
+        path = self.get_path(key)
+        try:
+            with open(path, "rb") as file:
+                value = pickle.load(file)
+            os.utime(path) # mark as recently used
+        except Exception: # missing or broken entry
+            return default
+        return value
+
+    def set(self, key, value):
+        path = self.get_path(key)
+        temp_path = "{}.{}.tmp".format(path, os.getpid())
+        with open(temp_path, "wb") as file:
+            pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+        self.evict()
+
+    def get_pages_path(self, sha):
+        return os.path.join(self.directory, sha + ".pages")
+
+    def get_pages(self, sha):
+        '''Return PageStore of the file with SHA-256 (None when missing).'''
+        path = self.get_pages_path(sha)
+        try:
+            pages = PageStore(path)
+            os.utime(path) # mark as recently used
+        except Exception: # missing or broken entry
+            return None
+        return pages
+
+    def set_pages(self, sha, pages, file_info=None):
+        '''Store pages (iterable of str) of the file and return PageStore.'''
+        pages = PageStore.write(self.get_pages_path(sha), pages, file_info)
+        self.evict()
+        return pages
+
+    def get_or_set(self, key, func):
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = func()
+            self.set(key, value)
+        return value
+
+    def evict(self):
+        '''Remove the least recently used entries exceeding max_size.'''
+        entries = list()
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.extensions):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError: # removed by other process
+                pass
+            total_size -= size
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.extensions):
+                os.remove(entry.path)
+
+    def load_report(
+        self, report_cls, path, spec_version=None, consolidated=True,
+        timestamp=None, timerange=None, executor=None, **kwargs
+    ):
+        '''
+        Create report (instance of FinancialReport or its subclass) of PDF
+        file. Results of stages are taken from the cache when available.
+        spec_version identifies the specifications of records & companies
+        (e.g. version of RecordSpecIndex), the company and the statements are
+        not cached without it. The statements are created by the executor
+        (see FinancialReport.extract_all). Pages of the report are read from
+        PageStore of the cache (decoded on access). SHA-256 of the file is 
+        set as sha256 attribute of the report (see get_pages).
+        '''
+        sha = file_sha256(path)
+
+        pages = self.get_pages(sha)
+        if pages is None:
+            with (kwargs.get("profiler") or NULL_PROFILER).stage("read_pages"):
+                stream = PDFPages(path)
+                pages = self.set_pages(sha, stream, stream.file_info)
+
+        # recognized timestamp/timerange are cached only when not given
+        recognized = {
+            name: self.get((name, sha)) for name, value in
+            (("timestamp", timestamp), ("timerange", timerange)) if not value
+        }
+        report = report_cls(
+            pages, consolidated=consolidated,
+            timestamp=timestamp or (recognized.get("timestamp") or (None,))[0],
+            timerange=timerange or (recognized.get("timerange") or (None,))[0],
+            **kwargs
+        )
+        report.sha256 = sha
+        for name, value in recognized.items():
+            if value is None:
+                self.set((name, sha), (getattr(report, name),))
+
+        self.restore_stage(
+            report, ("statements_pages", sha, consolidated,
+                     self.get_models_version(report_cls)),
+            [ "{}_pages".format(name) for name in self.statements ]
+        )
+        if spec_version is None:
+            return report
+
+        self.restore_stage(
+            report, ("company", sha, spec_version), ["_company"],
+            compute=lambda: report.company
+        )
+        self.restore_stage(
+            report, (
+                "statements", sha, spec_version, consolidated,
+                report.timestamp, report.timerange,
+                tuple(tuple(report.__dict__.get("{}_pages".format(name), ()))
+                      for name in self.statements)
+            ),
+            [ "_{}".format(name) for name in self.statements ],
+            compute=lambda: report.extract_all(executor)
+        )
+
+        return report
+
+    def restore_stage(self, report, key, attributes, compute=None):
+        '''
+        Restore attributes of report from the cache or compute them (by
+        accessing attributes or calling compute) and store in the cache.
+        '''
+        values = self.get(key)
+        if values is not None:
+            report.__dict__.update(values)
+            return
+
+        try:
+            if compute:
+                compute()
+            else:
+                for name in attributes:
+                    getattr(report, name)
+        except AttributeError: # e.g. missing model of classifier
+            return
+        self.set(key, { name: report.__dict__[name] for name in attributes })
+
+    @staticmethod
+    def get_models_version(report_cls):
+        '''Return paths and modification times of page classifiers.'''
+        version = list()
+        for name in ParseCache.statements:
+            page = getattr(report_cls, "{}_pages".format(name))
+            path = page.registry.resolve_path(page.modelpath)
+            try:
+                version.append((path, os.path.getmtime(path)))
+            except OSError:
+                version.append((path, None))
+        return tuple(version)
@@ -0,0 +1,200 @@
+'''
+Registry of classifiers used by parsers (e.g. SelfSearchingPage). Models are
+loaded lazily on the first use and shared by all parsers in the process.
+Random forests can be compiled into flat arrays saved as .npy files, which
+are memory-mapped, so forked workers share pages of one copy of the model.
+'''
+import threading
+import warnings
+import pickle
+import shutil
+import os
+
+import numpy as np
+
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class CompiledForest:
+    '''
+    Random forest classifier (sklearn) compiled into flat arrays with nodes of
+    all trees. Provides predict_proba with the same results as the forest.
+    '''
+    arrays = (
+        "roots", "feature", "threshold", "children_left", "children_right",
+        "value", "classes"
+    )
+
+    def __init__(
+        self, roots, feature, threshold, children_left, children_right, value,
+        classes
+    ):
+        self.roots = roots
+        self.feature = feature
+        self.threshold = threshold
+        self.children_left = children_left
+        self.children_right = children_right
+        self.value = value # probabilities of classes in nodes
+        self.classes = classes
+
+    @property
+    def classes_(self):
+        return self.classes
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        roots, feature, threshold, left, right, value = [], [], [], [], [], []
+        offset = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            roots.append(offset)
+            feature.append(tree.feature)
+            threshold.append(tree.threshold)
+            # leaves have no children (-1)
+            left.append(np.where(
+                tree.children_left < 0, -1, tree.children_left + offset
+            ))
+            right.append(np.where(
+                tree.children_right < 0, -1, tree.children_right + offset
+            ))
+            proba = np.array(tree.value[:, 0, :], dtype=np.float64)
+            normalizer = proba.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0] = 1
+            value.append(proba / normalizer)
+            offset += tree.node_count
+
+        return cls(
+            roots=np.array(roots, dtype=np.intp),
+            feature=np.concatenate(feature).astype(np.intp),
+            threshold=np.concatenate(threshold).astype(np.float64),
+            children_left=np.concatenate(left).astype(np.intp),
+            children_right=np.concatenate(right).astype(np.intp),
+            value=np.concatenate(value),
+            classes=np.asarray(forest.classes_)
+        )
+
+    def predict_proba(self, X):
+        # sklearn compares features as float32 with float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])
+        proba = np.zeros((X.shape[0], self.value.shape[1]))
+        for root in self.roots:
+            nodes = np.full(X.shape[0], root, dtype=np.intp)
+            active = rows
+            while len(active):
+                current = nodes[active]
+                left = self.children_left[current]
+                internal = left >= 0
+                active, current, left = \
+                    active[internal], current[internal], left[internal]
+                go_left = (
+                    X[active, self.feature[current]]
+                        <= self.threshold[current]
+                )
+                nodes[active] = np.where(
+                    go_left, left, self.children_right[current]
+                )
+            proba += self.value[nodes]
+        return proba / len(self.roots)
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        for name in self.arrays:
+            np.save(os.path.join(path, name + ".npy"), getattr(self, name))
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        return cls(**{
+            name: np.load(os.path.join(path, name + ".npy"),
+                          mmap_mode=mmap_mode)
+            for name in cls.arrays
+        })
+
+
+class ModelRegistry:
+    '''
+    Process-wide registry of models (pickled dicts with "clf" and other
+    items). Relative paths are resolved against basedir (the package
+    directory). When mmap_dir is given, the forests are compiled (once) into
+    mmap_dir and memory-mapped.
+    '''
+
+    def __init__(self, basedir=PACKAGE_DIR, mmap_dir=None):
+        self.basedir = basedir
+        self.mmap_dir = mmap_dir
+        self._models = dict()
+        self._lock = threading.Lock()
+
+    def resolve_path(self, path):
+        if os.path.isabs(path):
+            return path
+        package_path = os.path.join(self.basedir, path)
+        if os.path.exists(package_path):
+            return package_path
+        return os.path.abspath(path) # relative to current working directory
+
+    def get(self, path):
+        '''Return model, load it when used for the first time.'''
+        path = self.resolve_path(path)
+        try:
+            return self._models[path]
+        except KeyError:
+            pass
+        with self._lock:
+            if path not in self._models:
+                self._models[path] = self.load(path)
+            return self._models[path]
+
+    def preload(self, *paths):
+        '''
+        Load models in advance, e.g. in the master process before forking
+        workers.
+        '''
+        for path in paths:
+            self.get(path)
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+    def load(self, path):
+        if self.mmap_dir:
+            return self.load_compiled(path)
+        with open(path, "rb") as file:
+            return pickle.load(file)
+
+    def load_compiled(self, path):
+        '''Load model with the forest compiled to memory-mapped arrays.'''
+        name = os.path.splitext(os.path.basename(path))[0]
+        compiled_path = os.path.join(self.mmap_dir, name)
+        model_path = os.path.join(compiled_path, "model.pkl")
+
+        if (not os.path.exists(model_path) or
+                os.path.getmtime(model_path) < os.path.getmtime(path)):
+            with open(path, "rb") as file:
+                model = pickle.load(file)
+            self.save_compiled(model, compiled_path)
+
+        with open(model_path, "rb") as file:
+            model = pickle.load(file)
+        model["clf"] = CompiledForest.load(compiled_path, mmap_mode="r")
+        return model
+
+    def save_compiled(self, model, path):
+        temp_path = "{}.{}.tmp".format(path, os.getpid())
+        CompiledForest.from_sklearn(model["clf"]).save(temp_path)
+        with open(os.path.join(temp_path, "model.pkl"), "wb") as file:
+            pickle.dump(
+                { key: value for key, value in model.items() if key != "clf" },
+                file
+            )
+        shutil.rmtree(path, ignore_errors=True)
+        try:
+            os.replace(temp_path, path)
+        except OSError: # compiled by other process in the meantime
+            warnings.warn("Compiled model already exists: '{}'".format(path))
+            shutil.rmtree(temp_path, ignore_errors=True)
+
+
+registry = ModelRegistry(mmap_dir=os.environ.get("RPARSER_MMAP_DIR", None))
@@ -1,14 +1,17 @@
 from collections import Counter, UserDict, OrderedDict
-from collections.abc import Iterable
+from collections.abc import Iterable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from functools import reduce
-from copy import deepcopy
+import tracemalloc
+import atexit
 import itertools
 import warnings
 import datetime
 import operator
 import reprlib
 import numbers
-import pickle
+import time
 import io
 import re
 
@@ -16,6 +19,8 @@ import numpy as np
 
 from rparser import utils
 from rparser import nlp
+from rparser import classifiers
+from rparser.pagestore import PageStore
 
 
 class PDFFileIO(io.BytesIO):
@@ -39,20 +44,210 @@ class PDFFileIO(io.BytesIO):
         return self._info
 
 
+class PDFPages:
+    '''
+    Pages of PDF file extracted in parallel (pdftotext on ranges of pages).
+    Iteration yields text of pages in order as soon as they are ready, so 
+    processing of early pages can start before the whole file is extracted.
+    Timeout is given per page, max_size limits the size of the output.
+    '''
+    def __init__(
+        self, path, pages_per_task=4, workers=None, timeout=None, 
+        max_size=None
+    ):
+        self.path = path
+        self.pages_per_task = pages_per_task
+        self.workers = workers
+        self.timeout = timeout
+        self.max_size = max_size
+
+    @property
+    def file_info(self):
+        if not hasattr(self, "_info"):
+            self._info, errors = utils.pdfinfo(self.path)
+        return self._info
+
+    def __iter__(self):
+        try:
+            pages_count = int(self.file_info.get("Pages", 0))
+        except ValueError:
+            pages_count = 0
+
+        if pages_count:
+            outputs = utils.read_pdf_pages(
+                self.path, pages_count, pages_per_task=self.pages_per_task,
+                workers=self.workers, timeout=self.timeout, 
+                max_size=self.max_size, layout=True
+            )
+        else: # unknown number of pages, extract the whole file at once
+            outputs = (utils.read_pdf(
+                self.path, layout=True, max_size=self.max_size
+            )[0], )
+
+        rest = ""
+        for output in outputs:
+            *pages, rest = (rest + self.decode(output)).split("\x0c")
+            yield from pages
+        yield rest
+
+    @staticmethod
+    def decode(output):
+        # the same as reading PDFFileIO with io.TextIOWrapper
+        return output.decode("utf-8").replace("\r\n", "\n").\
+                   replace("\r", "\n")
+
+
+class Profiler:
+    '''
+    Collects wall-clock times of the stages of parsing (and optionally peaks 
+    of memory allocated during the stages, traced with tracemalloc). Stages
+    are measured by context managers returned by stage. Stages can be nested,
+    times of the stage entered many times are summed.
+    '''
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stats = OrderedDict()
+        self._stack = list() # [start, peak] of memory of entered stages
+        self._offset = 0 # memory of traces cleared to reset peak
+        self._tracing = False
+
+    @contextmanager
+    def stage(self, name):
+        stats = self.stats.setdefault(name, {"time": 0.0, "calls": 0})
+        if self.trace_memory:
+            self.enter_memory_stage()
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            stats["time"] += time.perf_counter() - start
+            stats["calls"] += 1
+            if self.trace_memory:
+                stats["memory_peak"] = max(
+                    stats.get("memory_peak", 0), self.exit_memory_stage()
+                )
+
+    def get_traced_memory(self):
+        current, peak = tracemalloc.get_traced_memory()
+        return self._offset + current, self._offset + peak
+
+    def reset_peak(self):
+        current, peak = self.get_traced_memory()
+        for item in self._stack: # peak of the enclosing stages
+            item[1] = max(item[1], peak)
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        else: # Python < 3.9, peak is reset together with traces
+            self._offset = current
+            tracemalloc.clear_traces()
+        return current, peak
+
+    def enter_memory_stage(self):
+        if not self._stack and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        current, _ = self.reset_peak()
+        self._stack.append([current, current])
+
+    def exit_memory_stage(self):
+        '''Return peak of memory (in bytes) allocated in the stage.'''
+        self.reset_peak()
+        start, peak = self._stack.pop()
+        if not self._stack and self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+            self._offset = 0
+        return peak - start
+
+    def as_dict(self):
+        return OrderedDict(
+            (name, dict(stats, time=round(stats["time"], 6)))
+            for name, stats in self.stats.items()
+        )
+
+    def merge(self, profile):
+        '''Add stages of the profile (as_dict of other profiler, e.g. of the
+        worker) to the stages of the profiler.'''
+        for name, stats in profile.items():
+            own = self.stats.setdefault(name, {"time": 0.0, "calls": 0})
+            own["time"] += stats["time"]
+            own["calls"] += stats["calls"]
+            if "memory_peak" in stats:
+                own["memory_peak"] = max(
+                    own.get("memory_peak", 0), stats["memory_peak"]
+                )
+
+    def format(self):
+        lines = list()
+        for name, stats in self.stats.items():
+            line = "{:<24}{:>10.4f} s{:>6} calls".format(
+                name, stats["time"], stats["calls"]
+            )
+            if "memory_peak" in stats:
+                line += "{:>10.1f} KiB".format(stats["memory_peak"] / 1024)
+            lines.append(line)
+        return "\n".join(lines)
+
+
+class NullProfiler:
+    '''Profiler which measures nothing, used when profiling is disabled.'''
+    trace_memory = False
+
+    def stage(self, name):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def as_dict(self):
+        return OrderedDict()
+
+    def format(self):
+        return ""
+
+
+NULL_PROFILER = NullProfiler()
+
+
 class Document:
     '''
-    Represents a text as a collection of pages. Expects text stream or 
-    file-like object and produces str objects.
+    Represents a text as a collection of pages. Expects text stream, 
+    file-like object, list of pages, PageStore (pages are decoded on access,
+    not kept in memory) or iterable of pages (e.g. PDFPages) and produces 
+    str objects. Features of pages are computed while the pages are read 
+    from the iterable. Stages of processing are measured by the 
+    profiler (see Profiler).
     '''
-    def __init__(self, stream, newpage="\x0c", newline="\n"):
-        if isinstance(stream, str):
-            self.pages = stream.split(newpage)
-        else:
-            self.pages = stream.read().split(newpage)
+    def __init__(
+        self, stream, newpage="\x0c", newline="\n", profiler=None
+    ):
+        self.profiler = profiler or NULL_PROFILER
+        with self.profiler.stage("read_pages"):
+            self.pages = self.read_pages(stream, newpage)
         self.info = getattr(stream, "file_info", None) 
         self.newline = newline
         self.newpage = newpage
 
+    def read_pages(self, stream, newpage):
+        if isinstance(stream, str):
+            return stream.split(newpage)
+        if hasattr(stream, "read"):
+            return stream.read().split(newpage)
+        if isinstance(stream, PageStore):
+            return stream
+        if isinstance(stream, (list, tuple)):
+            return list(stream)
+        features = PageFeatures()
+        pages = list()
+        for page in stream:
+            pages.append(page)
+            features.add_page(page)
+        self._page_features = { features.n: features }
+        return pages
+
     def __len__(self):
         return len(self.pages)
 
@@ -79,69 +274,315 @@ class Document:
     def __getitem__(self, index):
         return self.pages[index]
 
+    def get_page_features(self, n=2):
+        '''
+        Return features of pages (n-grams frequency) for page classifiers. The
+        features are computed once and shared by all classifiers.
+        '''
+        cache = self.__dict__.setdefault("_page_features", dict())
+        if n not in cache:
+            cache[n] = PageFeatures(self, n=n)
+        return cache[n]
+
+    @property
+    def rows_index(self):
+        '''Index of rows of pages (see RowsIndex), created once.'''
+        if "_rows_index" not in self.__dict__:
+            self._rows_index = RowsIndex(self.pages, self.newline)
+        return self._rows_index
+
     @property
     def rows(self):
         '''
-        Split document into rows. Returns list of tuples containing 
+        Rows of the document. Returns lazy sequence of tuples containing 
         document-level row number, page number, page-level row number and 
         content of a row.
         '''
-        rows_aggregator = list()
-        for page_no, page_text in enumerate(self):
-            last_row_no = len(rows_aggregator)
-            rows_aggregator.extend(
-                (row_no + last_row_no, page_no, row_no, row_text)
-                for row_no, row_text in enumerate(page_text.split(self.newline))
-            )
-        return rows_aggregator
+        return DocumentRows(self.pages, self.rows_index, self.newline)
+
+    def get_page_rows(self, page):
+        '''Return rows of the page (like rows).'''
+        first_row = self.rows_index.get_row(page)
+        return [ # page is split once (pages of PageStore are decoded on access)
+            (first_row + page_row, page, page_row, content)
+            for page_row, content in enumerate(self[page].split(self.newline))
+        ]
+
+
+class RowsIndex:
+    '''
+    Index of rows of pages: prefix sums of numbers of rows of pages and 
+    offsets of rows in pages. Maps document-level row numbers to (page, 
+    page-level row number) and back without scanning the pages.
+    '''
+    def __init__(self, pages, newline="\n"):
+        rows = [ page.split(newline) for page in pages ]
+        counts = [ len(page_rows) for page_rows in rows ]
+        self.first_rows = np.zeros(len(counts) + 1, dtype=np.intp)
+        np.cumsum(counts, out=self.first_rows[1:])
+        self.pages = np.repeat(np.arange(len(counts), dtype=np.intp), counts)
+        self.lengths = np.fromiter(
+            (len(row) for page_rows in rows for row in page_rows), 
+            dtype=np.intp, count=int(self.first_rows[-1])
+        )
+        # offsets of rows in pages (from offsets in concatenated pages)
+        ends = np.cumsum(self.lengths + len(newline))
+        self.offsets = ends - self.lengths - len(newline)
+        self.offsets -= self.offsets[self.first_rows[self.pages]]
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def count_rows(self, page):
+        '''Return number of rows of the page.'''
+        return int(self.first_rows[page + 1] - self.first_rows[page])
+
+    def get_row(self, page, page_row=0):
+        '''Return document-level number of the row of the page.'''
+        if not 0 <= page < len(self.first_rows) - 1:
+            raise IndexError("page index out of range")
+        if not 0 <= page_row < self.count_rows(page):
+            raise IndexError("row index out of range")
+        return int(self.first_rows[page]) + page_row
+
+    def get_position(self, row):
+        '''Return page and page-level number of the document-level row.'''
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("row index out of range")
+        page = int(self.pages[row])
+        return page, row - int(self.first_rows[page])
+
+    def get_span(self, row):
+        '''Return page and offsets (start, end) of the row in the page.'''
+        page, _ = self.get_position(row)
+        start = int(self.offsets[row])
+        return page, start, start + int(self.lengths[row])
+
+
+class DocumentRows(Sequence):
+    '''
+    Lazy view of rows of pages. Items are tuples of document-level row 
+    number, page number, page-level row number and content of the row.
+    '''
+    def __init__(self, pages, index, newline="\n"):
+        self.pages = pages
+        self.index = index
+        self.newline = newline
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [ self[item] for item in range(*row.indices(len(self))) ]
+        page, start, end = self.index.get_span(row)
+        row, page_row = row % len(self), self.index.get_position(row)[1]
+        return row, page, page_row, self.pages[page][start:end]
+
+    def __iter__(self):
+        row = 0
+        for page_no, page in enumerate(self.pages):
+            for page_row, text in enumerate(page.split(self.newline)):
+                yield row, page_no, page_row, text
+                row += 1
 
 
 class UnevenTable():
-    '''Two-dimensional table. Expects str object and products table.'''
+    '''
+    Two-dimensional table. Expects str object and products table. Cells are
+    kept as offsets into the text (array of bounds of cells and array of
+    bounds of rows in cells), rows of str are created on access. Slices and
+    copies of the table share the text and the arrays, changed rows are kept
+    in overlay of the table (copy-on-write).
+    '''
     
     RE_ROWS_SEPARATORS = re.compile(r"\n|\r\n")
     RE_FIELDS_SEPARATORS = re.compile(r"(?:\s)*(?:\||\s{2,}|\t|;)(?:\s)*")
 
     def __init__(self, text):
-        self.data = self.create_table(text)
+        self.text = text
+        self.cells, self.rows = self.create_table(text)
+        self.overlay = dict() # row index -> list of cells
         
     def create_table(self, text):
-        rows = [
-            self.split_into_cells(row)
-            for row in self.split_into_rows(text)
-        ]
-        return rows
+        cells = list()
+        rows = list()
+        for row_start, row_end in self.split_into_rows(text):
+            first_cell = len(cells)
+            cells.extend(self.split_into_cells(text, row_start, row_end))
+            rows.append((first_cell, len(cells)))
+        return (
+            np.array(cells, dtype=np.intp).reshape(-1, 2),
+            np.array(rows, dtype=np.intp).reshape(-1, 2)
+        )
         
     def split_into_rows(self, text):
-        rows = re.split(self.RE_ROWS_SEPARATORS, text)
-        #rows = [ (i, row) for i, row in enumerate(rows) if not row.isspace() ]
-        return rows
+        '''Return bounds of rows in text.'''
+        start = 0
+        for sep in self.RE_ROWS_SEPARATORS.finditer(text):
+            yield start, sep.start()
+            start = sep.end()
+        yield start, len(text)
+
+    def split_into_cells(self, text, start, end):
+        '''Return bounds of non-empty cells of the row.'''
+        for sep in self.RE_FIELDS_SEPARATORS.finditer(text, start, end):
+            if sep.start() > start:
+                yield start, sep.start()
+            start = sep.end()
+        if end > start:
+            yield start, end
+
+    @classmethod
+    def from_rows(cls, rows):
+        '''Create table of rows (lists of str).'''
+        instance = cls.__new__(cls)
+        instance.text = "\n".join("\t".join(row) for row in rows)
+        cells, bounds, pos = list(), list(), 0
+        for row in rows:
+            bounds.append((len(cells), len(cells) + len(row)))
+            for cell in row:
+                cells.append((pos, pos + len(cell)))
+                pos += len(cell) + 1
+            pos += not row # empty row is followed by new line only
+        instance.cells = np.array(cells, dtype=np.intp).reshape(-1, 2)
+        instance.rows = np.array(bounds, dtype=np.intp).reshape(-1, 2)
+        instance.overlay = dict()
+        return instance
+
+    @classmethod
+    def concat(cls, tables):
+        '''
+        Create table with rows of all tables. Offsets are shifted, so the 
+        cells are not split again.
+        '''
+        tables = list(tables)
+        instance = cls.__new__(cls)
+        instance.text = "\n".join(table.text for table in tables)
+        cells, rows, overlay = list(), list(), dict()
+        text_offset = cells_count = rows_count = 0
+        for table in tables:
+            cells.append(table.cells + text_offset)
+            rows.append(table.rows + cells_count)
+            overlay.update(
+                (index + rows_count, row) 
+                for index, row in table.overlay.items()
+            )
+            text_offset += len(table.text) + 1
+            cells_count += len(table.cells)
+            rows_count += len(table.rows)
+        instance.cells = np.concatenate(cells) if cells else \
+                         np.empty((0, 2), dtype=np.intp)
+        instance.rows = np.concatenate(rows) if rows else \
+                        np.empty((0, 2), dtype=np.intp)
+        instance.overlay = overlay
+        return instance
+
+    def copy(self):
+        '''Return table sharing the text and offsets with this table.'''
+        return self.take(slice(None))
+
+    def take(self, index):
+        '''Return table with selected rows (slice or sequence of indices).'''
+        cls = type(self)
+        instance = cls.__new__(cls)
+        instance.text = self.text
+        instance.cells = self.cells
+        instance.rows = self.rows[index]
+        positions = np.arange(len(self.rows))[index].tolist()
+        instance.overlay = {
+            new_index: self.overlay[old_index]
+            for new_index, old_index in enumerate(positions)
+            if old_index in self.overlay
+        } if self.overlay else dict()
+        return instance
+
+    def set_row(self, index, cells):
+        self.overlay[self.get_position(index)] = list(cells)
+
+    def set_cell(self, index, col, value):
+        row = self[index]
+        row[col] = value
+        self.set_row(index, row)
+
+    def to_numbers(self, decimal_mark=",", special_zeros=" -"):
+        '''
+        Convert cells into array of floats (rows aligned to the left) and mask
+        of cells representing numbers.
+        '''
+        return utils.convert_rows_to_numbers(
+            list(self), decimal_mark, special_zeros
+        )
 
-    def split_into_cells(self, row):
-        cells = re.split(self.RE_FIELDS_SEPARATORS, row)
-        return [ cell for cell in cells if cell ]
+    def get_position(self, index):
+        position = index + len(self) if index < 0 else index
+        if not 0 <= position < len(self):
+            raise IndexError("table index out of range")
+        return position
+
+    @property
+    def data(self):
+        return list(self)
 
     def __len__(self):
-        if not self.data:
-            return 0
-        return len(self.data)
+        return len(self.rows)
         
     def __iter__(self):
-        return iter(self.data)
+        text, overlay = self.text, self.overlay
+        cells = self.cells.tolist()
+        for index, (first_cell, last_cell) in enumerate(self.rows.tolist()):
+            if index in overlay:
+                yield list(overlay[index])
+            else:
+                yield [ 
+                    text[start:end] 
+                    for start, end in cells[first_cell:last_cell] 
+                ]
 
     def __getitem__(self, index):
         cls = type(self)
         if isinstance(index, slice):
-            instance = cls.__new__(cls)
-            instance.data = self.data[index]
-            return instance
+            return self.take(index)
         elif isinstance(index, numbers.Integral):
-            return self.data[index]
+            index = self.get_position(index)
+            if index in self.overlay:
+                return list(self.overlay[index])
+            first_cell, last_cell = self.rows[index].tolist()
+            text = self.text
+            return [ 
+                text[start:end] 
+                for start, end in self.cells[first_cell:last_cell].tolist() 
+            ]
         else:
             msg = "{cls.__name__} indices must be integers"
             raise TypeError(msg.format(cls=cls))
         
 
+class RecordsSpec(list):
+    '''
+    Specification of records (list of dicts with names and ngrams of records'
+    representations) compiled for reuse by many parsers. Vocabulary, bigrams
+    and similarity index are computed once, so the specification should not
+    be modified after creation.
+    '''
+
+    def __init__(self, items=()):
+        super().__init__(items)
+        self.words = frozenset(
+            word for item in self for ngram in item["ngrams"] 
+                 for word in str(ngram).split()
+        )
+        self.bigrams = frozenset(
+            first + second for item in self
+            for first, second in zip(item["ngrams"][:-1], item["ngrams"][1:])
+        )
+        self.similarity_index = nlp.CosSimilarityIndex(
+            item["ngrams"] for item in self
+        )
+
+
 class RecordsCollector(UserDict):
     ''' 
     Search for financial records in a text. Provides mapping protocol where 
@@ -158,15 +599,28 @@ class RecordsCollector(UserDict):
     )
     record_spec_id = "name" 
     
-    def __init__(self, table, spec, voc=None):
-        self.table = self.adjust_table(deepcopy(table), spec, voc)
-        records = self.identify_records(self.table, spec)
-        self.records = self.remove_column_with_note_reference(records)
+    def __init__(self, table, spec, voc=None, profiler=None):
+        profiler = profiler or NULL_PROFILER # not stored, collectors are cached
+        with profiler.stage("adjust_table"):
+            self.table = self.adjust_table(table, spec, voc)
+        with profiler.stage("identify_records"):
+            records = self.identify_records(self.table, spec)
+        with profiler.stage("remove_note_column"):
+            self.records = self.remove_column_with_note_reference(records)
         self.records_map = self.create_records_map(self.records)
         self.rows_map = self.create_rows_map(self.records)
         self.data = self.transform_to_dict(self.records)
         
     def adjust_table(self, table, spec, voc=None):
+        '''
+        Return adjusted copy of the table, the table is not modified (labels
+        are changed in overlay of the copy).
+        '''
+        if isinstance(table, UnevenTable):
+            table = table.copy()
+        else:
+            table = UnevenTable.from_rows(table)
+
         voc = set(voc or list())
         voc.update(self.extract_words_from_spec(spec))
         bigrams = self.extract_bigrams_from_spec(spec)
@@ -177,6 +631,8 @@ class RecordsCollector(UserDict):
         return table
         
     def extract_words_from_spec(self, spec):
+        if isinstance(spec, RecordsSpec):
+            return set(spec.words)
         words = [
             str(ngram).split() for item in spec for ngram in item["ngrams"]
         ]
@@ -184,6 +640,8 @@ class RecordsCollector(UserDict):
         return unique_words
            
     def extract_bigrams_from_spec(self, spec):
+        if isinstance(spec, RecordsSpec):
+            return set(spec.bigrams)
         zip_ngrams = map(
             lambda spec: zip(spec["ngrams"][:-1], spec["ngrams"][1:]), spec
         )
@@ -210,16 +668,21 @@ class RecordsCollector(UserDict):
             if len(row) == 0: continue
             cell_with_max_chars = np.array(row).argmax()
             if cell_with_max_chars > 0:
-                table[index][0:(cell_with_max_chars+1)] = [
-                    ' '.join(table[index][0:(cell_with_max_chars+1)])
-                ]
+                cells = table[index]
+                table.set_row(index, 
+                    [' '.join(cells[0:(cell_with_max_chars+1)])] + 
+                    cells[(cell_with_max_chars+1):]
+                )
     
         # 3. Remove leading note reference
-        for row in filter(len, table):
+        for index, row in enumerate(table):
+            if not row: continue
             # Verify whether the first item in the row is a label
             if not len(re.findall(self.RE_ALPHABETIC_CHARS, row[0])):
                 continue
-            row[0] = re.sub(self.RE_NOTE_REFERENCE, "", row[0])
+            label = re.sub(self.RE_NOTE_REFERENCE, "", row[0])
+            if label != row[0]:
+                table.set_cell(index, 0, label)
 
         return table   
     
@@ -232,12 +695,17 @@ class RecordsCollector(UserDict):
         without any reason. Concatenate all words and then split long string
         into tokens.
         '''
-        for row in filter(len, table):
-            if self.count_alphabetic_chars(row[0]) == 0:
+        segmenter = nlp.get_word_segmenter(frozenset(voc))
+        bigrams_pairs = set(map(tuple, bigrams or list()))
+
+        for index, row in enumerate(table):
+            if not row or self.count_alphabetic_chars(row[0]) == 0:
                 continue
         
             label = re.sub(' ', '', row[0])
-            pot_labels = self.find_potential_labels(label, voc)
+            pot_labels = self.find_potential_labels(
+                label, voc, bigrams_pairs, segmenter=segmenter
+            )
             
             if len(pot_labels) == 0:
                 fixed_label = row[0] # label cannot be fixed
@@ -270,37 +738,25 @@ class RecordsCollector(UserDict):
                         ], key=operator.itemgetter(1), reverse=True)
                         fixed_label = pot_labels[labels_fit[0][0]]
 
-            row[0] = fixed_label
+            if fixed_label != row[0]:
+                table.set_cell(index, 0, fixed_label)
 
         return table
 
-    def find_potential_labels(self, sentence, voc):
-        '''Split sentence in accordance with vocabulary.'''
-        stack = [(list(), sentence)]
-        results = list()
-    
-        re_voc = [ re.compile("^" + word, flags=re.IGNORECASE) for word in voc ]
-    
-        while stack:
-            tokens, sentence = stack.pop()
-            tokens_match = list(filter(
-                bool, (re.match(re_word, sentence) for re_word in re_voc)
-            ))
-            if tokens_match:
-                for match in tokens_match:
-                    stack.append(
-                        (tokens + [sentence[slice(*match.span())]], 
-                         sentence[match.end():])
-                    )
-            else:
-                sentence = sentence[1:]
-                if not sentence:
-                    if tokens:
-                        results.append(' '.join(tokens))
-                else:
-                    stack.append((tokens, sentence))
-    
-        return results
+    def find_potential_labels(
+        self, sentence, voc, bigrams=None, max_candidates=20, segmenter=None
+    ):
+        '''
+        Split sentence in accordance with vocabulary. Bigrams (pairs of 
+        tokens) are used to choose max_candidates labels when there are more.
+        '''
+        if segmenter is None:
+            segmenter = nlp.get_word_segmenter(frozenset(voc))
+        return [
+            ' '.join(tokens) for tokens in segmenter.segment(
+                sentence, bigrams=bigrams, max_candidates=max_candidates
+            )
+        ]
 
     def identify_records(
         self, table, recspec, min_csim=0.85, require_numbers=True, 
@@ -309,6 +765,23 @@ class RecordsCollector(UserDict):
         if not recspec: # specification is empty
             return list()
 
+        # Labels are compared with all specs at once. Label is kept as pair of
+        # its tokens and numbers of tokens common with every spec, so the
+        # similarity of extended label can be calculated from partial sums.
+        if isinstance(recspec, RecordsSpec):
+            spec_index = recspec.similarity_index
+        else:
+            spec_index = nlp.CosSimilarityIndex(
+                spec["ngrams"] for spec in recspec
+            )
+        specs_ids = [ spec[self.record_spec_id] for spec in recspec ]
+
+        # Numbers are converted at once, the records keep flat indices of
+        # cells with numbers in the array.
+        values, mask = utils.convert_rows_to_numbers(table)
+        width = values.shape[1]
+        numbers_counts = mask.sum(axis=1).tolist()
+
         stack = list()
         for index, row in enumerate(table):
             if len(row) == 0: continue
@@ -319,20 +792,18 @@ class RecordsCollector(UserDict):
                 row[0], n=1, min_len=2, remove_non_alphabetic=True
             )
             if label_tokens:
-                csims = list(map(
-                    lambda spec: (
-                        spec[self.record_spec_id], 
-                        nlp.cos_similarity(spec["ngrams"], label_tokens)
-                    ), 
-                    recspec
-                ))
+                label_tokens = frozenset(label_tokens)
+                common = spec_index.count_common(label_tokens)
+                csims = spec_index.similarity(label_tokens, common)
+                label_tokens = (label_tokens, common)
     
             # Check for presence of numbers in the row
-            row_numbers_count = sum(map(utils.is_number, row))
+            row_numbers_count = numbers_counts[index]
+            row_end = index*width + len(row)
     
             if label_tokens:
                 if row_numbers_count:
-                    numbers = row[-row_numbers_count:]
+                    numbers = list(range(row_end - row_numbers_count, row_end))
                 else:
                     numbers = None
     
@@ -342,20 +813,18 @@ class RecordsCollector(UserDict):
                     stack.append((label_tokens, numbers, csims, (index,)))
                 else:
                     if not (numbers and s_numbers):
-                        ext_label = label_tokens + s_label
-                        ext_csims = list(map(
-                            lambda spec: (
-                                spec[self.record_spec_id], 
-                                nlp.cos_similarity(spec["ngrams"], ext_label)
-                            ), 
-                            recspec
-                        ))
-    
-                        item_selector = operator.itemgetter(1)
+                        (tokens, common), (s_tokens, s_common) = \
+                            label_tokens, s_label
+                        ext_label = (
+                            tokens | s_tokens,
+                            common + s_common - 
+                                spec_index.count_common(tokens & s_tokens)
+                        )
+                        ext_csims = spec_index.similarity(*ext_label)
     
-                        max_csims = max(csims, key=item_selector)[1]
-                        max_s_csims = max(s_csims, key=item_selector)[1]
-                        max_ext_csims = max(ext_csims, key=item_selector)[1]
+                        max_csims = csims.max()
+                        max_s_csims = s_csims.max()
+                        max_ext_csims = ext_csims.max()
                         
                         if ((max_ext_csims > max_s_csims or 
                                 abs(max_ext_csims - max_s_csims) < 1e-10)
@@ -374,7 +843,7 @@ class RecordsCollector(UserDict):
                     stack.append((label_tokens, numbers, csims, (index,)))
                     
             elif row_numbers_count:
-                numbers = row[-row_numbers_count:] 
+                numbers = list(range(row_end - row_numbers_count, row_end))
                 try:
                     s_label, s_numbers, s_csims, s_index = stack.pop()
                 except IndexError:
@@ -401,14 +870,29 @@ class RecordsCollector(UserDict):
         for label, numbers, csims, rows_indices in stack:
             if require_numbers and not numbers:
                 continue
-            max_csim = max(csims, key=operator.itemgetter(1))[1]
+            max_csim = csims.max()
             if max_csim > min_csim:
                 spec_id = sorted(
-                    ((id, csim) for id, csim in csims if csim > min_csim),
+                    (
+                        (specs_ids[spec_pos], csim) 
+                        for spec_pos, csim in zip(
+                            np.flatnonzero(csims > min_csim).tolist(),
+                            csims[csims > min_csim].tolist()
+                        )
+                    ),
                     key = operator.itemgetter(1)
                 )
-                if convert_numbers:
-                    numbers = [ utils.convert_to_number(num) for num in numbers ]
+                if numbers and convert_numbers:
+                    numbers = [ 
+                        value if valid else None for value, valid in zip(
+                            values.flat[numbers].tolist(), 
+                            mask.flat[numbers].tolist()
+                        )
+                    ]
+                elif numbers:
+                    numbers = [ 
+                        table[cell // width][cell % width] for cell in numbers
+                    ]
                 ident_records.append(
                     (spec_id, numbers, rows_indices)
                 )
@@ -469,37 +953,35 @@ class RecordsCollector(UserDict):
         if max_freq < 3: # there are always at least two columns
             return records
 
-        full_rows = [row for row in rows if len(row) == max_freq]
-        mode_rows = [row for row in rows if len(row) == mode_freq]
+        # Arrays of numbers, nan for cells which are not numbers (None)
+        full_rows = np.array(
+            [row for row in rows if len(row) == max_freq], dtype=np.float64
+        )
+        mode_rows = np.array(
+            [row for row in rows if len(row) == mode_freq], dtype=np.float64
+        )
 
-        last_col_index = next(map(len, full_rows)) - 1
+        last_col_index = max_freq - 1
 
         # Is there any column with more None than numbers ?
-        temp = [
-            [ 1 if item is None else 0 for item in row ]
-            for row in full_rows
-        ]
-        sum_of_nones = list(reduce(lambda x, y: map(operator.add, x, y), temp))
-        max_sum = max(enumerate(sum_of_nones), key=operator.itemgetter(1))
-        if max_sum[1] > len(temp)*0.5:
+        nones = np.isnan(full_rows)
+        sum_of_nones = nones.sum(axis=0)
+        max_sum_col = int(sum_of_nones.argmax())
+        if sum_of_nones[max_sum_col] > len(full_rows)*0.5:
             # note column have to be one of the marginal columns
-            if max_sum[0] == 0 or max_sum[0] == last_col_index:
-                note_column = max_sum[0]
+            if max_sum_col == 0 or max_sum_col == last_col_index:
+                note_column = max_sum_col
 
         # No, there is not. Try something different.
         if not note_column:  
 
             if len(full_rows) > 5:
 
-                data = np.array([ 
-                    row for row in full_rows 
-                    if all(item is not None for item in row) 
-                ])
+                data = full_rows[~nones.any(axis=1)]
 
-                sv_cols = [ #single value columns
-                    index for index, col in enumerate(data.T.tolist()) 
-                    if len(set(col)) == 1 
-                ]
+                sv_cols = np.flatnonzero( #single value columns
+                    (data == data[0]).all(axis=0) 
+                ).tolist() if len(data) else []
 
                 if sv_cols and (sv_cols[0] == 0 or sv_cols[0] == last_col_index):
                     note_column = sv_cols[0]
@@ -517,11 +999,11 @@ class RecordsCollector(UserDict):
 
             elif max_freq != mode_freq: # small number of full rows
                 # concatenate full rows and mode rows
-                data_left = np.array(
-                    mode_rows + list(map(lambda x: x[0:mode_freq], full_rows))
+                data_left = np.concatenate(
+                    (mode_rows, full_rows[:, 0:mode_freq])
                 )
-                data_right = np.array(
-                    mode_rows + list(map(lambda x: x[-mode_freq:], full_rows))
+                data_right = np.concatenate(
+                    (mode_rows, full_rows[:, -mode_freq:])
                 )
 
                 corr_left = np.corrcoef(data_left, rowvar=0)[0,1]
@@ -587,18 +1069,25 @@ class FinancialStatement(RecordsCollector):
     
     def __init__(
         self, text, spec, voc=None, timerange=None, timestamp=None,
-        remove_nonascii=True
+        remove_nonascii=True, table=None, profiler=None
     ):
+        profiler = profiler or NULL_PROFILER
         if remove_nonascii:
             text = utils.remove_non_ascii(text)
-        super().__init__(UnevenTable(text), spec, voc)
+        # table of the text can be given, e.g. when shared by statements
+        super().__init__(
+            UnevenTable(text) if table is None else table, spec, voc, 
+            profiler=profiler
+        )
         if len(self) == 0: # no records identified
             self.names = []
         else:
-            self.names = self.identify_names(
-                text, self.records_map, ncols=max(map(len, self.values())), 
-                report_timerange=timerange, report_timestamp=timestamp
-            )
+            with profiler.stage("identify_names"):
+                self.names = self.identify_names(
+                    text, self.records_map, 
+                    ncols=max(map(len, self.values())), 
+                    report_timerange=timerange, report_timestamp=timestamp
+                )
         self.uom = self.identify_unit_of_measure(text)
         
     def identify_names(
@@ -775,6 +1264,114 @@ class FinancialStatement(RecordsCollector):
         return 1
 
 
+class PageFeatures:
+    '''
+    Features of pages for page classifiers: sparse matrix (pages x n-grams)
+    of n-grams frequency, number of numbers and relative position of every 
+    page. Flags of pages with standalone statements and selected financial
+    data are determined at once. Pages can be added one by one.
+    '''
+    number_ngram = nlp.NGram("fake#number") # fake ngram for counting numbers
+    page_ngram = nlp.NGram("fake#page") # fake ngram for position of page
+
+    def __init__(self, pages=(), n=2):
+        self.n = n
+        self.vocabulary = dict() # ngram -> column
+        self._indptr, self._indices, self._data = [0], list(), list()
+        self._numbers, self._standalone, self._selected_data = [], [], []
+        for page in pages:
+            self.add_page(page)
+
+    def add_page(self, page):
+        freq = Counter(nlp.find_ngrams(page, self.n))
+        for ngram, count in freq.items():
+            self._indices.append(
+                self.vocabulary.setdefault(ngram, len(self.vocabulary))
+            )
+            self._data.append(count)
+        self._indptr.append(len(self._indices))
+        self._numbers.append(len(utils.find_numbers(page)))
+        self._standalone.append(self.is_standalone(freq))
+        self._selected_data.append(self.is_selected_data(freq))
+
+    @property
+    def indptr(self):
+        return np.array(self._indptr, dtype=np.intp)
+
+    @property
+    def indices(self):
+        return np.array(self._indices, dtype=np.intp)
+
+    @property
+    def data(self):
+        return np.array(self._data, dtype=np.float64)
+
+    @property
+    def numbers(self):
+        return np.array(self._numbers, dtype=np.float64)
+
+    @property
+    def position(self):
+        return np.arange(len(self)) / max(len(self), 1)
+
+    @property
+    def standalone(self):
+        return np.array(self._standalone, dtype=bool)
+
+    @property
+    def selected_data(self):
+        return np.array(self._selected_data, dtype=bool)
+
+    def __len__(self):
+        return len(self._indptr) - 1
+
+    @staticmethod
+    def is_standalone(ngrams):
+        return any("jednostkowe" in ngram or "jednostkowy" in ngram 
+                   for ngram in ngrams)
+
+    @staticmethod
+    def is_selected_data(ngrams):
+        return (
+            (nlp.NGram("wybrane", "dane") in ngrams 
+             and nlp.NGram("dane", "finansowe") in ngrams) or
+            (nlp.NGram("wybrane", "skonsolidowane") in ngrams
+             and nlp.NGram("skonsolidowane", "dane") in ngrams
+             and nlp.NGram("dane", "finansowe") in ngrams)
+        )
+
+    def matrix(self, ngrams, use_number_ngram=True, use_page_ngram=True):
+        '''Return dense matrix (pages x ngrams) for selected ngrams.'''
+        matrix = np.zeros((len(self), len(ngrams)))
+
+        columns = np.array(
+            [ self.vocabulary.get(ngram, -1) for ngram in ngrams ], 
+            dtype=np.intp
+        )
+        selected = np.flatnonzero(columns >= 0)
+        if len(selected):
+            # dense sub-matrix of the columns used by ngrams
+            used_columns, positions = np.unique(
+                columns[selected], return_inverse=True
+            )
+            columns_map = np.full(len(self.vocabulary), -1, dtype=np.intp)
+            columns_map[used_columns] = np.arange(len(used_columns))
+            rows = np.repeat(np.arange(len(self)), np.diff(self.indptr))
+            targets = columns_map[self.indices]
+            mask = targets >= 0
+            submatrix = np.zeros((len(self), len(used_columns)))
+            submatrix[rows[mask], targets[mask]] = self.data[mask]
+            matrix[:, selected] = submatrix[:, positions.ravel()]
+
+        for index, ngram in enumerate(ngrams):
+            if use_number_ngram and ngram == self.number_ngram:
+                matrix[:, index] = self.numbers
+            elif use_page_ngram and ngram == self.page_ngram:
+                matrix[:, index] = self.position
+
+        return matrix
+
+
 class SelfSearchingPage:
 
     min_probe_rate = 0.25 # coefficient for filtiring adjecant pages to page
@@ -782,68 +1379,110 @@ class SelfSearchingPage:
 
     def __init__(
         self, modelpath, storage_name = None, use_number_ngram=True, 
-        use_page_ngram=True
+        use_page_ngram=True, registry=classifiers.registry
     ):
+        self.modelpath = modelpath # relative to the package
         self.storage_name = storage_name
         self.use_number_ngram = use_number_ngram
         self.use_page_ngram = use_page_ngram
+        self.registry = registry
+
+    @property
+    def model(self):
+        '''Model loaded (and shared) by the registry on the first use.'''
         try:
-            with open(modelpath, "rb") as f:
-                self.model = pickle.load(f)
+            return self.registry.get(self.modelpath)
         except FileNotFoundError:
-            warnings.warn("No such file or directory: '{}'".format(modelpath))
-            self.model = None
-
-    def _extract_ngrams(self, text, n=2):
-        freq = Counter(nlp.find_ngrams(text, n))
-        if self.use_number_ngram:
-            freq[nlp.NGram("fake#number")] = len(utils.find_numbers(text))
-        return freq
+            warnings.warn(
+                "No such file or directory: '{}'".format(self.modelpath)
+            )
+            return None
 
-    def _select_ngrams(self, text_ngrams):
-        return [text_ngrams[ngram] for ngram in self.model["ngrams"]]
+    def get_page_features(self, doc):
+        if hasattr(doc, "get_page_features"):
+            return doc.get_page_features(n=2)
+        return PageFeatures(doc, n=2)
 
     def __get__(self, doc, owner):
+        if doc is None: # accessed on class
+            return self
+
         # when the model was not load in init, inform user that sth went
         # wrong and raise attribut error
-        if not self.model:
+        model = self.model
+        if not model:
             cls_name = doc.__class__.__name__
             raise AttributeError("'{}' object has no attribute '{}'".format(
                 cls_name, self.storage_name)
             )
 
-        ngrams_by_pages = list(map(self._extract_ngrams, doc))
-        if self.use_page_ngram: # Append fake page ngram for every page
-            for index, ngrams in enumerate(ngrams_by_pages):
-                ngrams[nlp.NGram("fake#page")] = index / len(doc)
-        ngrams_freq = map(self._select_ngrams, ngrams_by_pages)
-        prob_by_pages = self.model["clf"].predict_proba(
-            np.asarray(list(ngrams_freq))
+        with getattr(doc, "profiler", NULL_PROFILER).stage("classify_pages"):
+            page_numbers = self.find_pages(doc, model)
+        doc.__dict__[self.storage_name] = page_numbers
+
+        return page_numbers
+
+    def find_pages(self, doc, model):
+        '''Return numbers of pages with the highest probability.'''
+        # Features are shared by all classifiers of the document, every 
+        # classifier predicts probabilities for all pages at once.
+        features = self.get_page_features(doc)
+        prob_by_pages = model["clf"].predict_proba(
+            self.get_matrix(features, model)
         )[:,1]
+        return self.select_pages(doc, features, prob_by_pages)
 
+    def find_pages_batch(self, docs, model=None):
+        '''
+        Find pages in many documents with one prediction of the model: 
+        features of pages of all documents are stacked into one matrix and
+        probabilities are split back into documents. Numbers of pages are
+        stored in documents and returned as list.
+        '''
+        model = model or self.model
+        if not model:
+            raise AttributeError("model '{}' is not available".format(
+                self.modelpath
+            ))
+        features = [ self.get_page_features(doc) for doc in docs ]
+        if not features:
+            return list()
+        prob_by_pages = model["clf"].predict_proba(np.vstack([
+            self.get_matrix(item, model) for item in features
+        ]))[:,1]
+        bounds = np.cumsum([ len(item) for item in features ])[:-1]
+
+        pages = list()
+        for doc, item, prob in zip(
+            docs, features, np.split(prob_by_pages, bounds)
+        ):
+            page_numbers = self.select_pages(doc, item, prob)
+            doc.__dict__[self.storage_name] = page_numbers
+            pages.append(page_numbers)
+        return pages
+
+    def get_matrix(self, features, model):
+        return features.matrix(
+            model["ngrams"], self.use_number_ngram, self.use_page_ngram
+        )
+
+    def select_pages(self, doc, features, prob_by_pages):
+        '''
+        Return the page with the highest probability together with adjacent
+        pages of high probability.
+        '''
         # Standalone vs consolidated financial statements are often included
         # in the same report. The balance sheet, net and loss account and 
         # cash flows statements are very similar for standalone and 
         # consolidated statements. Choose the correct one on the base of 
         # financial report's type.
         if getattr(doc, "consolidated", False):
-            for index, ngrams_page in enumerate(ngrams_by_pages):
-                if any("jednostkowe" in ngram or "jednostkowy" in ngram 
-                       for ngram in ngrams_page):
-                    # decrease the probabilty
-                    prob_by_pages[index] = prob_by_pages[index] * 0.5
+            # decrease the probabilty
+            prob_by_pages[features.standalone] *= 0.5
 
         # Decrease the probability for pages containing selected set of 
         # financial data.
-        for index, ngrams_page in enumerate(ngrams_by_pages):
-            if ((nlp.NGram("wybrane", "dane") in ngrams_page 
-                and nlp.NGram("dane", "finansowe") in ngrams_page) or
-                (nlp.NGram("wybrane", "skonsolidowane") in ngrams_page 
-                and nlp.NGram("skonsolidowane", "dane") in ngrams_page
-                and nlp.NGram("dane", "finansowe") in ngrams_page)
-            ):
-                # decrease the probabilty
-                prob_by_pages[index] = prob_by_pages[index] * 0.5
+        prob_by_pages[features.selected_data] *= 0.5
 
         max_prob = max(prob_by_pages)
         page_with_max_prob = min(
@@ -862,23 +1501,88 @@ class SelfSearchingPage:
             prob_by_pages[(page_with_max_prob + 1):]
         )))
 
-        page_numbers = list(range(page_with_max_prob - preceding_pages,
-                                  page_with_max_prob + 1 + suceeding_pages))
-
-        doc.__dict__[self.storage_name] = page_numbers
-
-        return page_numbers
+        return list(range(page_with_max_prob - preceding_pages,
+                          page_with_max_prob + 1 + suceeding_pages))
         
     
+def create_statement(text, spec, delta=0, **kwargs):
+    '''
+    Create FinancialStatement of the text and shift maps of rows by delta 
+    (number of rows of preceding pages). Used by workers of extract_all.
+    '''
+    statement = FinancialStatement(text, spec, **kwargs)
+    statement.shift_maps(delta=delta)
+    return statement
+
+
+def create_profiled_statement(trace_memory=False, **kwargs):
+    '''
+    Create statement like create_statement, profiled in the worker. Return
+    the statement and the profile (Profiler.as_dict) to be merged into the
+    profiler of the report.
+    '''
+    profiler = Profiler(trace_memory=trace_memory)
+    with profiler.stage("create_statement"):
+        statement = create_statement(profiler=profiler, **kwargs)
+    return statement, profiler.as_dict()
+
+
+# Pools of processes shared by reports (by number of workers), see 
+# get_executor.
+_executors = dict()
+
+
+def get_executor(max_workers=3):
+    '''
+    Return pool of processes for extract_all (created on the first use).
+    Broken pool (e.g. a worker was killed) is replaced with a new one.
+    '''
+    executor = _executors.get(max_workers, None)
+    if executor is not None and getattr(executor, "_broken", False):
+        executor.shutdown(wait=False)
+        executor = None
+    if executor is None:
+        executor = _executors[max_workers] = ProcessPoolExecutor(max_workers)
+    return executor
+
+
+@atexit.register
+def shutdown_executors():
+    '''Shut down pools created by get_executor.'''
+    while _executors:
+        _, executor = _executors.popitem()
+        executor.shutdown()
+
+
+def classify_pages(docs, names=("bls_pages", "ics_pages", "cfs_pages")):
+    '''
+    Find pages of statements in many documents at once, with one prediction
+    of every model (SelfSearchingPage.find_pages_batch). Documents with
+    pages already found are skipped.
+    '''
+    for name in names:
+        batches = OrderedDict() # SelfSearchingPage -> documents
+        for doc in docs:
+            if name not in doc.__dict__:
+                page = getattr(type(doc), name)
+                batches.setdefault(page, list()).append(doc)
+        for page, batch in batches.items():
+            page.find_pages_batch(batch)
+
+
 class FinancialReport(Document):
     # Composition of Financial Statmenets
     # - bls - balance sheet
     # - cfs - cash flow statement
     # - ics - income statement
+
+    RE_SA = re.compile(r"\bS\.?A(?:\.|\b)", re.IGNORECASE)
+
+    statements = ("bls", "ics", "cfs")
     
-    ics_pages = SelfSearchingPage("rparser/cls/ics.pkl", "ics_pages")
-    bls_pages = SelfSearchingPage("rparser/cls/bls.pkl", "bls_pages")
-    cfs_pages = SelfSearchingPage("rparser/cls/cfs.pkl", "cfs_pages")
+    ics_pages = SelfSearchingPage("cls/ics.pkl", "ics_pages")
+    bls_pages = SelfSearchingPage("cls/bls.pkl", "bls_pages")
+    cfs_pages = SelfSearchingPage("cls/cfs.pkl", "cfs_pages")
 
     def __init__(
         self, *args, consolidated=True, timestamp=None, timerange=None, 
@@ -886,8 +1590,14 @@ class FinancialReport(Document):
     ):
         super().__init__(*args, **kwargs)
         self.consolidated = consolidated
-        self.timestamp = timestamp or self.recognize_timestamp()
-        self.timerange = timerange or self.recognize_timerange()
+        if not timestamp:
+            with self.profiler.stage("recognize_timestamp"):
+                timestamp = self.recognize_timestamp()
+        self.timestamp = timestamp
+        if not timerange:
+            with self.profiler.stage("recognize_timerange"):
+                timerange = self.recognize_timerange()
+        self.timerange = timerange
         self.records_spec = records_spec or dict()
         self.companies_spec = companies_spec or dict()
         self.voc = voc or set()
@@ -916,6 +1626,8 @@ class FinancialReport(Document):
         return voc
 
     def extract_words_from_spec(self, spec):
+        if isinstance(spec, RecordsSpec):
+            return spec.words
         words = [
             str(ngram).split() for item in spec for ngram in item["ngrams"]
         ]
@@ -925,7 +1637,10 @@ class FinancialReport(Document):
     @property
     def company(self):
         if not hasattr(self, "_company"):
-            self._company = self.recognize_company(self.get_companies_spec())
+            with self.profiler.stage("recognize_company"):
+                self._company = self.recognize_company(
+                    self.get_companies_spec()
+                )
         return self._company
         
     @property
@@ -1008,6 +1723,11 @@ class FinancialReport(Document):
 
         return 12
 
+    @classmethod
+    def compile_company_pattern(cls, name):
+        '''Compile pattern for searching the name of company in the text.'''
+        return re.compile(cls.RE_SA.sub("SA", name).strip(), re.IGNORECASE)
+
     def recognize_company(self, cspec, max_page=3, field="repr"):
         '''
         Recognize company of the report. The search is driven by full names
@@ -1018,39 +1738,42 @@ class FinancialReport(Document):
             return None
             
         text = '\n'.join(self[0:max_page])
-        text = re.sub(r"\bS\.?A(?:\.|\b)", "SA", text, flags=re.IGNORECASE)
-
-        # 1. Make decision on the base of repr.
-        cres = list() 
-        for comp in cspec:
-            cfield = re.sub(r"\bS\.?A(?:\.|\b)", "SA", comp[field], 
-                            flags=re.IGNORECASE).rstrip().lstrip()
-            cres.append((
-                comp["isin"],
-                len(re.findall(cfield, text, flags=re.IGNORECASE)),
-            ))
-        cres = sorted(cres, key=lambda x: x[1], reverse=True)
+        text = self.RE_SA.sub("SA", text)
 
-        if cres[0][1] > 0: 
-            isin = cres[0][0]
+        # 1. Make decision on the base of repr (use automaton of compiled 
+        # spec or precompiled patterns when available).
+        if isinstance(cspec, CompaniesSpec) and field == "repr":
+            counts = cspec.count_companies(text)
+        else:
+            counts = list()
+            for comp in cspec:
+                pattern = comp.get("pattern", None) if field == "repr" else None
+                if pattern is None:
+                    pattern = self.compile_company_pattern(comp[field])
+                counts.append(len(pattern.findall(text)))
+        best = max(range(len(counts)), key=counts.__getitem__)
+
+        if counts[best] > 0: 
+            isin = cspec[best]["isin"]
         else: # 2. Otherwise try modified version of TF-IDF
+            if isinstance(cspec, CompaniesSpec):
+                names_ngrams, names_voc = cspec.ngrams, cspec.names_voc
+            else:
+                names_ngrams, names_voc = CompaniesSpec.count_names_ngrams(
+                    cspec
+                )
             text = '\n'.join(self)
-            text = re.sub(r"\bS\.?A(?:\.|\b)", "SA", text, flags=re.IGNORECASE)
-            text_voc = Counter(nlp.find_ngrams(text, n=1, min_len=2))
-            names_ngrams = [
-                (company["isin"], 
-                 nlp.find_ngrams(company["repr"], n=1, min_len=2))
-                for company in cspec
-            ]
-            names_voc = Counter(
-                reduce(operator.add, map(operator.itemgetter(1), names_ngrams))
+            text = self.RE_SA.sub("SA", text)
+            text_voc = Counter(
+                ngram for ngram in nlp.find_ngrams(text, n=1, min_len=2)
+                      if ngram in names_voc
             )
 
             mtf = [
-                (name[0], sum(text_voc[ng]/(names_voc[ng]**2) for ng in name[1]))
-                for name in names_ngrams
+                sum(text_voc[ng]/(names_voc[ng]**2) for ng in ngrams)
+                for ngrams in names_ngrams
             ]
-            isin = max(mtf, key=lambda x: x[1])[0]
+            isin = cspec[max(range(len(mtf)), key=mtf.__getitem__)]["isin"]
 
         return next(filter(lambda cp: cp["isin"] == isin, cspec)) 
 
@@ -1107,7 +1830,58 @@ class FinancialReport(Document):
         report_timestamp = Counter(timestamps).most_common(1)[0][0]
         return report_timestamp
 
-    def create_financial_statement(self, pages, spec):
+    def extract_all(self, executor=None):
+        '''
+        Create all statements (bls, ics, cfs) at once and return them as 
+        dict. Shared inputs (vocabulary, texts and tables of pages, offsets 
+        of rows) are prepared once, the statements are created concurrently
+        when the executor (e.g. get_executor()) is given. Statements created 
+        before are not created again. Stages profiled in workers are merged
+        into the profiler of the report (times are summed over workers).
+        '''
+        names = [ name for name in self.statements 
+                       if not hasattr(self, "_{}".format(name)) ]
+        profiled = self.profiler is not NULL_PROFILER
+        with self.profiler.stage("extract_all"):
+            voc = self.get_voc() if names else None
+            futures = dict()
+            for name in names:
+                pages = getattr(self, "{}_pages".format(name))
+                spec = getattr(self, "get_{}_spec".format(name))()
+                if executor is None:
+                    self.__dict__["_{}".format(name)] = \
+                        self.create_financial_statement(pages, spec, voc)
+                    continue
+                inputs = self.get_statement_inputs(pages, spec, voc)
+                if inputs and profiled:
+                    futures[name] = executor.submit(
+                        create_profiled_statement, 
+                        trace_memory=self.profiler.trace_memory, **inputs
+                    )
+                else:
+                    futures[name] = inputs and executor.submit(
+                        create_statement, **inputs
+                    )
+            for name, future in futures.items():
+                statement = future and future.result()
+                if statement and profiled:
+                    statement, profile = statement
+                    self.profiler.merge(profile)
+                self.__dict__["_{}".format(name)] = statement
+        return { name: getattr(self, name) for name in self.statements }
+
+    def create_financial_statement(self, pages, spec, voc=None):
+        inputs = self.get_statement_inputs(pages, spec, voc)
+        if inputs is None:
+            return None
+        with self.profiler.stage("create_statement"):
+            return create_statement(profiler=self.profiler, **inputs)
+
+    def get_statement_inputs(self, pages, spec, voc=None):
+        '''
+        Return arguments of create_statement for the statement on the pages
+        or None when the spec is empty.
+        '''
         if not spec: # empty spec, nothing can be done
             warnings.warn("No specification.")
             return None
@@ -1120,17 +1894,23 @@ class FinancialReport(Document):
         else:
             text = '\n'.join(operator.itemgetter(*pages)(self))
 
-        preceeding_rows_count = 0
-        for page in self[:min(pages)]:
-            preceeding_rows_count += len(page.split("\n"))
-
-        statement = FinancialStatement(
-            text, spec, voc=self.get_voc(), 
-            timerange=self.timerange, timestamp=self.timestamp
+        return dict(
+            text=text, spec=spec, 
+            voc=self.get_voc() if voc is None else voc,
+            timerange=self.timerange, timestamp=self.timestamp,
+            table=UnevenTable.concat(map(self.get_page_table, pages)),
+            delta=self.rows_index.get_row(min(pages)) # preceding rows
         )
-        statement.shift_maps(delta=preceeding_rows_count)
-        
-        return statement
+
+    def get_page_table(self, page):
+        '''
+        Return table of the page (without non ASCII chars). Tables of pages
+        are created once and shared by statements.
+        '''
+        tables = self.__dict__.setdefault("_page_tables", dict())
+        if page not in tables:
+            tables[page] = UnevenTable(utils.remove_non_ascii(self[page]))
+        return tables[page]
 
     def as_dict(self):
         data = dict()
@@ -1192,4 +1972,58 @@ class FinancialReport(Document):
                 data_cfs["records"].append(record)
         data["cfs"] = data_cfs
 
-        return data
\ No newline at end of file
+        data["profile"] = self.profiler.as_dict()
+
+        return data
+
+
+class CompaniesSpec(list):
+    '''
+    Specification of companies (list of dicts with isin and repr) compiled
+    for reuse by many reports: automaton of names (with normalised "S.A.") 
+    counting all companies in one pass over the text and frequencies of
+    n-grams of names (IDF table). The specification should not be modified
+    after creation.
+    '''
+    RE_SPECIAL_CHARS = re.compile(r"[.^$*+?{}\[\]\\|()]")
+
+    def __init__(self, items=()):
+        super().__init__(items)
+        names = [ 
+            FinancialReport.RE_SA.sub("SA", comp["repr"]).strip() 
+            for comp in self 
+        ]
+        # Names with special chars are regular expressions (see 
+        # FinancialReport.compile_company_pattern), search them with patterns.
+        literals = [ 
+            bool(name) and not self.RE_SPECIAL_CHARS.search(name) 
+            for name in names 
+        ]
+        self.automaton = nlp.AhoCorasick(
+            name if literal else "" for name, literal in zip(names, literals)
+        )
+        self.patterns = {
+            index: comp.get("pattern", None) or 
+                       FinancialReport.compile_company_pattern(comp["repr"])
+            for index, (comp, literal) in enumerate(zip(self, literals))
+            if not literal
+        }
+        self.ngrams, self.names_voc = self.count_names_ngrams(self)
+
+    @staticmethod
+    def count_names_ngrams(cspec):
+        '''Return n-grams of names and frequencies of n-grams in names.'''
+        names_ngrams = [
+            company.get("ngrams", None) or 
+                nlp.find_ngrams(company["repr"], n=1, min_len=2)
+            for company in cspec
+        ]
+        names_voc = Counter(itertools.chain.from_iterable(names_ngrams))
+        return names_ngrams, names_voc
+
+    def count_companies(self, text):
+        '''Return numbers of occurrences of companies names in the text.'''
+        counts = self.automaton.count(text)
+        for index, pattern in self.patterns.items():
+            counts[index] = len(pattern.findall(text))
+        return counts
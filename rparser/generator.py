@@ -0,0 +1,268 @@
+'''
+Generator of synthetic financial reports for benchmarks and regression tests
+of the parser. Statements are rendered as layout text (like the output of
+pdftotext -layout) from specification of records (rparser.specs.records)
+together with the ground truth: values of records, names of columns and unit
+of measure, so the results of the parser can be scored without private PDF
+reports.
+'''
+from collections import namedtuple, defaultdict
+import datetime
+import random
+
+from rparser.specs.records import finrecords
+from rparser.core import RecordsSpec
+from rparser import utils
+from rparser import nlp
+
+
+GeneratedStatement = namedtuple(
+    "GeneratedStatement", field_names="text, records, names, uom"
+)
+GeneratedReport = namedtuple(
+    "GeneratedReport",
+    field_names="text, pages, statements, statements_pages, timestamp, "
+                "timerange"
+)
+
+
+TITLES = {
+    "bls": "SKONSOLIDOWANE SPRAWOZDANIE Z SYTUACJI FINANSOWEJ",
+    "ics": "SKONSOLIDOWANY RACHUNEK ZYSKÓW I STRAT",
+    "cfs": "SKONSOLIDOWANE SPRAWOZDANIE Z PRZEPŁYWÓW PIENIĘŻNYCH"
+}
+
+UNITS_OF_MEASURE = { 1: "w PLN", 1000: "w tys. PLN", 1000000: "w mln PLN" }
+
+REPORT_TYPES = { 3: "kwartalny", 6: "półroczny", 12: "roczny" }
+
+NOISE_WORDS = (
+    "spółka grupa kapitałowa zarząd informacja dodatkowa zasady "
+    "rachunkowości noty objaśniające stanowią integralną część "
+    "sprawozdania finansowego zatwierdzenie publikacji dokument"
+).split()
+
+
+def create_records_spec(records=finrecords, lang="PL"):
+    '''
+    Return specification of records (dict of RecordsSpec for every
+    statement) created from representations of records like
+    db.tools.get_records_reprs, but without db.
+    '''
+    spec = defaultdict(list)
+    for record in records:
+        for item in record.get("repr", ()):
+            if item["lang"] != lang:
+                continue
+            spec[record["statement"]].append({
+                "name": record["name"],
+                "ngrams": nlp.find_ngrams(
+                    utils.remove_non_ascii(item["value"]), n=1, min_len=2,
+                    remove_non_alphabetic=True
+                )
+            })
+    return { name: RecordsSpec(items) for name, items in spec.items() }
+
+
+def get_labels(statement, records=finrecords, lang="PL"):
+    '''
+    Return dict of names of records and their representations in the
+    statement. Representations shared by different records are skipped as
+    the ground truth would be ambiguous.
+    '''
+    names_by_label = defaultdict(set)
+    for record in records:
+        if record["statement"] != statement:
+            continue
+        for item in record.get("repr", ()):
+            if item["lang"] == lang:
+                names_by_label[item["value"].lower()].add(record["name"])
+
+    labels = defaultdict(list)
+    for record in records:
+        if record["statement"] != statement:
+            continue
+        for item in record.get("repr", ()):
+            if (item["lang"] == lang
+                    and len(names_by_label[item["value"].lower()]) == 1):
+                labels[record["name"]].append(item["value"])
+    return labels
+
+
+def shift_date(date, months):
+    '''Return the last day of the month shifted by months.'''
+    year, month = divmod(date.year * 12 + date.month + months, 12)
+    # the first day of the next month
+    return datetime.date(year, month + 1, 1) - datetime.timedelta(days=1)
+
+
+def get_columns(statement, periods, timestamp, timerange):
+    '''
+    Return names of columns (timerange, (year, month, day)) and their
+    headers. Balance sheet compares the timestamp with ends of previous
+    years, the flows compare the same periods of previous years.
+    '''
+    names, headers = list(), list()
+    for period in range(periods):
+        if statement == "bls":
+            end = timestamp if period == 0 else datetime.date(
+                timestamp.year - period, 12, 31
+            )
+            header = ("stan na", end.strftime("%d.%m.%Y"))
+        else:
+            end = shift_date(timestamp, -12 * period)
+            start = shift_date(end, -timerange) + datetime.timedelta(days=1)
+            header = (
+                "{} miesięcy".format(timerange),
+                "{}-{}".format(start.strftime("%d.%m.%Y"),
+                               end.strftime("%d.%m.%Y"))
+            )
+        names.append((timerange, (end.year, end.month, end.day)))
+        headers.append(header)
+    return names, headers
+
+
+def format_number(value, rnd):
+    '''Format integer like in reports (spaces, minus or brackets).'''
+    if value == 0 and rnd.random() < 0.5:
+        return "-"
+    text = "{:,}".format(abs(value)).replace(",", " ")
+    if value < 0:
+        return "({})".format(text) if rnd.random() < 0.5 else "-" + text
+    return text
+
+
+def generate_noise(rnd, lines=1, words=8):
+    return [
+        " ".join(rnd.choice(NOISE_WORDS) for _ in range(words)).capitalize()
+        for _ in range(lines)
+    ]
+
+
+def generate_statement(
+    statement="bls", rows=30, periods=2, note_column=True, split_labels=0.1,
+    uom=1000, noise=2, timestamp=datetime.date(2016, 12, 31), timerange=12,
+    label_width=60, column_width=24, seed=None, rnd=None
+):
+    '''
+    Render statement as layout text and return GeneratedStatement with the
+    text and the ground truth. Parameters:
+        rows - max number of records
+        periods - number of columns with values
+        note_column - render column with references to notes
+        split_labels - probability of splitting label into two rows
+                       (labels longer than label_width are always split)
+        uom - unit of measure (1, 1000 or 1000000)
+        noise - number of lines of noise above and below the statement
+    '''
+    rnd = rnd or random.Random(seed)
+    labels = get_labels(statement)
+    names, headers = get_columns(statement, periods, timestamp, timerange)
+
+    lines = generate_noise(rnd, noise)
+    lines.append("")
+    lines.append("{:^{}}".format(TITLES[statement], label_width))
+    lines.append("{:^{}}".format(
+        "na dzień {} ({})".format(
+            timestamp.strftime("%d.%m.%Y"), UNITS_OF_MEASURE[uom]
+        ), label_width
+    ))
+    lines.append("")
+    note_width = 8 if note_column else 0
+    for part in range(2):
+        lines.append("{:<{}}{:>{}}{}".format(
+            "", label_width, "Nota" if note_column and part else "",
+            note_width, "".join(
+                "{:>{}}".format(header[part], column_width)
+                for header in headers
+            )
+        ))
+
+    records = dict()
+    for name in rnd.sample(sorted(labels), min(rows, len(labels))):
+        label = rnd.choice(labels[name])
+        values = [ 0 if rnd.random() < 0.1 else rnd.randint(-10**6, 10**8)
+                   for _ in range(periods) ]
+        records[name] = [ float(value) for value in values ]
+
+        words = label.split()
+        if len(words) > 1 and (
+            len(label) > label_width - 2 or rnd.random() < split_labels
+        ):
+            split = max(1, min(len(words) - 1, len(words) // 2))
+            while len(" ".join(words[:split])) > label_width - 2 and split > 1:
+                split -= 1
+            lines.append(" ".join(words[:split]))
+            label = " ".join(words[split:])
+        note = rnd.choice(("", "", "12", "4.1", "23")) if note_column else ""
+        lines.append("{:<{}}{:>{}}{}".format(
+            label[:label_width - 2], label_width, note, note_width, "".join(
+                "{:>{}}".format(format_number(value, rnd), column_width)
+                for value in values
+            )
+        ))
+
+    lines.append("")
+    lines.extend(generate_noise(rnd, noise))
+    return GeneratedStatement("\n".join(lines), records, names, uom)
+
+
+def generate_report(
+    pages=20, statements=("bls", "ics", "cfs"),
+    timestamp=datetime.date(2016, 12, 31), timerange=12,
+    company="POLSKI KONCERN NAFTOWY ORLEN SPÓŁKA AKCYJNA", seed=None,
+    **kwargs
+):
+    '''
+    Return GeneratedReport with the title page, statements (on random
+    pages, kwargs are passed to generate_statement) and pages of noise.
+    '''
+    rnd = random.Random(seed)
+    numbers = rnd.sample(range(1, max(pages, len(statements) + 1)),
+                         len(statements))
+
+    text_pages = [ "\n".join([
+        "", company, "",
+        "Raport {} za okres zakończony {}".format(
+            REPORT_TYPES.get(timerange, ""), timestamp.strftime("%d.%m.%Y")
+        )
+    ] + generate_noise(rnd, 5)) ]
+    generated = dict()
+    for page in range(1, max(pages, len(statements) + 1)):
+        if page in numbers:
+            name = statements[numbers.index(page)]
+            generated[name] = generate_statement(
+                name, timestamp=timestamp, timerange=timerange, rnd=rnd,
+                **kwargs
+            )
+            text_pages.append(generated[name].text)
+        else:
+            text_pages.append("\n".join(generate_noise(rnd, 40)))
+
+    return GeneratedReport(
+        "\x0c".join(text_pages), text_pages, generated,
+        { name: [page] for name, page in zip(statements, numbers) },
+        timestamp, timerange
+    )
+
+
+def score_statement(statement, truth):
+    '''
+    Compare statement identified by the parser (FinancialStatement) with the
+    ground truth. Return dict with fractions of records found, records with
+    correct values, and flags of correct names of columns and unit of
+    measure.
+    '''
+    records = statement or dict()
+    found = sum(name in records for name in truth.records)
+    correct = sum(
+        records.get(name) == values for name, values in truth.records.items()
+    )
+    total = len(truth.records) or 1
+    return {
+        "records": found / total,
+        "values": correct / total,
+        "false_records": sum(name not in truth.records for name in records),
+        "names": bool(statement) and statement.names == truth.names,
+        "uom": bool(statement) and statement.uom == truth.uom
+    }
@@ -1,4 +1,4 @@
-from rparser.models import FinancialReport, Document
+from rparser.core import FinancialReport, Document, classify_pages
 
 Document.verbose = True
 
@@ -148,6 +148,9 @@ if __name__ == "__main__":
     ics_tp = 0
     cfs_tp = 0
 
+    # one prediction of every model for pages of all reports
+    classify_pages([ report["doc"] for report in reports ])
+
     for report in reports:
         print("Processing {!r} ...".format(report["doc"]))
 
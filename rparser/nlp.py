@@ -1,13 +1,14 @@
-from functools import reduce
+from functools import lru_cache
+from collections import deque
 import operator
 import math
 import re
 import numbers
 import itertools
-
-import nltk
 import string
-from dateutil.parser import parse
+
+import numpy as np
+from dateutil.parser import parse, parserinfo
 
 
 # polish stop words (source: wikipedia)
@@ -15,30 +16,53 @@ STOP_WORDS = set("od, do, a, aby, ach, acz, aczkolwiek, aj, albo, ale, ależ, an
 
 
 class NGram:
+    '''
+    Immutable sequence of tokens. Tokens are kept in tuple (with precomputed
+    hash), so hashing and comparison of n-grams are as cheap as of tuples.
+    '''
+    __slots__ = ("_tokens", "_hash")
 
     def __init__(self, *args):
         if not args:
             raise TypeError("init expected at least 1 arguments, got 0")
         if not all(isinstance(arg, str) for arg in args):
             raise TypeError("init expected str arguments")
-        self._tokens = list(args)
+        self._set_tokens(args)
+
+    @classmethod
+    def from_tuple(cls, tokens):
+        '''Create n-gram from tuple of str (without validation).'''
+        ngram = cls.__new__(cls)
+        ngram._set_tokens(tokens)
+        return ngram
+
+    def _set_tokens(self, tokens):
+        self._tokens = tuple(tokens)
+        self._hash = hash(self._tokens)
+
+    def __getstate__(self):
+        return {"_tokens": list(self._tokens)}
+
+    def __setstate__(self, state):
+        self._set_tokens(state["_tokens"])
 
     def __repr__(self):
         return "NGram('{}')".format("', '".join(self._tokens))
 
     def __str__(self):
-        return ' '.join(self)
+        return ' '.join(self._tokens)
 
     def __hash__(self):
-        hashes = (hash(token + str(index)) for index, token in enumerate(self))
-        return reduce(operator.xor, hashes)
+        return self._hash
 
     def __eq__(self, other):
+        if isinstance(other, NGram):
+            return self._tokens == other._tokens
         if isinstance(other, str):
             other = (other,)
         if len(self) != len(other):
             return False
-        return tuple(self) == tuple(other)
+        return self._tokens == tuple(other)
 
     def __lt__(self, other):
         if self == other: return False
@@ -69,8 +93,143 @@ class NGram:
         return NGram(*itertools.chain(self, other))
 
     def __iadd__(self, other):
-        self._tokens = list(itertools.chain(self, other))
-        return self
+        return self + other
+
+
+@lru_cache(maxsize=2**16)
+def intern_ngram(tokens):
+    '''Return NGram shared by all occurrences of tokens (tuple of str).'''
+    return NGram.from_tuple(tokens)
+
+
+class WordSegmenter:
+    '''
+    Split strings without white spaces into words from the vocabulary. The
+    vocabulary is stored in prefix-trie (case insensitive), the segmentation
+    is done with dynamic programming over positions in the string, so 
+    sub-results are computed once and the cost is linear in the length of
+    the string.
+    '''
+
+    def __init__(self, voc):
+        self.trie = dict()
+        for word in voc:
+            if not word: continue
+            node = self.trie
+            for char in word:
+                node = node.setdefault(char.lower(), dict())
+            node[None] = True # end of word
+
+    def match_words(self, sentence, start):
+        '''Return end positions of words starting at start (longest first).'''
+        ends = list()
+        node = self.trie
+        for index in range(start, len(sentence)):
+            node = node.get(sentence[index].lower())
+            if node is None:
+                break
+            if None in node:
+                ends.append(index + 1)
+        ends.reverse()
+        return ends
+
+    def segment(self, sentence, bigrams=None, max_candidates=20):
+        '''
+        Return list of potential segmentations (tuples of tokens). Chars which
+        do not begin any word are skipped. When there are more segmentations
+        than max_candidates, the ones with more bigrams (pairs of lowercase
+        tokens) and fewer tokens are preferred.
+        '''
+        bigrams = bigrams or set()
+        length = len(sentence)
+
+        # segmentations[i] - list of (score, tokens) for sentence[i:]
+        segmentations = [None] * length + [[((0, 0), ())]]
+        for start in range(length - 1, -1, -1):
+            ends = self.match_words(sentence, start)
+            if not ends: # skip char
+                segmentations[start] = segmentations[start + 1]
+                continue
+            candidates = list()
+            for end in ends:
+                token = sentence[start:end]
+                for (hits, ntokens), tokens in segmentations[end]:
+                    if tokens and (token.lower(), tokens[0].lower()) in bigrams:
+                        hits += 1
+                    candidates.append(((hits, ntokens - 1), (token,) + tokens))
+            if len(candidates) > max_candidates:
+                candidates.sort(key=operator.itemgetter(0), reverse=True)
+                del candidates[max_candidates:]
+            segmentations[start] = candidates
+
+        return [ tokens for _, tokens in segmentations[0] if tokens ]
+
+
+class AhoCorasick:
+    '''
+    Aho-Corasick automaton for finding many patterns (case insensitive) in
+    one pass over the text. States are kept in lists: transitions (dicts),
+    failure links and ids of patterns ending in the state.
+    '''
+
+    def __init__(self, patterns):
+        self.lengths = list()
+        self.goto, self.fail, self.output = [dict()], [0], [()]
+        for pattern_id, pattern in enumerate(patterns):
+            pattern = pattern.lower()
+            self.lengths.append(len(pattern))
+            if not pattern: continue
+            state = 0
+            for char in pattern:
+                if char not in self.goto[state]:
+                    self.goto[state][char] = len(self.goto)
+                    self.goto.append(dict())
+                    self.fail.append(0)
+                    self.output.append(())
+                state = self.goto[state][char]
+            self.output[state] += (pattern_id,)
+
+        # failure links in breadth-first order
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fail_state = self.fail[state]
+                while fail_state and char not in self.goto[fail_state]:
+                    fail_state = self.fail[fail_state]
+                self.fail[next_state] = self.goto[fail_state].get(char, 0)
+                self.output[next_state] += \
+                    self.output[self.fail[next_state]]
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def count(self, text):
+        '''
+        Return numbers of non-overlapping occurrences of patterns in the text
+        (the same as the numbers of matches of re.findall).
+        '''
+        goto, fail, output, lengths = \
+            self.goto, self.fail, self.output, self.lengths
+        counts = [0] * len(lengths)
+        last_ends = [0] * len(lengths)
+        state = 0
+        for end, char in enumerate(text.lower(), 1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern_id in output[state]:
+                if end - lengths[pattern_id] >= last_ends[pattern_id]:
+                    counts[pattern_id] += 1
+                    last_ends[pattern_id] = end
+        return counts
+
+
+@lru_cache(maxsize=8)
+def get_word_segmenter(voc):
+    '''Return WordSegmenter shared for the vocabulary (frozenset).'''
+    return WordSegmenter(voc)
 
 
 def is_date(string):
@@ -82,26 +241,106 @@ def is_date(string):
         return False
 
 
+# the same pattern as in nltk.tokenize.wordpunct_tokenize
+RE_WORDPUNCT = re.compile(r"\w+|[^\w\s]+")
+RE_NON_ALPHABETIC = re.compile(r"[^A-Za-zżźćńółęąśŻŹĆĄŚĘŁÓŃ]")
+
+# Words known to dateutil parser. Alphabetic tokens out of this set are not
+# dates, so the parser is not called for them.
+DATE_WORDS = frozenset(
+    word.lower()
+    for words in (
+        parserinfo.JUMP, parserinfo.WEEKDAYS, parserinfo.MONTHS, 
+        parserinfo.HMS, parserinfo.AMPM, parserinfo.UTCZONE, 
+        parserinfo.PERTAIN
+    )
+    for item in words
+    for word in ((item,) if isinstance(item, str) else item)
+)
+
+
+@lru_cache(maxsize=2**16)
+def is_noise_token(token):
+    '''
+    Determine whether token (lowercase) is stop word, number, punctuation or
+    date.
+    '''
+    return (
+        token in STOP_WORDS
+        or token.lstrip("-+(").rstrip(")").isdigit()
+        or token in string.punctuation
+        or ((not token.isalpha() or token in DATE_WORDS) and is_date(token))
+    )
+
+
 def find_ngrams(text, n, min_len=0, remove_non_alphabetic=False, 
                 remove_stop_words=True, remove_dates=True,
                 return_tuples=False):
     '''Find all n-grams in th text and return list of tuples.'''
-    tokens = [token.lower() for token in nltk.tokenize.wordpunct_tokenize(text)]
-    tokens = [token for token in tokens 
-                    if remove_stop_words and token not in STOP_WORDS 
-                       and not token.lstrip("-+(").rstrip(")").isdigit() 
-                       and token not in string.punctuation
-                       and remove_dates and not is_date(token) 
-                       and len(token) >= min_len ]
+    tokens = [ token.lower() for token in RE_WORDPUNCT.findall(text) ]
+    tokens = [ token for token in tokens 
+                     if remove_stop_words and remove_dates
+                        and len(token) >= min_len 
+                        and not is_noise_token(token) ]
     if remove_non_alphabetic:
-        regex = re.compile(r"[^A-Za-zżźćńółęąśŻŹĆĄŚĘŁÓŃ]")
-        tokens = filter(bool, (re.sub(regex, "", token) for token in tokens))
-    ngrams = list(nltk.ngrams(tokens, n))
-    if not return_tuples:
-        ngrams = [ NGram(*tokens) for tokens in ngrams ]
-    return ngrams
+        tokens = list(filter(
+            bool, (RE_NON_ALPHABETIC.sub("", token) for token in tokens)
+        ))
+    ngrams = zip(*(tokens[index:] for index in range(n)))
+    if return_tuples:
+        return list(ngrams)
+    return [ intern_ngram(tokens) for tokens in ngrams ]
 
 
 def cos_similarity(a, b):
     '''Calculate cos similarity between two iterables.'''
-    return len(set(a) & set(b)) / (math.sqrt(len(set(a))) * math.sqrt(len(set(b))))
\ No newline at end of file
+    return len(set(a) & set(b)) / (math.sqrt(len(set(a))) * math.sqrt(len(set(b))))
+
+
+class CosSimilarityIndex:
+    '''
+    Collection of token sets for calculating cos similarity between a query
+    and all the sets at once. The sets are stored as sparse token-incidence 
+    matrix (for every token - array of sets containing the token).
+    '''
+
+    def __init__(self, collection):
+        self.tokens_ids = dict()
+        postings = list()
+        sizes = list()
+        for index, tokens in enumerate(collection):
+            tokens = set(tokens)
+            sizes.append(len(tokens))
+            for token in tokens:
+                token_id = self.tokens_ids.setdefault(token, len(postings))
+                if token_id == len(postings):
+                    postings.append(list())
+                postings[token_id].append(index)
+        self.postings = [ np.array(item, dtype=np.intp) for item in postings ]
+        self.sqrt_sizes = np.sqrt(np.array(sizes, dtype=np.float64))
+
+    def __len__(self):
+        return len(self.sqrt_sizes)
+
+    def count_common(self, tokens):
+        '''Return array with numbers of tokens common with every set.'''
+        postings = [
+            self.postings[self.tokens_ids[token]] 
+            for token in tokens if token in self.tokens_ids
+        ]
+        if not postings:
+            return np.zeros(len(self), dtype=np.intp)
+        return np.bincount(np.concatenate(postings), minlength=len(self))
+
+    def similarity(self, tokens, common=None):
+        '''
+        Return array with cos similarity between tokens and every set. The
+        numbers of common tokens can be given when already known.
+        '''
+        tokens = set(tokens)
+        if common is None:
+            common = self.count_common(tokens)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            csims = common / (self.sqrt_sizes * math.sqrt(len(tokens)))
+        csims[self.sqrt_sizes == 0] = 0 # empty sets are not similar
+        return csims
@@ -0,0 +1,99 @@
+'''
+Pages of documents stored in page-indexed files opened with mmap. The file
+consists of a header, a table of offsets of pages in the UTF-8 blob, a table
+of the first rows of pages (prefix sums of numbers of rows) and pickled
+metadata of the document (file_info of PDF), followed by the blob. Pages are
+decoded on access, so only the requested pages are loaded into memory.
+'''
+from collections.abc import Sequence
+import pickle
+import struct
+import mmap
+import os
+
+import numpy as np
+
+
+class PageStore(Sequence):
+    '''
+    Read-only sequence of pages (str) of the document in the file created
+    with PageStore.write.
+    '''
+    MAGIC = b"RPAGES01"
+    HEADER = struct.Struct("<8sQQ") # magic, number of pages, metadata size
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, meta_size = self.HEADER.unpack_from(self.mmap)
+        if magic != self.MAGIC:
+            self.mmap.close()
+            raise ValueError("'{}' is not a file of pages".format(path))
+        offset = self.HEADER.size
+        self.offsets = np.frombuffer(
+            self.mmap, dtype="<u8", count=count + 1, offset=offset
+        )
+        offset += self.offsets.nbytes
+        self.first_rows = np.frombuffer(
+            self.mmap, dtype="<u8", count=count + 1, offset=offset
+        )
+        offset += self.first_rows.nbytes
+        self.file_info = pickle.loads(self.mmap[offset:offset + meta_size])
+        self.blob_offset = offset + meta_size
+
+    @classmethod
+    def write(cls, path, pages, file_info=None, newline="\n"):
+        '''
+        Write pages (iterable of str) and file_info into the file (replaced
+        atomically) and return PageStore of the file.
+        '''
+        blobs = [ page.encode("utf-8") for page in pages ]
+        offsets = np.zeros(len(blobs) + 1, dtype="<u8")
+        np.cumsum([ len(blob) for blob in blobs ], out=offsets[1:])
+        first_rows = np.zeros(len(blobs) + 1, dtype="<u8")
+        np.cumsum(
+            [ blob.count(newline.encode("utf-8")) + 1 for blob in blobs ],
+            out=first_rows[1:]
+        )
+        meta = pickle.dumps(file_info, protocol=pickle.HIGHEST_PROTOCOL)
+
+        temp_path = "{}.{}.tmp".format(path, os.getpid())
+        with open(temp_path, "wb") as file:
+            file.write(cls.HEADER.pack(cls.MAGIC, len(blobs), len(meta)))
+            file.write(offsets.tobytes())
+            file.write(first_rows.tobytes())
+            file.write(meta)
+            for blob in blobs:
+                file.write(blob)
+        os.replace(temp_path, path)
+        return cls(path)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [ self[page] for page in range(*index.indices(len(self))) ]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("page index out of range")
+        start = self.blob_offset + int(self.offsets[index])
+        end = self.blob_offset + int(self.offsets[index + 1])
+        return self.mmap[start:end].decode("utf-8")
+
+    def get_first_row(self, page):
+        '''Return document-level number of the first row of the page.'''
+        return int(self.first_rows[page])
+
+    def close(self):
+        # arrays share the buffer of mmap, release them before closing
+        self.offsets = self.first_rows = None
+        self.mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,17 +1,18 @@
 import collections
-from collections import namedtuple
+from collections import namedtuple, deque
 from functools import reduce
 import operator
 from datetime import date, timedelta
 import abc
 
+import numpy as np
+
 
 Timeframe = namedtuple("Timeframe", field_names="start, end")
 TimeframeSpec = namedtuple("TimeframeSpec", field_names="spec, timeframe")
 Record = namedtuple("Record", field_names="spec, value, synthetic")
 
 
-from rparser.utils import concatenate_lists
 from rparser.specs import formulas as fspec
 
 
@@ -183,44 +184,61 @@ def create_inverted_mapping(formulas):
     
     
 def create_synthetic_records(spec, dataset, formulas, exclude=None):
+    '''
+    Create records from calculable formulas involving the spec, then records
+    from formulas involving created records and so on. Records are created 
+    in depth-first order with the stack instead of recursion, so long chains
+    of formulas do not hit the recursion limit. Every branch excludes the 
+    specs of its path and the components of formulas used on the path.
+    '''
     exclude = set() if exclude is None else set(exclude)
-    if spec in exclude: return list()
-
-    # Filter all formulas involving the spec.
-    record_formulas = formulas.get(spec, None)
-    if not record_formulas: return list()
-
-    # Filter calculable formulas which output is not present in data
-    calculable_formulas = [ 
-        formula for formula in record_formulas 
-        if formula.is_calculable(dataset) \
-           and (not dataset.exists(formula.spec) 
-                or dataset.is_synthetic(formula.spec)) \
-           and not formula.spec in exclude
-    ]
-
-    if len(calculable_formulas) == 0: return list()
+    synthetic_records = list()
+    stack = [ (spec, None) ]
+    while stack:
+        spec, added = stack.pop()
+        if added is not None: # branch of the spec is done
+            exclude.difference_update(added)
+            continue
+        if spec in exclude: continue
+
+        # Filter all formulas involving the spec.
+        record_formulas = formulas.get(spec, None)
+        if not record_formulas: continue
+
+        # Filter calculable formulas which output is not present in data
+        calculable_formulas = [ 
+            formula for formula in record_formulas 
+            if not formula.spec in exclude \
+               and formula.is_calculable(dataset) \
+               and (not dataset.exists(formula.spec) 
+                    or dataset.is_synthetic(formula.spec))
+        ]
+        if len(calculable_formulas) == 0: continue
+
+        # Create synthetic records
+        records = [
+            Record(spec=formula.spec, value=formula.calculate(dataset), 
+                   synthetic=False)
+            for formula in calculable_formulas 
+        ]
+
+        # Exclude formulas' components for potential recalculation in the 
+        # branch, they are removed from exclude when the branch is done.
+        added = set(
+            item.spec for formula in calculable_formulas 
+                      for item in formula.rhs
+        )
+        added.add(spec)
+        added.difference_update(exclude)
+        exclude.update(added)
+        stack.append((spec, added))
 
-    # Create synthetic records
-    synthetic_records = [
-        Record(spec=formula.spec, value=formula.calculate(dataset), 
-               synthetic=False)
-        for formula in calculable_formulas 
-    ]
+        dataset.insert(records)
+        synthetic_records.extend(records)
 
-    exclude.update( # exclude formulas' components for potential recalculation
-        item.spec for formula in calculable_formulas for item in formula.rhs
-    )
-    exclude.add(spec)
-    dataset.insert(synthetic_records)
+        # Create synthetic records for newly created records (in order)
+        stack.extend((record.spec, None) for record in reversed(records))
 
-    # Create synthetic records for newly created records
-    synthetic_records_2nd = concatenate_lists(
-        create_synthetic_records(record.spec, dataset, formulas, exclude)
-        for record in synthetic_records
-    )
-
-    synthetic_records.extend(synthetic_records_2nd)
     return synthetic_records
     
     
@@ -265,4 +283,91 @@ def create_pit_formulas(base_formulas):
     formulas = remove_duplicate_formulas(formulas)
     return formulas    
     
+    
+class FormulasArray:
+    '''
+    Formulas compiled for computing synthetic values of many entities (e.g.
+    companies and fiscal years) at once. Values are kept in array (entities 
+    x specs, see columns) with NaN for missing values, every formula is 
+    applied to all entities as a single vector operation.
+    '''
+
+    def __init__(self, formulas):
+        self.columns = collections.OrderedDict() # spec -> column
+        self.formulas = list() # (target, components, signs)
+        for formula in remove_duplicate_formulas(formulas):
+            self.formulas.append((
+                self.get_column(formula.spec),
+                np.array(
+                    [ self.get_column(item.spec) for item in formula ], 
+                    dtype=np.intp
+                ),
+                np.array([ item.sign for item in formula ], dtype=np.float64)
+            ))
+        # formulas using the column as component and formulas of the column
+        self.dependants = [ list() for _ in self.columns ]
+        self.producers = [ list() for _ in self.columns ]
+        for index, (target, components, _) in enumerate(self.formulas):
+            self.producers[target].append(index)
+            for column in set(components):
+                self.dependants[column].append(index)
+
+    def get_column(self, spec):
+        return self.columns.setdefault(spec, len(self.columns))
+
+    def create_array(self, entities):
+        '''Return array of values with all values missing.'''
+        return np.full((entities, len(self.columns)), np.nan)
+
+    def get_downstream(self, columns):
+        '''
+        Return set of columns computed (directly or indirectly) from values
+        of the columns.
+        '''
+        downstream, stack = set(), list(columns)
+        while stack:
+            for index in self.dependants[stack.pop()]:
+                target = self.formulas[index][0]
+                if target not in downstream:
+                    downstream.add(target)
+                    stack.append(target)
+        return downstream
+
+    def compute(self, values, columns=None):
+        '''
+        Compute missing values of the array (in place) until no new values 
+        appear. Formulas are evaluated from the queue, a formula is queued 
+        again only when new values of its components appear. When columns
+        are given, only formulas of the columns are queued at the beginning
+        (values of other columns are not recomputed unless new values of 
+        their components appear). Return mask of computed values.
+        '''
+        missing = np.isnan(values)
+        if columns is None:
+            queue = deque(range(len(self.formulas)))
+        else:
+            queue = deque(sorted(set(
+                index for column in columns for index in self.producers[column]
+            )))
+        queued = np.zeros(len(self.formulas), dtype=bool)
+        queued[list(queue)] = True
+        while queue:
+            index = queue.popleft()
+            queued[index] = False
+            target, components, signs = self.formulas[index]
+
+            rows = np.flatnonzero(np.isnan(values[:, target]))
+            if len(rows) == 0: continue
+            inputs = values[np.ix_(rows, components)]
+            calculable = ~np.isnan(inputs).any(axis=1)
+            if not calculable.any(): continue
+
+            values[rows[calculable], target] = inputs[calculable].dot(signs)
+            for dependant in self.dependants[target]:
+                if not queued[dependant]:
+                    queued[dependant] = True
+                    queue.append(dependant)
+
+        return missing & ~np.isnan(values)
+    
 ################################################################################    
\ No newline at end of file
@@ -1,8 +1,11 @@
 from collections import Counter
 from calendar import monthrange
-from functools import reduce
+from functools import reduce, lru_cache
+from concurrent import futures
 import subprocess
 import importlib
+import threading
+import tempfile
 import itertools
 import operator
 import numbers
@@ -10,8 +13,11 @@ import inspect
 import ctypes
 import imp
 import sys
+import os
 import re
 
+import numpy as np
+
 
 RE_NUMBER = re.compile(
     r"^(?:\+|-|\()?(?: )?\d+(?:(?: |\.)\d{3})*(?:[,]\d+)?(?:\))?$"
@@ -40,23 +46,91 @@ def load_module(name, attach = False, force_reload = True):
 
 
 def read_pdf(path, layout=True, first_page=None, last_page=None,
-             encoding=None):
-    '''Run pdftotext command and intercept output & errors.''' 
+             encoding=None, timeout=None, max_size=None):
+    '''
+    Run pdftotext command and intercept output & errors. The process is 
+    killed when it runs longer than timeout (seconds) or its output exceeds
+    max_size (bytes).
+    ''' 
     args = ["pdftotext", path, "-"]
     if layout: args.append("-layout")
     if first_page: args.extend(("-f", str(first_page)))
     if last_page: args.extend(("-l", str(last_page)))
     if encoding: args.extend(("-enc", encoding))
 
-    proc = subprocess.Popen(
-        args, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-    )
-    output, errors = proc.communicate()
+    with tempfile.TemporaryFile() as errors_file:
+        proc = subprocess.Popen(
+            args, stdout=subprocess.PIPE, stderr=errors_file
+        )
+        timed_out = threading.Event()
+        def kill():
+            timed_out.set()
+            proc.kill()
+        timer = threading.Timer(timeout, kill) if timeout else None
+        if timer: timer.start()
+
+        chunks, size = list(), 0
+        try:
+            for chunk in iter(lambda: proc.stdout.read(2**16), b""):
+                size += len(chunk)
+                if max_size and size > max_size:
+                    proc.kill()
+                    raise OSError(
+                        "pdftotext output exceeds {} bytes".format(max_size)
+                    )
+                chunks.append(chunk)
+        finally:
+            proc.stdout.close()
+            proc.wait()
+            if timer: timer.cancel()
+
+        errors_file.seek(0)
+        errors = errors_file.read()
+
+    if timed_out.is_set():
+        raise OSError("pdftotext timed out after {}s".format(timeout))
 
     if proc.returncode != 0:
         raise OSError(errors.decode("utf-8"))
 
-    return output, errors
+    return b"".join(chunks), errors
+
+
+def read_pdf_pages(path, pages_count, pages_per_task=4, workers=None,
+                   timeout=None, max_size=None, **kwargs):
+    '''
+    Run pdftotext on ranges of pages (-f/-l) in parallel and yield outputs
+    of the ranges in order, as soon as they are ready. Concatenated outputs
+    are equal to the output of read_pdf. The timeout is given per page, 
+    max_size limits the size of the whole output.
+    '''
+    ranges = [ 
+        (first, min(first + pages_per_task - 1, pages_count))
+        for first in range(1, pages_count + 1, pages_per_task)
+    ]
+    # pdftotext runs in subprocesses, threads only wait for them
+    with futures.ThreadPoolExecutor(workers or os.cpu_count()) as executor:
+        tasks = [
+            executor.submit(
+                read_pdf, path, first_page=first, last_page=last, 
+                timeout=timeout and timeout * (last - first + 1),
+                max_size=max_size, **kwargs
+            )
+            for first, last in ranges
+        ]
+        try:
+            size = 0
+            for task in tasks:
+                output, _ = task.result()
+                size += len(output)
+                if max_size and size > max_size:
+                    raise OSError(
+                        "pdftotext output exceeds {} bytes".format(max_size)
+                    )
+                yield output
+        finally:
+            for task in tasks:
+                task.cancel()
 
 
 def pdfinfo(path, encoding=None, convert_dates=True):
@@ -89,175 +163,241 @@ def pdfinfo(path, encoding=None, convert_dates=True):
 
 def remove_non_ascii(string):
     ''' Return the string without non ASCII characters.'''
-    stripped = (c for c in string if 0 < ord(c) < 127)
-    return ''.join(stripped)
+    string = string.encode("ascii", "ignore").decode("ascii")
+    return string.replace("\x00", "").replace("\x7f", "")
 
 
-def find_dates(text, re_days=r"\b(01|1|28|29|30|31)", all_days=False):
-    '''Find all dates in the text.'''
-
-    if all_days:
-        re_days = r"\b\d{1,2}" #(0[1-9]|[12]\d|3[01])
-
-    quarters = {"i": 3, "ii": 6, "iii": 9, "iv": 12}
-    months = {"stycznia": 1, "lutego": 2, "marca": 3, "kwietnia": 4, 
-              "maja": 5, "czerwca": 6, "lipca": 7, "sierpnia": 8,
-              "wrzenia": 9, "września": 9, "padziernika": 10, 
-              "października": 10, "listopada": 11, "grudnia": 12}
-
-    re_date_with_full_month = re.compile(
-        re_days + r" (stycznia|lutego|marca|kwietnia|maja|czerwca|"
-         r"lipca|sierpnia|wrze(?:ś)?nia|pa(?:ź)?dziernika|listopada|grudnia) "
-         r"((?:19|20)\d{2})\b", flags = re.IGNORECASE
-    )
-    re_quarter = re.compile(
-        r"\b(I|II|III|IV) kw(?:\.|arta)?(?:ł)?(?:y)? (\d+)\b", flags=re.IGNORECASE
-    )
-    re_date_day_month_year = re.compile(
-        re_days + r"(?:\.|-)(1[0-2]|0[1-9])(?:\.|-)((?:19|20)\d{2})\b"
-    )
-    re_date_year_month_day = re.compile(
-        r"\b((?:19|20)\d{2})(?:\.|-){1}(1[0-2]|0[1-9])(?:\.|-){1}\b" + re_days
-    )
-    re_day_and_full_month = re.compile(
-        re_days + r" (stycznia|lutego|marca|kwietnia|maja|czerwca|"
-         r"lipca|sierpnia|wrze(?:ś)?nia|pa(?:ź)?dziernika|listopada|grudnia)\b", 
-         flags = re.IGNORECASE
-    )
-    re_full_month_and_year = re.compile(
-        r"\b(stycznia|lutego|marca|kwietnia|maja|czerwca|"
-        r"lipca|sierpnia|wrze(?:ś)?nia|pa(?:ź)?dziernika|listopada|grudnia) "
-        r"((?:19|20)\d{2})\b", flags = re.IGNORECASE
-    )
-    re_day_and_month = re.compile(re_days + r"(?:\.|-)(1[0-2]|0[1-9])\b")
-    re_month_and_year = re.compile(r"\b(1[0-2]|0[1-9])(?:\.|-)((?:19|20)\d{2})\b")
-    re_year = re.compile(r"((?:19|20)\d{2})\b")
-
-    timestamps = list()
-
-    # Match [za] I/II/III/IV kwartał 2016 [roku]
-    match_dates = re.finditer(re_quarter, text)
-    for match_date in match_dates:
-        quarter, year = match_date.groups()
-        try:
-            timestamps.append(((
-                int(year), quarters[quarter.lower()], 
-                monthrange(int(year), quarters[quarter.lower()])[-1]
-            ), match_date.span(), 1))
-        except ValueError:
-            pass # ignore erros in dates
-    else:
-        text = re.sub(re_quarter, "", text) # remove from text
+RE_DEFAULT_DAYS = r"\b(01|1|28|29|30|31)"
+RE_ALL_DAYS = r"\b(\d{1,2})" #(0[1-9]|[12]\d|3[01])
 
-    # Match '30 września 2016 roku'
-    match_dates = re.finditer(re_date_with_full_month, text)
-    for match_date in match_dates:
-        day, month, year = match_date.groups()
-        try:
-            timestamps.append(((
-                int(year), months[month.lower()], int(day)
-            ), match_date.span(), 1))
-        except ValueError:
-            pass # ignore errors in dates
-    else:
-        text = re.sub(re_date_with_full_month, "", text) # remove from text
+QUARTERS = {"i": 3, "ii": 6, "iii": 9, "iv": 12}
+MONTHS = {"stycznia": 1, "lutego": 2, "marca": 3, "kwietnia": 4, 
+          "maja": 5, "czerwca": 6, "lipca": 7, "sierpnia": 8,
+          "wrzenia": 9, "września": 9, "padziernika": 10, 
+          "października": 10, "listopada": 11, "grudnia": 12}
 
-    # Match 30.06.2016
-    match_dates = re.finditer(re_date_day_month_year, text)
-    for match_date in match_dates:
-        day, month, year = match_date.groups()
-        try:
-            timestamps.append((
-                (int(year), int(month), int(day)),
-                match_date.span(), 1
-            ))
-        except ValueError:
-            pass # ignore errors in dates
-    else:
-        text = re.sub(re_date_day_month_year, "", text) # remove from text
+RE_FULL_MONTHS = (
+    r"(stycznia|lutego|marca|kwietnia|maja|czerwca|"
+    r"lipca|sierpnia|wrze(?:ś)?nia|pa(?:ź)?dziernika|listopada|grudnia)"
+)
 
-    # Match 2016-03-31
-    match_dates = re.finditer(re_date_year_month_day, text)
-    for match_date in match_dates:
-        year, month, day = match_date.groups()
-        try:
-            timestamps.append((
-                (int(year), int(month), int(day)),
-                match_date.span(), 1
-            ))
-        except ValueError:
-            pass # ignore errors in dates
-    else:
-        text = re.sub(re_date_year_month_day, "", text) # remove from text
 
-    # Match '30 września'
-    match_dates = re.finditer(re_day_and_full_month, text)
-    for match_date in match_dates:
-        day, month = match_date.groups()
-        try:
-            timestamps.append(
-                ((None, months[month.lower()], int(day)), 
-                 match_date.span(), 0)
-            )
-        except ValueError:
-            pass # ignore errors in dates
-    else:
-        text = re.sub(re_day_and_full_month, "", text) # remove from text
+class DateScanner:
+    '''
+    Find dates, quarters and periods in the text. The regular expressions
+    are compiled once, use get_date_scanner to share the scanner.
+
+    The forms are searched in the order of their reliability (e.g. 
+    'I kwartał 2016' before '30.06.2016' before '2016') and every matched 
+    form is removed from the text before the next one is searched. None of
+    the forms can span a newline, so the removal never affects other lines.
+    It allows to find candidate lines with a single pass of RE_CANDIDATES
+    and run the ordered search only within them.
+    '''
 
-    # Match 01.01
-    match_dates = re.finditer(re_day_and_month, text)
-    for match_date in match_dates:
-        day, month = match_date.groups()
-        try:
-            timestamps.append(
-                ((None, int(month), int(day)), match_date.span(), 0)
-            )
-        except ValueError:
-            pass # ignore errors in dates
-    else:
-        text = re.sub(re_day_and_month, "", text) # remove from text
+    # Every form contains one of these (re_days has to end with digit). 
+    # The lookahead speeds up the search for the first char of alternatives.
+    RE_CANDIDATES = re.compile(
+        r"(?=[\dIiVvSsLlMmKkCcWwPpGg])(?:[12]\d{3}\b|\d[.-][01]\d\b|"
+        r"(?i:\b[iv]{1,3} kw|\b(?:sty|lut|mar|kwi|maj|cze|lip|sie|wrz|pa|"
+        r"lis|gru)))"
+    )
 
-    # Match 'czerwca 2016'
-    match_dates = re.finditer(re_full_month_and_year, text)
-    for match_date in match_dates:
-        month, year = match_date.groups()
-        try:
-            timestamps.append((
-                (int(year), months[month.lower()], None), match_date.span(), 0)
-            )
-        except ValueError:
-            pass # ignore errors in dates
-    else:
-        text = re.sub(re_full_month_and_year, "", text) # remove from text
+    def __init__(self, re_days=RE_DEFAULT_DAYS):
+        self.re_days = re_days
+        self.forms = [
+            # Match [za] I/II/III/IV kwartał 2016 [roku]
+            (re.compile(
+                r"\b(I|II|III|IV) kw(?:\.|arta)?(?:ł)?(?:y)? (\d+)\b", 
+                flags=re.IGNORECASE
+             ), self._convert_quarter, 1),
+            # Match '30 września 2016 roku'
+            (re.compile(
+                re_days + " " + RE_FULL_MONTHS + r" ((?:19|20)\d{2})\b",
+                flags=re.IGNORECASE
+             ), self._convert_day_full_month_year, 1),
+            # Match 30.06.2016
+            (re.compile(
+                re_days + r"(?:\.|-)(1[0-2]|0[1-9])(?:\.|-)((?:19|20)\d{2})\b"
+             ), self._convert_day_month_year, 1),
+            # Match 2016-03-31
+            (re.compile(
+                r"\b((?:19|20)\d{2})(?:\.|-){1}(1[0-2]|0[1-9])(?:\.|-){1}\b" 
+                + re_days
+             ), self._convert_year_month_day, 1),
+            # Match '30 września'
+            (re.compile(
+                re_days + " " + RE_FULL_MONTHS + r"\b", flags=re.IGNORECASE
+             ), self._convert_day_full_month, 0),
+            # Match 01.01
+            (re.compile(re_days + r"(?:\.|-)(1[0-2]|0[1-9])\b"),
+             self._convert_day_month, 0),
+            # Match 'czerwca 2016'
+            (re.compile(
+                r"\b" + RE_FULL_MONTHS + r" ((?:19|20)\d{2})\b", 
+                flags=re.IGNORECASE
+             ), self._convert_full_month_year, 0),
+            # Match 01.2001 (month - year)
+            (re.compile(r"\b(1[0-2]|0[1-9])(?:\.|-)((?:19|20)\d{2})\b"),
+             self._convert_month_year, 0),
+            # Match '2016'
+            (re.compile(r"((?:19|20)\d{2})\b"), self._convert_year, 0)
+        ]
+
+    def scan(self, text):
+        '''
+        Return list of tuples (timestamp, span, flag) in order compliant with 
+        their occurence in the text. Spans refer to the text with all forms 
+        searched earlier removed.
+        '''
+        timestamps = list()
+        removed = [0] * len(self.forms) # chars removed in preceding lines
+
+        line_end = -1
+        for match in self.RE_CANDIDATES.finditer(text):
+            if match.start() < line_end: 
+                continue # the line has been already scanned
+            line_start = text.rfind("\n", 0, match.start()) + 1
+            line_end = text.find("\n", match.end())
+            if line_end < 0:
+                line_end = len(text)
+
+            line = text[line_start:line_end]
+            shift = line_start
+            for index, (regex, convert, flag) in enumerate(self.forms):
+                chunks = list()
+                last_end = 0
+                for match_date in regex.finditer(line):
+                    start, end = match_date.span()
+                    try:
+                        timestamps.append((
+                            (convert(match_date.groups()), 
+                             (shift + start, shift + end), flag),
+                            index
+                        ))
+                    except ValueError:
+                        pass # ignore errors in dates
+                    chunks.append(line[last_end:start])
+                    last_end = end
+                # The next form is searched in the text without this form.
+                shift -= removed[index]
+                if chunks: # remove from text
+                    chunks.append(line[last_end:])
+                    new_line = "".join(chunks)
+                    removed[index] += len(line) - len(new_line)
+                    line = new_line
+
+        # Return timestams in order compliant with their occurence.
+        timestamps.sort(key=lambda item: (item[0][1][0], item[1]))
+        return [ timestamp for timestamp, _ in timestamps ]
+
+    @staticmethod
+    def _convert_quarter(groups):
+        quarter, year = groups
+        month = QUARTERS[quarter.lower()]
+        return (int(year), month, monthrange(int(year), month)[-1])
+
+    @staticmethod
+    def _convert_day_full_month_year(groups):
+        day, month, year = groups
+        return (int(year), MONTHS[month.lower()], int(day))
+
+    @staticmethod
+    def _convert_day_month_year(groups):
+        day, month, year = groups
+        return (int(year), int(month), int(day))
+
+    @staticmethod
+    def _convert_year_month_day(groups):
+        year, month, day = groups
+        return (int(year), int(month), int(day))
+
+    @staticmethod
+    def _convert_day_full_month(groups):
+        day, month = groups
+        return (None, MONTHS[month.lower()], int(day))
+
+    @staticmethod
+    def _convert_day_month(groups):
+        day, month = groups
+        return (None, int(month), int(day))
+
+    @staticmethod
+    def _convert_full_month_year(groups):
+        month, year = groups
+        return (int(year), MONTHS[month.lower()], None)
+
+    @staticmethod
+    def _convert_month_year(groups):
+        month, year = groups
+        return (int(year), int(month), None)
+
+    @staticmethod
+    def _convert_year(groups):
+        return (int(groups[0]), None, None)
+
+
+@lru_cache(maxsize=None)
+def get_date_scanner(re_days=RE_DEFAULT_DAYS):
+    '''Return DateScanner shared by all calls with the same re_days.'''
+    return DateScanner(re_days)
+
+
+def find_dates(text, re_days=RE_DEFAULT_DAYS, all_days=False):
+    '''Find all dates in the text.'''
+    if all_days:
+        re_days = RE_ALL_DAYS
+    return get_date_scanner(re_days).scan(text)
 
-    # Match 01.2001 (month - year)
-    match_dates = re.finditer(re_month_and_year, text)
-    for match_date in match_dates:
-        month, year = match_date.groups()
-        try:
-            timestamps.append((
-                (int(year), int(month), None), match_date.span(), 0)
-            )
-        except ValueError:
-            pass # ignore errors in dates
-    else:
-        text = re.sub(re_month_and_year, "", text) # remove from text
 
-    # Match '2016'
-    match_dates = re.finditer(re_year, text)
-    for match_date in match_dates:
-        year = match_date.groups()
-        try:
-            timestamps.append((
-                (int(year[0]), None, None), match_date.span(), 0)
-            )
-        except ValueError:
-            pass # ignore errors in dates
-    else:
-        text = re.sub(re_year, "", text) # remove from text
+TIMERANGE_QUARTERS = {"i": 3, "ii": 6, "iii": 9, "iv": 12, "1": 3, "2": 6,
+                      "3": 9, "4": 12}
 
-    # Return timestams in order compliant with their occurence.
-    return sorted(timestamps, key=lambda item: item[1][0])
+# Match IV kwartały
+RE_TR_QUARTERS = re.compile(
+    r"(I|II|III|IV|1|2|3|4) +kwarta(?:[łl])?y +(?:(?:19|20)\d{2})", 
+    flags=re.IGNORECASE
+)
+# Match IV kwartał
+RE_TR_QUARTER = re.compile(
+    r"(I|II|III|IV|1|2|3|4) +kw(?:\.|arta)?(?:ł)?", 
+    flags=re.IGNORECASE
+)
+# Match Rok 2015
+RE_TR_YEAR = re.compile(
+    r"(?:Rok) *(?:(?:19|20)\d{2})", 
+    flags=re.IGNORECASE
+)
+# Match Polrocze 2015
+RE_TR_MIDYEAR = re.compile(
+    r"(?:P(?:ó)?(?:ł)?rocze) */? *(?:(?:19|20)\d{2})", 
+    flags=re.IGNORECASE
+)
+RE_TR_MONTHS = re.compile(
+    "(0?[1-9]|1[0-2]) miesi(?:[eęaą])?c(?:y|e)", flags=re.IGNORECASE
+)
+RE_TR_YEAR_ENDED = re.compile("Rok zako(?:ń)?czony", flags=re.IGNORECASE)
+# Match 01.01.2016 - 31.12.2016
+RE_TR_TIMERANGE = re.compile(
+    r"(?:(0[1-9]|[12]\d|3[01])(?:\.|-))?(0[1-9]|1[0-2])"
+    r"(?:(?:\.|-)((?:19|20)\d{2}))? *(?:roku)? *(?:do|-) *(0[1-9]|[12]\d|3[01])"
+    r"(?:\.|-)(0[1-9]|1[0-2])(?:(?:\.|-)((?:19|20)\d{2}))? *(?:roku)?",
+    flags=re.IGNORECASE
+)
+# Match 2016-01-01 - 2016-12-31
+RE_TR_TIMERANGE_2 = re.compile(
+    r"((?:19|20)\d{2})(?:\.|-)(0[1-9]|1[0-2])(?:\.|-)(0[1-9]|[12]\d|3[01])"
+    r" *(?:do|-) *((?:19|20)\d{2})(?:\.|-)(0[1-9]|1[0-2])(?:\.|-)"
+    r"(0[1-9]|[12]\d|3[01])",
+    flags=re.IGNORECASE
+)
+# Every timerange above contains one of these, allows to reject the text 
+# without timeranges at once.
+RE_TR_CANDIDATES = re.compile(
+    r"(?=[ivrd\d-])(?:[iv1-4] +kw|rok|rocze|\d miesi|"
+    r"(?:do|-) *(?:[0-3]\d[.-][01]|[12]\d{3}[.-]))",
+    flags=re.IGNORECASE
+)
 
 
 def determine_timerange(text):
@@ -268,63 +408,20 @@ def determine_timerange(text):
     tranges = list()
 
     text = text.lower() 
+    if not RE_TR_CANDIDATES.search(text):
+        return tranges
 
-    # Match IV kwartały
-    re_quarters = re.compile(
-        r"(I|II|III|IV|1|2|3|4) +kwarta(?:[łl])?y +(?:(?:19|20)\d{2})", 
-        flags=re.IGNORECASE
-    )
-
-    quarters = {"i": 3, "ii": 6, "iii": 9, "iv": 12, "1": 3, "2": 6,
-                "3": 9, "4": 12}
-
-    tranges.extend(quarters[q] for q in re.findall(re_quarters, text))
-
-    # Match IV kwartał
-    re_quarter = re.compile(
-        r"(I|II|III|IV|1|2|3|4) +kw(?:\.|arta)?(?:ł)?", 
-        flags=re.IGNORECASE
-    )
-    tranges.extend(3 for _ in re.findall(re_quarter, text))
-
-    # Match Rok 2015
-    re_year = re.compile(
-        r"(?:Rok) *(?:(?:19|20)\d{2})", 
-        flags=re.IGNORECASE
-    )
-    tranges.extend(12 for _ in re.findall(re_year, text))
-
-    # Match Polrocze 2015
-    re_midyear = re.compile(
-        r"(?:P(?:ó)?(?:ł)?rocze) */? *(?:(?:19|20)\d{2})", 
-        flags=re.IGNORECASE
-    )
-    tranges.extend(6 for _ in re.findall(re_midyear, text))
-
-    re_months = re.compile("(0?[1-9]|1[0-2]) miesi(?:[eęaą])?c(?:y|e)", flags=re.IGNORECASE)
-    tranges.extend(int(month) for month in re.findall(re_months, text))
-
-    re_year = re.compile("Rok zako(?:ń)?czony", flags=re.IGNORECASE)
-    tranges.extend(12 for _ in re.findall(re_year, text))
-
-    # Match 01.01.2016 - 31.12.2016
-    re_timerange = re.compile(
-        r"(?:(0[1-9]|[12]\d|3[01])(?:\.|-))?(0[1-9]|1[0-2])"
-        r"(?:(?:\.|-)((?:19|20)\d{2}))? *(?:roku)? *(?:do|-) *(0[1-9]|[12]\d|3[01])"
-        r"(?:\.|-)(0[1-9]|1[0-2])(?:(?:\.|-)((?:19|20)\d{2}))? *(?:roku)?",
-        flags=re.IGNORECASE
-    )
-
-    # Match 2016-01-01 - 2016-12-31
-    re_timerange_2 = re.compile(
-        r"((?:19|20)\d{2})(?:\.|-)(0[1-9]|1[0-2])(?:\.|-)(0[1-9]|[12]\d|3[01])"
-        r" *(?:do|-) *((?:19|20)\d{2})(?:\.|-)(0[1-9]|1[0-2])(?:\.|-)"
-        r"(0[1-9]|[12]\d|3[01])",
-        flags=re.IGNORECASE
+    tranges.extend(
+        TIMERANGE_QUARTERS[q] for q in re.findall(RE_TR_QUARTERS, text)
     )
+    tranges.extend(3 for _ in re.findall(RE_TR_QUARTER, text))
+    tranges.extend(12 for _ in re.findall(RE_TR_YEAR, text))
+    tranges.extend(6 for _ in re.findall(RE_TR_MIDYEAR, text))
+    tranges.extend(int(month) for month in re.findall(RE_TR_MONTHS, text))
+    tranges.extend(12 for _ in re.findall(RE_TR_YEAR_ENDED, text))
 
     for re_match in itertools.chain(
-        re.finditer(re_timerange, text), re.finditer(re_timerange_2, text)
+        re.finditer(RE_TR_TIMERANGE, text), re.finditer(RE_TR_TIMERANGE_2, text)
     ):
         text_part = text[re_match.span()[0]:(re_match.span()[1]+1)]
         dt1, dt2 = map(operator.itemgetter(0), find_dates(text_part))
@@ -352,6 +449,73 @@ def is_number(string, special_zeros=" -"):
     return string in special_zeros or bool(re.match(RE_NUMBER, string))
 
 
+RE_NUMBER_PARTS = re.compile(
+    r"^(\+|-|\()?(?: )?(\d+(?:(?: |\.)\d{3})*)(?:[,](\d+))?(?:\))?$"
+)
+
+
+@lru_cache(maxsize=2**16)
+def parse_number(text, decimal_mark=",", special_zeros=" -"):
+    '''
+    Convert string to number with single regex. Return float or None when
+    the string does not represent a number (see convert_to_number).
+    '''
+    if isinstance(text, numbers.Number):
+        return float(text)
+    if decimal_mark != ",": # RE_NUMBER supports only comma
+        number = convert_to_number(text, decimal_mark, special_zeros)
+        return None if number is None else float(number)
+
+    if text in special_zeros:
+        return 0.0
+    match = RE_NUMBER_PARTS.match(text)
+    if not match:
+        return None
+    sign, integral, fraction = match.groups()
+    number = int(integral.replace(" ", "").replace(".", ""))
+    number += float("." + fraction) if fraction else 0.0
+    return -number if sign in ("-", "(") else number
+
+
+def convert_to_numbers(cells, decimal_mark=",", special_zeros=" -"):
+    '''
+    Convert sequence of strings (e.g. column of table) into array of floats
+    (nan for strings not representing numbers) and mask of numbers.
+    '''
+    parsed = [ parse_number(cell, decimal_mark, special_zeros) 
+               for cell in cells ]
+    mask = np.fromiter(
+        (value is not None for value in parsed), dtype=bool, count=len(parsed)
+    )
+    values = np.fromiter(
+        (np.nan if value is None else value for value in parsed), 
+        dtype=np.float64, count=len(parsed)
+    )
+    return values, mask
+
+
+def convert_rows_to_numbers(rows, decimal_mark=",", special_zeros=" -"):
+    '''
+    Convert rows of table (e.g. UnevenTable) into two-dimensional array of
+    floats and mask of numbers. Rows are aligned to the left and padded with
+    nan (not numbers).
+    '''
+    lengths = np.fromiter(map(len, rows), dtype=np.intp)
+    width = int(lengths.max()) if len(lengths) else 0
+    cell_values, cell_mask = convert_to_numbers(
+        list(itertools.chain.from_iterable(rows)), decimal_mark, special_zeros
+    )
+
+    row_index = np.repeat(np.arange(len(lengths)), lengths)
+    col_index = np.arange(len(cell_values)) - \
+                    np.repeat(np.cumsum(lengths) - lengths, lengths)
+    values = np.full((len(lengths), width), np.nan)
+    values[row_index, col_index] = cell_values
+    mask = np.zeros((len(lengths), width), dtype=bool)
+    mask[row_index, col_index] = cell_mask
+    return values, mask
+
+
 def convert_to_number(text, decimal_mark=",", special_zeros=" -"):
     '''Convert string to number.'''
     if isinstance(text, numbers.Number):
@@ -394,48 +558,48 @@ def split_text_into_rows(text, newline="\n"):
 
 def split_text_into_columns(text):
     '''Split multiline text into columns.'''
-    # rows4split = list(filter(bool, text.split("\n")))
     rows4split = list(filter(bool, text.split("\n")))
 
     width = Counter(map(len, rows4split)).most_common(1)[0][0]
-    mrows = [ list(row + ' '*width)[:width] for row in rows4split ]
-    trows = list(map(list, zip(*mrows))) # transpose rows
-
-    wsdist = [ sum(1 for item in row if item == ' ') for row in trows ]
-    avg_wsdist = sum(wsdist) / len(wsdist)
-    wsmap = [ index for index, val in enumerate(wsdist) if val > avg_wsdist]
-
-    series = [[(wsmap[0], wsdist[wsmap[0]])]]
-    prev_ws = wsmap[0]
-    for ws in wsmap[1:]:
-        if prev_ws + 1 == ws:
-            series[-1].append((ws, wsdist[ws]))
-        else:
-            series.append([(ws, wsdist[ws])])
-        prev_ws = ws
-
-    series = [ sr for sr in series if len(sr) > 2 ]
-
-    wsbreaks = list()
-    for sr in series:
-        max_ws = max(map(operator.itemgetter(1), sr))
-        # mval = sr[round(len(sr)/2)][0]
-        # msr = [ (abs(val - mval), val) for val, ws in sr if max_ws - ws < 2 ]
-        # wsbreaks.append(min(msr, key=operator.itemgetter(0))[1])
-        msr = [ index for index, (pos, ws) in enumerate(sr) if max_ws - ws < 2 ]
-        index = max([
-            (index, (sr[index-1][1] if index > 1 else sr[index][1]) + 
-            sr[index][1] + 
-            (sr[index+1][1] if index+1 < len(sr) else sr[index][1]))
-            for index in msr
-        ], key=operator.itemgetter(1))[0]
-        wsbreaks.append(operator.itemgetter(index)(sr)[0])
+    # rows padded (or truncated) to the width as array of code points
+    chars = np.frombuffer(
+        "".join((row + ' '*width)[:width] for row in rows4split).\
+            encode("utf-32-le"),
+        dtype=np.uint32
+    ).reshape(len(rows4split), width)
+
+    wsdist = np.count_nonzero(chars == ord(' '), axis=0)
+    wsmap = np.flatnonzero(wsdist > wsdist.sum() / len(wsdist))
+    if not len(wsmap):
+        raise IndexError("no column with whitespaces above average")
+
+    # series of adjacent columns with whitespaces above average
+    new_series = np.concatenate(([True], np.diff(wsmap) != 1))
+    starts = np.flatnonzero(new_series)
+    lengths = np.diff(np.concatenate((starts, [len(wsmap)])))
+    series = np.cumsum(new_series) - 1
+    offset = np.arange(len(wsmap)) - starts[series]
+
+    # score columns with whitespaces of neighbours (the preceding one only 
+    # from the 3rd column of series), own whitespaces at the edges of series
+    ws = wsdist[wsmap]
+    prev_ws = np.where(offset > 1, wsdist[wsmap - 1], ws)
+    next_ws = np.where(
+        offset + 1 < lengths[series], 
+        wsdist[np.minimum(wsmap + 1, width - 1)], ws
+    )
+    max_ws = np.maximum.reduceat(ws, starts)[series]
+    score = np.where(max_ws - ws < 2, prev_ws + ws + next_ws, -1)
+
+    # the first column with the highest score in every series longer than 2
+    order = np.lexsort((offset, -score, series))
+    wsbreaks = wsmap[order[starts[lengths > 2]]].tolist()
 
     joincols = [[] for _ in range(len(wsbreaks)+1)]
+    breaks = sorted(set([0] + wsbreaks)) + [None]
+    bounds = list(enumerate(zip(breaks[:-1], breaks[1:])))
     for row in rows4split:
-        breaks = sorted(list(set([0] + wsbreaks))) + [None]
-        for index, (lb, ub) in enumerate(zip(breaks[:-1], breaks[1:])):
+        for index, (lb, ub) in bounds:
             joincols[index].append(row[lb:ub])
-    # cols = [ re.sub(" + ", " ", ' '.join(col)) for col in joincols ]
 
-    return joincols
\ No newline at end of file
+    return joincols
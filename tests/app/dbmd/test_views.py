@@ -695,9 +695,9 @@ class DBRequestViewTest(AppTestCase):
         self.assertFalse(main_request.executed)
 
     @create_and_login_user(role_name="Moderator", pass_user=True)
-    @mock.patch("db.models.Record.create_synthetic_records")
-    def test_accept_calls_create_synthetic_records(self, csr_mock, user):
-        csr_mock.return_value = list()
+    @mock.patch("db.adapters.rparser.update_synthetic_records")
+    def test_accept_calls_update_synthetic_records(self, usr_mock, user):
+        usr_mock.return_value = (0, 0, 0)
         company = create_company()
         rtype = create_rtype(ftype=create_ftype(name="ics"))
 
@@ -716,16 +716,21 @@ class DBRequestViewTest(AppTestCase):
             data=dict(action="accept", rowid=request.id)
         )
 
-        self.assertTrue(csr_mock.called)
+        self.assertTrue(usr_mock.called)
         
         record = db.session.query(models.Record).one()
-        self.assertEqual(csr_mock.call_args[0][0], db.session)
-        self.assertEqual(csr_mock.call_args[0][1][0].rtype_id, record.rtype_id)
+        self.assertEqual(usr_mock.call_args[0][0], db.session)
+        self.assertIn(
+            (record.company_id, record.rtype_id, record.timestamp, 
+             record.timerange),
+            usr_mock.call_args[0][1]
+        )
 
 
     @create_and_login_user(role_name="Moderator", pass_user=True)
-    @mock.patch("db.models.Record.create_synthetic_records")
-    def test_accept_does_not_call_crs_for_non_records(self, csr_mock, user):
+    @mock.patch("db.adapters.rparser.update_synthetic_records")
+    def test_accept_does_not_pass_non_records_to_usr(self, usr_mock, user):
+        usr_mock.return_value = (0, 0, 0)
         request = DBRequest(
             model="Student", user=user, action="create", 
             data=json.dumps({"name": "Python", "age": 17})
@@ -738,7 +743,7 @@ class DBRequestViewTest(AppTestCase):
             data=dict(action="accept", rowid=request.id)
         )
 
-        self.assertFalse(csr_mock.called)
+        self.assertFalse(usr_mock.call_args[0][1])
 
 
 class RecordFormulaViewFormTest(AppTestCase):
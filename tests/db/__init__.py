@@ -6,7 +6,7 @@ from db.core import SQLAlchemy
 class DbTestCase(unittest.TestCase):
 
     def setUp(self):
-        self.db = SQLAlchemy("sqlite:///:memory:")
+        self.db = SQLAlchemy("sqlite://")
         self.db.create_all()
 
     def tearDown(self):
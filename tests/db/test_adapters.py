@@ -7,7 +7,8 @@ from db.models import (
 from db.adapters.rparser import (
     convert_db_formula, convert_db_record, DictRecordsDataset,
     convert_db_records, convert_rparser_record,
-    project_timeframe_onto_fiscal_year, create_synthetic_records
+    project_timeframe_onto_fiscal_year, create_synthetic_records, FormulaPlan,
+    compute_synthetic_records, update_synthetic_records
 )
 import rparser.synthetic as rparser
 
@@ -185,4 +186,330 @@ class TestRParserAdapters(DbTestCase):
         
         self.assertEqual(len(records), 1)
         self.assertEqual(records[0].value, 1000)
-        self.assertIsInstance(records[0], rparser.Record)
\ No newline at end of file
+        self.assertIsInstance(records[0], rparser.Record)
+
+
+class FormulaPlanTest(DbTestCase):
+
+    def setUp(self):
+        super().setUp()
+        FormulaPlan.clear()
+        self.ta, self.ca, self.fa = create_rtypes(
+            self.db.session, timeframe=RecordType.PIT
+        ) 
+        self.formula = create_db_formula(
+            self.db.session, self.ta, ((1, self.ca), (1, self.fa))
+        )
+        company = create_company(self.db.session, name="TEST", isin="TEST#1")
+        self.records = [
+            Record(
+                rtype=rtype, company=company, value=value, timerange=0,
+                timestamp=date(2015, 12, 31)
+            ) for rtype, value in ((self.fa, 100), (self.ca, 900))
+        ]
+        self.db.session.add_all(self.records)
+        self.db.session.commit()
+
+    def create_synthetic_records(self, plan):
+        return create_synthetic_records(
+            self.records[1:], self.records, (self.formula,), plan
+        )
+
+    def test_plan_is_cached(self):
+        plan = FormulaPlan.get(self.db.session)
+        self.assertIs(FormulaPlan.get(self.db.session), plan)
+
+    def test_records_are_the_same_as_created_without_plan(self):
+        records = self.create_synthetic_records(
+            FormulaPlan.get(self.db.session)
+        )
+        self.assertEqual(records, self.create_synthetic_records(None))
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0].value, 1000)
+        self.assertIs(records[0].spec.spec, self.ta)
+
+    def test_plan_is_compiled_again_when_formula_is_edited(self):
+        plan = FormulaPlan.get(self.db.session)
+        self.formula.components[1].sign = -1
+        self.db.session.commit()
+
+        new_plan = FormulaPlan.get(self.db.session)
+        self.assertIsNot(new_plan, plan)
+        records = self.create_synthetic_records(new_plan)
+        self.assertEqual(records[0].value, 800)
+
+
+class ComputeSyntheticRecordsTest(DbTestCase):
+
+    def setUp(self):
+        super().setUp()
+        FormulaPlan.clear()
+        self.session = self.db.session
+        self.ta, self.ca, self.fa = create_rtypes(
+            self.session, timeframe=RecordType.PIT
+        )
+        create_db_formula(self.session, self.ta, ((1, self.ca), (1, self.fa)))
+        self.companies = [
+            create_company(self.session, name="TEST#{}".format(index), 
+                           isin="TEST#{}".format(index))
+            for index in range(2)
+        ]
+
+    def create_record(self, rtype, company, value, timestamp, timerange=0,
+                      synthetic=False):
+        record = Record(
+            rtype=rtype, company=company, value=value, timerange=timerange,
+            timestamp=timestamp, synthetic=synthetic
+        )
+        self.session.add(record)
+        self.session.commit()
+        return record
+
+    def get_value(self, rtype, company, timestamp, timerange=0):
+        return self.session.query(Record.value).filter_by(
+            rtype=rtype, company=company, timestamp=timestamp,
+            timerange=timerange
+        ).scalar()
+
+    def test_records_are_created_for_all_companies(self):
+        for company, value in zip(self.companies, (100, 200)):
+            self.create_record(self.ca, company, value, date(2015, 12, 31))
+            self.create_record(self.fa, company, 10, date(2015, 12, 31))
+
+        self.assertEqual(compute_synthetic_records(self.session), (2, 0))
+        self.session.commit()
+
+        for company, value in zip(self.companies, (110, 210)):
+            self.assertEqual(
+                self.get_value(self.ta, company, date(2015, 12, 31)), value
+            )
+        record = self.session.query(Record).filter_by(rtype=self.ta).first()
+        self.assertTrue(record.synthetic)
+
+    def test_records_are_the_same_as_created_for_base_records(self):
+        ca = self.create_record(self.ca, self.companies[0], 100, 
+                                date(2016, 6, 30))
+        fa = self.create_record(self.fa, self.companies[0], 10, 
+                                date(2016, 6, 30))
+        expected = create_synthetic_records(
+            (ca,), (ca, fa), self.ca.revformulas
+        )
+
+        compute_synthetic_records(self.session)
+        self.session.commit()
+
+        self.assertEqual(len(expected), 1)
+        self.assertEqual(
+            self.get_value(self.ta, self.companies[0], date(2016, 6, 30)),
+            expected[0].value
+        )
+
+    def test_timeframe_formulas_of_pot_records(self):
+        revenue = RecordType(
+            name="REVENUE", ftype=self.ta.ftype, timeframe=RecordType.POT
+        )
+        self.session.add(revenue)
+        company = self.companies[0]
+        self.create_record(revenue, company, 30, date(2015, 3, 31), 3)
+        self.create_record(revenue, company, 70, date(2015, 6, 30), 6)
+
+        compute_synthetic_records(self.session, companies=[company])
+        self.session.commit()
+
+        self.assertEqual(
+            self.get_value(revenue, company, date(2015, 6, 30), 3), 40
+        )
+
+    def test_only_changed_synthetic_records_are_updated(self):
+        company = self.companies[0]
+        self.create_record(self.ca, company, 100, date(2015, 12, 31))
+        self.create_record(self.fa, company, 10, date(2015, 12, 31))
+        self.create_record(
+            self.ta, company, 50, date(2015, 12, 31), synthetic=True
+        )
+        self.create_record(self.ca, company, 100, date(2014, 12, 31))
+        self.create_record(self.fa, company, 10, date(2014, 12, 31))
+        self.create_record(
+            self.ta, company, 110, date(2014, 12, 31), synthetic=True
+        )
+
+        self.assertEqual(compute_synthetic_records(self.session), (0, 1))
+        self.session.commit()
+
+        self.assertEqual(
+            self.get_value(self.ta, company, date(2015, 12, 31)), 110
+        )
+
+    def test_genuine_records_are_not_changed(self):
+        company = self.companies[0]
+        self.create_record(self.ca, company, 100, date(2015, 12, 31))
+        self.create_record(self.fa, company, 10, date(2015, 12, 31))
+        self.create_record(self.ta, company, 50, date(2015, 12, 31))
+
+        self.assertEqual(compute_synthetic_records(self.session), (0, 0))
+
+
+class UpdateSyntheticRecordsTest(DbTestCase):
+
+    def setUp(self):
+        super().setUp()
+        FormulaPlan.clear()
+        self.session = self.db.session
+        self.ta, self.ca, self.fa = create_rtypes(
+            self.session, timeframe=RecordType.PIT
+        )
+        create_db_formula(self.session, self.ta, ((1, self.ca), (1, self.fa)))
+        self.company = create_company(self.session, name="TEST", isin="TEST")
+
+    create_record = ComputeSyntheticRecordsTest.create_record
+    get_value = ComputeSyntheticRecordsTest.get_value
+
+    def add_record(self, rtype, value, timestamp, synthetic=False):
+        record = Record(
+            rtype=rtype, company=self.company, value=value, timerange=0,
+            timestamp=timestamp, synthetic=synthetic
+        )
+        self.session.add(record)
+        return record
+
+    def update(self):
+        self.session.flush()
+        result = Record.update_synthetic_records(self.session)
+        self.session.commit()
+        return result
+
+    def test_records_are_created_for_new_records(self):
+        Record.track_changes(self.session)
+        self.add_record(self.ca, 100, date(2015, 12, 31))
+        self.add_record(self.fa, 10, date(2015, 12, 31))
+
+        self.assertEqual(self.update(), (1, 0, 0))
+        self.assertEqual(
+            self.get_value(self.ta, self.company, date(2015, 12, 31)), 110
+        )
+
+    def test_records_are_updated_when_inputs_change(self):
+        Record.track_changes(self.session)
+        ca = self.add_record(self.ca, 100, date(2015, 12, 31))
+        self.add_record(self.fa, 10, date(2015, 12, 31))
+        self.update()
+
+        Record.track_changes(self.session)
+        ca.value = 200
+
+        self.assertEqual(self.update(), (0, 1, 0))
+        self.assertEqual(
+            self.get_value(self.ta, self.company, date(2015, 12, 31)), 210
+        )
+
+    def test_stale_records_are_deleted_when_inputs_are_deleted(self):
+        Record.track_changes(self.session)
+        self.add_record(self.ca, 100, date(2015, 12, 31))
+        fa = self.add_record(self.fa, 10, date(2015, 12, 31))
+        self.update()
+
+        Record.track_changes(self.session)
+        self.session.delete(fa)
+
+        self.assertEqual(self.update(), (0, 0, 1))
+        self.assertIsNone(
+            self.get_value(self.ta, self.company, date(2015, 12, 31))
+        )
+
+    def test_records_are_moved_with_inputs(self):
+        Record.track_changes(self.session)
+        ca = self.add_record(self.ca, 100, date(2015, 12, 31))
+        self.add_record(self.fa, 10, date(2015, 12, 31))
+        self.add_record(self.fa, 20, date(2014, 12, 31))
+        self.update()
+
+        Record.track_changes(self.session)
+        ca.timestamp = date(2014, 12, 31)
+
+        self.assertEqual(self.update(), (1, 0, 1))
+        self.assertIsNone(
+            self.get_value(self.ta, self.company, date(2015, 12, 31))
+        )
+        self.assertEqual(
+            self.get_value(self.ta, self.company, date(2014, 12, 31)), 120
+        )
+
+    def test_downstream_records_are_updated(self):
+        na = RecordType(
+            name="NET_ASSETS", ftype=self.ta.ftype, timeframe=RecordType.PIT
+        )
+        self.session.add(na)
+        create_db_formula(self.session, na, ((1, self.ta), (-1, self.ca)))
+        Record.track_changes(self.session)
+        ca = self.add_record(self.ca, 100, date(2015, 12, 31))
+        self.add_record(self.fa, 10, date(2015, 12, 31))
+        self.update()
+        self.assertEqual(
+            self.get_value(na, self.company, date(2015, 12, 31)), 10
+        )
+
+        Record.track_changes(self.session)
+        self.session.delete(ca)
+
+        self.assertEqual(self.update(), (0, 0, 2))
+
+    def test_other_fiscal_years_are_not_computed(self):
+        self.create_record(self.ca, self.company, 100, date(2014, 12, 31))
+        self.create_record(self.fa, self.company, 10, date(2014, 12, 31))
+        self.create_record(
+            self.ta, self.company, 50, date(2014, 12, 31), synthetic=True
+        )
+        Record.track_changes(self.session)
+        self.add_record(self.ca, 100, date(2015, 12, 31))
+        self.add_record(self.fa, 10, date(2015, 12, 31))
+
+        self.assertEqual(self.update(), (1, 0, 0))
+        self.assertEqual(
+            self.get_value(self.ta, self.company, date(2014, 12, 31)), 50
+        )
+
+    def test_genuine_records_are_not_changed(self):
+        Record.track_changes(self.session)
+        self.add_record(self.ca, 100, date(2015, 12, 31))
+        self.add_record(self.fa, 10, date(2015, 12, 31))
+        self.add_record(self.ta, 50, date(2015, 12, 31))
+
+        self.assertEqual(self.update(), (0, 0, 0))
+        self.assertEqual(
+            self.get_value(self.ta, self.company, date(2015, 12, 31)), 50
+        )
+
+    def test_changes_are_not_tracked_by_default(self):
+        self.add_record(self.ca, 100, date(2015, 12, 31))
+        self.add_record(self.fa, 10, date(2015, 12, 31))
+
+        self.assertEqual(self.update(), (0, 0, 0))
+
+    def test_tracking_ends_with_transaction(self):
+        Record.track_changes(self.session)
+        self.add_record(self.ca, 100, date(2015, 12, 31))
+        self.session.commit()
+        self.assertNotIn("changed_records", self.session.info)
+
+        Record.track_changes(self.session)
+        self.add_record(self.fa, 10, date(2015, 12, 31))
+        self.session.flush()
+        self.session.rollback()
+        self.assertNotIn("changed_records", self.session.info)
+
+    def test_changes_within_savepoints_are_tracked(self):
+        Record.track_changes(self.session)
+        with self.session.begin_nested():
+            self.add_record(self.ca, 100, date(2015, 12, 31))
+        with self.session.begin_nested():
+            self.add_record(self.fa, 10, date(2015, 12, 31))
+
+        self.assertEqual(self.update(), (1, 0, 0))
+
+    def test_update_of_given_cells(self):
+        self.create_record(self.ca, self.company, 100, date(2015, 12, 31))
+        self.create_record(self.fa, self.company, 10, date(2015, 12, 31))
+
+        self.assertEqual(update_synthetic_records(self.session, [
+            (self.company.id, self.ca.id, date(2015, 12, 31), 0)
+        ]), (1, 0, 0))
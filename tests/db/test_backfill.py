@@ -0,0 +1,95 @@
+from datetime import date
+import unittest
+import tempfile
+import os
+
+from db.core import SQLAlchemy
+from db.models import (
+    Company, RecordType, RecordFormula, FormulaComponent, Record,
+    FinancialStatement
+)
+from db.backfill import backfill, read_backfilled_companies
+
+
+class SyntheticBackfillTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.url = "sqlite:///" + os.path.join(self.tempdir.name, "test.db")
+        self.progress = os.path.join(self.tempdir.name, "progress.jsonl")
+        self.db = SQLAlchemy(self.url)
+        self.db.create_all()
+        session = self.db.session
+
+        ftype = FinancialStatement(name="bls")
+        ta, ca, fa = [
+            RecordType(name=name, ftype=ftype, timeframe=RecordType.PIT)
+            for name in ("TOTAL_ASSETS", "CURRENT_ASSETS", "FIXED_ASSETS")
+        ]
+        formula = RecordFormula(rtype=ta)
+        formula.add_component(rtype=ca, sign=1)
+        formula.add_component(rtype=fa, sign=1)
+        session.add(formula)
+        for index in range(5):
+            company = Company(
+                name="TEST#{}".format(index), isin="ISIN#{}".format(index)
+            )
+            for year in (2015, 2016):
+                session.add_all([
+                    Record(rtype=rtype, company=company, value=value,
+                           timerange=0, timestamp=date(year, 12, 31))
+                    for rtype, value in ((ca, 100 * index), (fa, year))
+                ])
+        session.commit()
+        self.messages = list()
+
+    def tearDown(self):
+        self.db.session.close()
+        self.db.engine.dispose()
+        self.tempdir.cleanup()
+
+    def backfill(self, **kwargs):
+        return backfill(
+            self.url, self.progress, workers=0, chunk_size=2, 
+            report=self.messages.append, **kwargs
+        )
+
+    def get_synthetic_records(self):
+        session = SQLAlchemy(self.url).session
+        records = session.query(
+            Company.isin, Record.timestamp, Record.value
+        ).join(Company).filter(Record.synthetic == True).all()
+        session.close()
+        return sorted(records)
+
+    def test_synthetic_records_of_all_companies_are_created(self):
+        totals = self.backfill()
+        self.assertEqual(totals["companies"], 5)
+        self.assertEqual(totals["created"], 10)
+        self.assertEqual(len(self.messages), 3) # chunks
+        self.assertIn("5/5 companies", self.messages[-1])
+        self.assertIn(
+            ("ISIN#3", date(2016, 12, 31), 2316), self.get_synthetic_records()
+        )
+
+    def test_backfill_selected_companies_since_date(self):
+        totals = self.backfill(
+            companies=["ISIN#1", "TEST#2"], since=date(2016, 1, 1)
+        )
+        self.assertEqual(totals["created"], 2)
+        self.assertEqual(self.get_synthetic_records(), [
+            ("ISIN#1", date(2016, 12, 31), 2116),
+            ("ISIN#2", date(2016, 12, 31), 2216)
+        ])
+
+    def test_backfilled_companies_are_skipped_on_resume(self):
+        self.backfill(companies=["ISIN#0", "ISIN#1"])
+        with open(self.progress, "a") as file:
+            file.write('{"companies": [3') # interrupted run
+
+        totals = self.backfill(resume=True)
+
+        self.assertEqual(totals["skipped"], 2)
+        self.assertEqual(totals["companies"], 3)
+        self.assertEqual(len(read_backfilled_companies(self.progress)), 5)
+        self.assertEqual(len(self.get_synthetic_records()), 10)
@@ -37,7 +37,7 @@ class SQLAlchemyTest(unittest.TestCase):
 		db.drop_all()
 
 	def test_for_creating_records_in_db(self):
-		db = SQLAlchemy("sqlite:///:memory")
+		db = SQLAlchemy("sqlite://")
 		db.create_all()
 		test_record = TestModel(5)
 		db.session.add(test_record)
@@ -46,7 +46,7 @@ class SQLAlchemyTest(unittest.TestCase):
 		db.drop_all()
 
 	def test_for_quering_db(self):
-		db = SQLAlchemy("sqlite:///:memory")
+		db = SQLAlchemy("sqlite://")
 		db.create_all()
 		db.session.add(TestModel(5))
 		db.session.commit()
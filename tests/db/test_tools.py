@@ -2,8 +2,11 @@ import itertools
 from datetime import datetime, date
 from collections import UserDict
 import unittest
+from unittest import mock
 import operator
+import tempfile
 import io
+import os
 
 from tests.db import DbTestCase
 from tests.db.utils import *
@@ -134,6 +137,86 @@ class CompaniesReprsTest(DbTestCase):
 		self.assertIn("vocabulary", voc)
 
 
+class RecordSpecIndexTest(DbTestCase):
+
+	def setUp(self):
+		super().setUp()
+		models.FinancialStatement.insert_defaults(self.db.session)
+		tools.upload_records_spec(self.db.session, [
+			{ 
+				"statement": "cfs", "name": "CF#CFFO",
+				"repr": [ { "lang": "PL", "value": "Przeplywy operacyjne" } ]
+			},
+			{ 
+				"statement": "bls", "name": "BS#TA",
+				"repr": [ { "lang": "PL", "value": "Aktywa razem" } ]
+			}  
+		])
+		company = models.Company.get_or_create(
+			self.db.session, name="test", isin="test#isin", fullname="Test SA"
+		)
+		self.db.session.commit()
+		tools.RecordSpecIndex._cache.clear()
+
+	def test_index_contains_records_specs_of_statements(self):
+		index = tools.RecordSpecIndex.build(self.db.session)
+		self.assertEqual(len(index.get_records_spec("cfs")), 1)
+		self.assertEqual(index.get_records_spec("cfs")[0]["name"], "CF#CFFO")
+		self.assertEqual(len(index.get_records_spec("ics")), 0)
+		self.assertEqual(len(index.get_records_spec()), 2)
+
+	def test_index_contains_vocabulary_and_bigrams(self):
+		index = tools.RecordSpecIndex.build(self.db.session)
+		self.assertEqual(
+			index.voc, {"przeplywy", "operacyjne", "aktywa", "razem"}
+		)
+		self.assertEqual(
+			set(map(tuple, index.get_records_spec("bls").bigrams)),
+			{("aktywa", "razem")}
+		)
+
+	def test_index_contains_companies_patterns(self):
+		index = tools.RecordSpecIndex.build(self.db.session)
+		pattern = index.companies_spec[0]["pattern"]
+		self.assertEqual(len(pattern.findall("test sa, TEST SA")), 2)
+
+	def test_get_returns_cached_index(self):
+		index = tools.RecordSpecIndex.get(self.db.session)
+		self.assertIs(tools.RecordSpecIndex.get(self.db.session), index)
+
+	def test_index_is_rebuilt_when_repr_changes(self):
+		index = tools.RecordSpecIndex.get(self.db.session)
+		rtype = self.db.session.query(models.RecordType).\
+		            filter_by(name="BS#TA").one()
+		rtype.reprs.append(models.RecordTypeRepr(lang="PL", value="Suma"))
+		self.db.session.commit()
+		new_index = tools.RecordSpecIndex.get(self.db.session)
+		self.assertIsNot(new_index, index)
+		self.assertIn("suma", new_index.voc)
+
+	def test_index_is_rebuilt_when_version_of_repr_changes(self):
+		index = tools.RecordSpecIndex.get(self.db.session)
+		rrepr = self.db.session.query(models.RecordTypeRepr).first()
+		rrepr.version += 1
+		self.db.session.commit()
+		self.assertIsNot(tools.RecordSpecIndex.get(self.db.session), index)
+
+	def test_index_is_cached_on_disk(self):
+		with tempfile.TemporaryDirectory() as cache_dir:
+			index = tools.RecordSpecIndex.get(
+				self.db.session, cache_dir=cache_dir
+			)
+			self.assertEqual(len(os.listdir(cache_dir)), 1)
+			tools.RecordSpecIndex._cache.clear()
+			with mock.patch.object(tools.RecordSpecIndex, "build") as build:
+				new_index = tools.RecordSpecIndex.get(
+					self.db.session, cache_dir=cache_dir
+				)
+			self.assertFalse(build.called)
+			self.assertEqual(new_index.version, index.version)
+			self.assertEqual(new_index.voc, index.voc)
+
+
 class MissingRecordsTest(DbTestCase):
 
     def test_create_missing_records(self):
@@ -0,0 +1,107 @@
+from unittest import mock
+from datetime import date
+import unittest
+import tempfile
+import json
+import os
+
+from rparser.batch import (
+    parse_report, parse_reports, read_parsed_reports, find_reports
+)
+from rparser.nlp import NGram
+from tests.rparser.test_cache import Report
+
+
+@mock.patch("rparser.core.utils.pdfinfo", return_value=({"Pages": "2"}, None))
+@mock.patch("rparser.core.utils.read_pdf_pages",
+            side_effect=lambda *args, **kwargs: iter([
+                b"Zysk netto 120 100\x0cAktywa razem 300 200\x0c"
+            ]))
+class ParseReportsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.paths = list()
+        for name in ("a.pdf", "b.pdf"):
+            path = os.path.join(self.tempdir.name, name)
+            with open(path, "wb") as file:
+                file.write(name.encode())
+            self.paths.append(path)
+        self.output = os.path.join(self.tempdir.name, "reports.jsonl")
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def parse_reports(self, paths, **kwargs):
+        return parse_reports(
+            paths, self.output, workers=0, report_cls=Report,
+            timestamp=date(2016, 12, 31), timerange=12, **kwargs
+        )
+
+    def read_output(self):
+        with open(self.output) as file:
+            return [ json.loads(line) for line in file if line.strip() ]
+
+    def test_parse_report_returns_data_and_timings(self, *mocks):
+        record = parse_report(
+            self.paths[0], report_cls=Report, timestamp=date(2016, 12, 31),
+            timerange=12
+        )
+        self.assertIsNone(record["error"])
+        self.assertEqual(record["data"]["ics"]["pages"], [0])
+        self.assertEqual(record["data"]["timestamp"], date(2016, 12, 31))
+        self.assertCountEqual(
+            record["timings"], ["hash", "extract", "recognize", "classify",
+                                "company", "statements", "serialize"]
+        )
+
+    def test_parse_report_returns_profile_of_stages(self, *mocks):
+        record = parse_report(
+            self.paths[0], report_cls=Report, timestamp=date(2016, 12, 31),
+            timerange=12, trace_memory=True, records_spec={
+                "ics": [{ "name": "NET_PROFIT", "ngrams": [NGram("zysk")] }]
+            }
+        )
+        self.assertNotIn("profile", record["data"])
+        self.assertIn("classify_pages", record["profile"])
+        self.assertIn("identify_records", record["profile"])
+        self.assertIn("memory_peak", record["profile"]["read_pages"])
+
+    def test_parse_report_returns_stage_of_error(self, *mocks):
+        with mock.patch.object(Report, "recognize_company",
+                               side_effect=ValueError("test")):
+            record = parse_report(self.paths[0], report_cls=Report)
+        self.assertEqual(record["error"]["stage"], "company")
+        self.assertEqual(record["error"]["type"], "ValueError")
+        self.assertIsNone(record["data"])
+
+    def test_one_line_is_written_for_every_report(self, *mocks):
+        self.assertEqual(self.parse_reports(self.paths), (2, 0, 0))
+        records = self.read_output()
+        self.assertEqual([ record["path"] for record in records ], self.paths)
+        self.assertEqual(records[0]["data"]["timestamp"], "2016-12-31")
+
+    def test_resume_skips_parsed_reports(self, *mocks):
+        self.parse_reports(self.paths[:1])
+        self.assertEqual(
+            self.parse_reports(self.paths, resume=True), (1, 0, 1)
+        )
+        self.assertEqual(len(self.read_output()), 2)
+
+    def test_resume_parses_again_reports_with_errors(self, *mocks):
+        with mock.patch.object(Report, "recognize_company",
+                               side_effect=ValueError("test")):
+            self.assertEqual(self.parse_reports(self.paths), (0, 2, 0))
+        self.assertEqual(read_parsed_reports(self.output), set())
+        self.assertEqual(
+            self.parse_reports(self.paths, resume=True), (2, 0, 0)
+        )
+
+    def test_resume_after_truncated_line(self, *mocks):
+        with open(self.output, "w") as file:
+            file.write('{"path": "x.pdf", "err')
+        self.parse_reports(self.paths, resume=True)
+        self.assertEqual(read_parsed_reports(self.output), set(self.paths))
+
+    def test_find_reports_in_directory(self, *mocks):
+        self.assertEqual(find_reports(self.tempdir.name), self.paths)
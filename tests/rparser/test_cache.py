@@ -0,0 +1,194 @@
+from unittest import mock
+from datetime import date
+import unittest
+import tempfile
+import os
+
+import numpy as np
+
+from rparser.cache import ParseCache, CachedPages, file_sha256
+from rparser.pagestore import PageStore
+from rparser.core import FinancialReport, SelfSearchingPage
+
+
+class FakeClassifier:
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict_proba(self, X):
+        self.calls += 1
+        prob = np.zeros(X.shape[0])
+        prob[0] = 1
+        return np.column_stack((1 - prob, prob))
+
+
+class FakeRegistry:
+
+    def __init__(self):
+        self.model = { "clf": FakeClassifier(), "ngrams": [] }
+
+    def resolve_path(self, path):
+        return path
+
+    def get(self, path):
+        return self.model
+
+
+registry = FakeRegistry()
+
+
+class Report(FinancialReport):
+    ics_pages = SelfSearchingPage("ics.pkl", "ics_pages", registry=registry)
+    bls_pages = SelfSearchingPage("bls.pkl", "bls_pages", registry=registry)
+    cfs_pages = SelfSearchingPage("cfs.pkl", "cfs_pages", registry=registry)
+
+
+@mock.patch("rparser.core.utils.pdfinfo", return_value=({"Pages": "2"}, None))
+@mock.patch("rparser.core.utils.read_pdf_pages",
+            side_effect=lambda *args, **kwargs: iter([
+                b"Zysk netto 120 100\x0cAktywa razem 300 200\x0c"
+            ]))
+class ParseCacheLoadReportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.cache = ParseCache(os.path.join(self.tempdir.name, "cache"))
+        self.path = os.path.join(self.tempdir.name, "report.pdf")
+        with open(self.path, "wb") as file:
+            file.write(b"%PDF-1.4 fake report")
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def load_report(self, **kwargs):
+        return self.cache.load_report(
+            Report, self.path, spec_version=1, timestamp=date(2016, 12, 31),
+            timerange=12, **kwargs
+        )
+
+    def test_report_is_created_from_extracted_pages(self, mock_pages, _):
+        report = self.load_report()
+        self.assertEqual(report[1], "Aktywa razem 300 200")
+        self.assertEqual(report.info, {"Pages": "2"})
+        self.assertEqual(report.ics_pages, [0])
+
+    def test_pages_are_extracted_once(self, mock_pages, _):
+        self.load_report()
+        report = self.load_report()
+        self.assertEqual(mock_pages.call_count, 1)
+        self.assertEqual(report[0], "Zysk netto 120 100")
+        self.assertEqual(report.info, {"Pages": "2"})
+
+    def test_pages_are_stored_in_page_store(self, mock_pages, _):
+        report = self.load_report()
+        pages = self.cache.get_pages(report.sha256)
+        self.assertEqual(list(pages), ["Zysk netto 120 100",
+                                       "Aktywa razem 300 200", ""])
+        self.assertEqual(pages.file_info, {"Pages": "2"})
+        pages.close()
+
+    def test_pages_of_report_are_decoded_on_access(self, mock_pages, _):
+        report = self.load_report()
+        self.assertIsInstance(report.pages, PageStore)
+        self.assertEqual(report.get_page_rows(1), [
+            (1, 1, 0, "Aktywa razem 300 200")
+        ])
+        report.pages.close()
+
+    def test_results_of_all_stages_are_restored(self, mock_pages, _):
+        self.load_report()
+        calls = registry.model["clf"].calls
+        with mock.patch.object(
+            Report, "create_financial_statement"
+        ) as create_mock, mock.patch.object(
+            Report, "recognize_company"
+        ) as company_mock:
+            report = self.load_report()
+            self.assertEqual(report.cfs_pages, [0])
+            report.ics, report.bls, report.cfs, report.company
+        self.assertEqual(registry.model["clf"].calls, calls)
+        self.assertFalse(create_mock.called)
+        self.assertFalse(company_mock.called)
+
+    def test_statements_are_created_again_for_new_timestamp(
+        self, mock_pages, _
+    ):
+        self.load_report()
+        with mock.patch.object(
+            Report, "create_financial_statement", autospec=True,
+            side_effect=FinancialReport.create_financial_statement
+        ) as create_mock, mock.patch.object(
+            Report, "recognize_company"
+        ) as company_mock:
+            report = self.cache.load_report(
+                Report, self.path, spec_version=1, timerange=12,
+                timestamp=date(2017, 12, 31)
+            )
+        self.assertEqual(create_mock.call_count, 3)
+        self.assertFalse(company_mock.called)
+        self.assertEqual(mock_pages.call_count, 1)
+
+    def test_recognized_timestamp_is_cached(self, mock_pages, _):
+        with mock.patch.object(
+            Report, "recognize_timestamp", return_value=date(2016, 12, 31)
+        ) as timestamp_mock:
+            self.cache.load_report(Report, self.path, timerange=12)
+            report = self.cache.load_report(Report, self.path, timerange=12)
+        self.assertEqual(timestamp_mock.call_count, 1)
+        self.assertEqual(report.timestamp, date(2016, 12, 31))
+
+    def test_statements_are_not_cached_without_spec_version(
+        self, mock_pages, _
+    ):
+        self.cache.load_report(
+            Report, self.path, timestamp=date(2016, 12, 31), timerange=12
+        )
+        with mock.patch.object(Report, "create_financial_statement"):
+            report = self.cache.load_report(
+                Report, self.path, timestamp=date(2016, 12, 31), timerange=12
+            )
+        self.assertNotIn("_ics", report.__dict__)
+
+
+class ParseCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_get_returns_stored_value(self):
+        cache = ParseCache(self.tempdir.name)
+        cache.set(("pages", "abc"), CachedPages(["page"], {"Pages": "1"}))
+        pages = cache.get(("pages", "abc"))
+        self.assertEqual(pages, ["page"])
+        self.assertEqual(pages.file_info, {"Pages": "1"})
+
+    def test_get_returns_default_for_missing_key(self):
+        cache = ParseCache(self.tempdir.name)
+        self.assertIsNone(cache.get(("missing",)))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = ParseCache(self.tempdir.name, max_size=2500)
+        for key in ("first", "second"):
+            cache.set(key, b"x" * 1000)
+        os.utime(cache.get_path("first"), (0, 0))
+        os.utime(cache.get_path("second"), (1, 1))
+        cache.get("first") # mark as recently used
+        cache.set("third", b"x" * 1000)
+
+        self.assertIsNotNone(cache.get("first"))
+        self.assertIsNone(cache.get("second"))
+        self.assertIsNotNone(cache.get("third"))
+
+    def test_file_sha256(self):
+        path = os.path.join(self.tempdir.name, "test.pdf")
+        with open(path, "wb") as file:
+            file.write(b"test")
+        self.assertEqual(
+            file_sha256(path),
+            "9f86d081884c7d659a2feaa0c55ad015"
+            "a3bf4f1b2b0b822cd15d6c15b0f00a08"
+        )
@@ -0,0 +1,157 @@
+from unittest import mock
+import unittest
+import tempfile
+import pickle
+import os
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from rparser.classifiers import CompiledForest, ModelRegistry
+from rparser.core import SelfSearchingPage, classify_pages
+from rparser.nlp import NGram
+
+
+def create_forest(seed=0):
+    rnd = np.random.RandomState(seed)
+    X = rnd.randint(0, 5, size=(200, 10))
+    y = (X[:, 0] + X[:, 3] > 4).astype(int)
+    forest = RandomForestClassifier(n_estimators=10, random_state=seed)
+    forest.fit(X, y)
+    return forest, X
+
+
+class CompiledForestTest(unittest.TestCase):
+
+    def test_predict_proba_returns_the_same_results_as_forest(self):
+        forest, X = create_forest()
+        compiled = CompiledForest.from_sklearn(forest)
+
+        np.testing.assert_allclose(
+            compiled.predict_proba(X), forest.predict_proba(X)
+        )
+
+    def test_load_compiled_forest_as_memory_mapped_arrays(self):
+        forest, X = create_forest()
+        with tempfile.TemporaryDirectory() as path:
+            CompiledForest.from_sklearn(forest).save(path)
+            compiled = CompiledForest.load(path, mmap_mode="r")
+
+            self.assertIsInstance(compiled.value, np.memmap)
+            np.testing.assert_allclose(
+                compiled.predict_proba(X), forest.predict_proba(X)
+            )
+
+
+class ModelRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.forest, self.X = create_forest()
+        self.modelpath = os.path.join(self.tempdir.name, "test.pkl")
+        with open(self.modelpath, "wb") as file:
+            pickle.dump({"clf": self.forest, "ngrams": ["test"]}, file)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_relative_paths_are_resolved_against_basedir(self):
+        registry = ModelRegistry(basedir=self.tempdir.name)
+        model = registry.get("test.pkl")
+        self.assertEqual(model["ngrams"], ["test"])
+
+    def test_model_is_loaded_once(self):
+        registry = ModelRegistry(basedir=self.tempdir.name)
+        with mock.patch.object(
+            registry, "load", wraps=registry.load
+        ) as load_mock:
+            model = registry.get("test.pkl")
+            self.assertIs(registry.get(self.modelpath), model)
+        self.assertEqual(load_mock.call_count, 1)
+
+    def test_missing_model_raises_error(self):
+        registry = ModelRegistry(basedir=self.tempdir.name)
+        with self.assertRaises(FileNotFoundError):
+            registry.get("missing.pkl")
+
+    def test_load_compiled_model_when_mmap_dir_is_given(self):
+        mmap_dir = os.path.join(self.tempdir.name, "mmap")
+        registry = ModelRegistry(basedir=self.tempdir.name, mmap_dir=mmap_dir)
+        model = registry.get("test.pkl")
+
+        self.assertIsInstance(model["clf"], CompiledForest)
+        self.assertEqual(model["ngrams"], ["test"])
+        np.testing.assert_allclose(
+            model["clf"].predict_proba(self.X), self.forest.predict_proba(self.X)
+        )
+
+
+class SelfSearchingPageTest(unittest.TestCase):
+
+    def test_model_is_not_loaded_on_init(self):
+        registry = mock.Mock()
+        page = SelfSearchingPage("cls/bls.pkl", "bls_pages", registry=registry)
+        self.assertFalse(registry.get.called)
+
+    def test_missing_model_raises_attribute_error_on_access(self):
+        class Doc(list):
+            pages = SelfSearchingPage(
+                "missing.pkl", "pages", registry=ModelRegistry()
+            )
+        with self.assertWarns(UserWarning):
+            with self.assertRaises(AttributeError):
+                Doc(["page"]).pages
+
+
+def page(count):
+    return "aktywa " + "zysk netto " * count
+
+
+class CountingClassifier:
+    '''Probability of page is proportional to the frequency of ngram.'''
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict_proba(self, X):
+        self.calls += 1
+        prob = np.minimum(X[:, 0] / 10, 1)
+        return np.column_stack((1 - prob, prob))
+
+
+class FindPagesBatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clf = CountingClassifier()
+        model = { "clf": self.clf, "ngrams": [NGram("zysk", "netto")] }
+        registry = mock.Mock(get=mock.Mock(return_value=model))
+
+        class Doc(list):
+            pages = SelfSearchingPage("test.pkl", "pages", registry=registry)
+        self.Doc = Doc
+        self.docs = [
+            Doc([page(0), page(8), page(5), page(1)]),
+            Doc([page(10), page(0), page(2)]),
+            Doc([page(1), page(3), page(4), page(3)])
+        ]
+
+    def test_pages_are_the_same_as_found_for_every_document(self):
+        expected = [ self.Doc(doc).pages for doc in self.docs ]
+        self.clf.calls = 0
+        pages = self.Doc.pages.find_pages_batch(self.docs)
+        self.assertEqual(pages, expected)
+        self.assertEqual(pages, [[1, 2], [0], [1, 2, 3]])
+        self.assertEqual(self.clf.calls, 1)
+
+    def test_pages_are_stored_in_documents(self):
+        classify_pages(self.docs, names=("pages",))
+        self.assertEqual(self.clf.calls, 1)
+        self.assertEqual(self.docs[1].pages, [0])
+        self.assertEqual(self.clf.calls, 1)
+
+    def test_documents_with_pages_found_are_skipped(self):
+        self.docs[0].pages
+        classify_pages(self.docs, names=("pages",))
+        self.assertEqual(self.clf.calls, 2)
+        classify_pages(self.docs, names=("pages",))
+        self.assertEqual(self.clf.calls, 2)
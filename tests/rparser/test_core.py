@@ -1,3 +1,4 @@
+from concurrent.futures import ProcessPoolExecutor
 from unittest import mock
 from datetime import date
 import unittest
@@ -5,7 +6,8 @@ import io
 
 from rparser.core import (
     PDFFileIO, Document, UnevenTable, RecordsCollector,
-    FinancialStatement, FinancialReport
+    FinancialStatement, FinancialReport, RecordsSpec, PageFeatures, PDFPages,
+    CompaniesSpec, Profiler, get_executor, shutdown_executors
 )
 from rparser.nlp import NGram
 
@@ -42,6 +44,29 @@ class PDFFileIOTest(unittest.TestCase):
         self.assertEqual(first_line.rstrip("\n"), "Page 1")
 
 
+@mock.patch("rparser.core.utils.pdfinfo", return_value=({"Pages": "3"}, None))
+@mock.patch("rparser.core.utils.read_pdf_pages",  
+            side_effect=lambda *args, **kwargs: iter([
+                b"Page 1\n\x0cPage 2\x0c", b"Page 3\r\n\x0c"
+            ]))
+class PDFPagesTest(unittest.TestCase):
+
+    def test_iteration_yields_pages_in_order(self, mock_pages, mock_info):
+        pages = list(PDFPages("test.pdf"))
+        self.assertEqual(pages, ["Page 1\n", "Page 2", "Page 3\n", ""])
+
+    def test_pages_are_extracted_in_ranges(self, mock_pages, mock_info):
+        list(PDFPages("test.pdf", pages_per_task=2))
+        self.assertEqual(mock_pages.call_args[0], ("test.pdf", 3))
+        self.assertEqual(mock_pages.call_args[1]["pages_per_task"], 2)
+
+    def test_document_reads_pages(self, mock_pages, mock_info):
+        doc = Document(PDFPages("test.pdf"))
+        self.assertEqual(len(doc), 4)
+        self.assertEqual(doc[2], "Page 3\n")
+        self.assertEqual(doc.info, {"Pages": "3"})
+
+
 class DocumentTest(unittest.TestCase):
     
     def get_stream(self):
@@ -92,10 +117,85 @@ class DocumentTest(unittest.TestCase):
         self.assertEqual(rows[3], (3, 1, 1, "Page 1 Row 1"))
         self.assertEqual(rows[4], (4, 2, 0, "Page 2 Row 0"))
         self.assertEqual(rows[5], (5, 2, 1, "Page 2 Row 1"))
+        self.assertEqual(rows[-1], (5, 2, 1, "Page 2 Row 1"))
+        self.assertEqual(list(rows), [ rows[row] for row in range(6) ])
+
+    def test_rows_are_mapped_to_pages_with_index(self):
+        doc = Document(["Page 0", "Page 1 Row 0\nPage 1 Row 1", "Page 2"])
+        index = doc.rows_index
+        self.assertIs(doc.rows_index, index)
+        self.assertEqual(len(index), 4)
+        self.assertEqual(index.get_position(2), (1, 1))
+        self.assertEqual(index.get_row(2), 3)
+        self.assertEqual(index.get_span(2), (1, 13, 25))
+        self.assertEqual(index.count_rows(1), 2)
+        with self.assertRaises(IndexError):
+            index.get_row(1, 2)
+        with self.assertRaises(IndexError):
+            index.get_position(4)
+        self.assertEqual(
+            doc.get_page_rows(1), 
+            [(1, 1, 0, "Page 1 Row 0"), (2, 1, 1, "Page 1 Row 1")]
+        )
         
         
+    def test_document_accepts_iterable_of_pages(self):
+        doc = Document(iter(["Page 0", "Page 1 Row 0\nPage 1 Row 1"]))
+        self.assertEqual(doc, Document("Page 0\x0cPage 1 Row 0\nPage 1 Row 1"))
+
+    def test_page_features_are_computed_while_reading_pages(self):
+        doc = Document(iter(["zysk netto", "aktywa razem"]))
+        self.assertEqual(len(doc.__dict__["_page_features"][2]), 2)
+
+    def test_page_features_are_computed_once(self):
+        doc = Document(self.get_stream())
+        self.assertIs(doc.get_page_features(), doc.get_page_features())
+
+
+class PageFeaturesTest(unittest.TestCase):
+
+    def test_matrix_contains_frequency_of_ngrams_on_pages(self):
+        features = PageFeatures([
+            "zysk netto zysk netto", "aktywa razem 10 20"
+        ])
+        matrix = features.matrix(
+            [NGram("zysk", "netto"), NGram("aktywa", "razem"), NGram("a", "b")]
+        )
+        self.assertEqual(matrix.tolist(), [[2, 0, 0], [0, 1, 0]])
+
+    def test_matrix_contains_numbers_and_position_of_pages(self):
+        features = PageFeatures(["zysk", "120", "zysk"])
+        matrix = features.matrix(
+            [PageFeatures.number_ngram, PageFeatures.page_ngram]
+        )
+        self.assertEqual(matrix[:, 0].tolist(), [0, 1, 0])
+        self.assertEqual(matrix[:, 1].tolist(), [0, 1/3, 2/3])
+
+    def test_fake_ngrams_can_be_disabled(self):
+        features = PageFeatures(["120"])
+        matrix = features.matrix(
+            [PageFeatures.number_ngram, PageFeatures.page_ngram],
+            use_number_ngram=False, use_page_ngram=False
+        )
+        self.assertEqual(matrix.tolist(), [[0, 0]])
+
+    def test_flags_of_standalone_statements_and_selected_data(self):
+        features = PageFeatures([
+            "sprawozdanie jednostkowe", "wybrane dane finansowe", "bilans"
+        ])
+        self.assertEqual(features.standalone.tolist(), [True, False, False])
+        self.assertEqual(features.selected_data.tolist(), [False, True, False])
+
+
 class UnevenTableTest(unittest.TestCase):
     
+    def test_convert_table_to_numbers(self):
+        table = UnevenTable("Label1\t10\t(20)\nLabel2\t1 200,5")
+        values, mask = table.to_numbers()
+        self.assertEqual(mask.tolist(), [[False, True, True], [False, True, False]])
+        self.assertEqual(values[0, 1:].tolist(), [10, -20])
+        self.assertEqual(values[1, 1], 1200.5)
+
     def test_create_table_with_rows(self):
         text_table = "Label1\t10\t20\nLabel2\t120\t150"
         
@@ -147,6 +247,39 @@ class UnevenTableTest(unittest.TestCase):
         table = UnevenTable("")
         self.assertEqual(len(table), 1)
 
+    def test_cells_are_kept_as_offsets_into_text(self):
+        text = "Label1    10    15\nLabel2   100   200"
+        table = UnevenTable(text)
+        self.assertIs(table.text, text)
+        self.assertEqual(table.cells.tolist()[1], [10, 12])
+
+    def test_changes_of_copy_do_not_modify_table(self):
+        table = UnevenTable("Label1    10    15\nLabel2   100   200")
+        new_table = table.copy()
+        new_table.set_cell(0, 0, "Label")
+
+        self.assertEqual(new_table[0], ["Label", "10", "15"])
+        self.assertEqual(table[0], ["Label1", "10", "15"])
+        self.assertIs(new_table.cells, table.cells)
+
+    def test_slicing_keeps_changed_rows(self):
+        table = UnevenTable("Label1    10\nLabel2   100\nLabel3   1")
+        table.set_row(2, ["Label", "1"])
+        self.assertEqual(list(table[1:]), [["Label2", "100"], ["Label", "1"]])
+
+    def test_concatenated_tables_have_rows_of_all_tables(self):
+        table = UnevenTable.concat([
+            UnevenTable("Label1    10\n"), UnevenTable("Label2   100")
+        ])
+        self.assertEqual(list(table), [["Label1", "10"], [], ["Label2", "100"]])
+        self.assertEqual(
+            list(table), list(UnevenTable("Label1    10\n\nLabel2   100"))
+        )
+
+    def test_create_table_from_rows(self):
+        rows = [["Label1", "10"], [], ["Label2"]]
+        self.assertEqual(list(UnevenTable.from_rows(rows)), rows)
+
 
 class RecordsCollectorTest(unittest.TestCase):
 
@@ -194,6 +327,31 @@ class RecordsCollectorTest(unittest.TestCase):
         self.assertIn(NGram('revenues', 'cost'), bigrams)
         self.assertIn(NGram('net', 'profit'), bigrams)
         
+    def test_records_spec_precomputes_words_and_bigrams(self):
+        spec = self.get_records_spec()
+        fs = RecordsCollector.__new__(RecordsCollector) # do not init
+
+        self.assertEqual(
+            fs.extract_words_from_spec(RecordsSpec(spec)),
+            fs.extract_words_from_spec(spec)
+        )
+        self.assertEqual(
+            fs.extract_bigrams_from_spec(RecordsSpec(spec)),
+            fs.extract_bigrams_from_spec(spec)
+        )
+
+    def test_identify_records_with_compiled_spec(self):
+        spec = RecordsSpec(self.get_records_spec())
+        table = UnevenTable("""
+        REVENUE      100  200
+        NET PROFIT    10   20
+        """)
+
+        rc = RecordsCollector(table, spec)
+
+        self.assertEqual(rc["REVENUE"], [100, 200])
+        self.assertEqual(rc["NET_PROFIT"], [10, 20])
+
     def test_find_potential_labels_for_broken_label(self):
         fs = RecordsCollector.__new__(RecordsCollector) # do not init
         
@@ -202,6 +360,24 @@ class RecordsCollectorTest(unittest.TestCase):
         
         self.assertEqual(len(labels), 1)
         self.assertEqual(labels[0], "net profit")
+
+    def test_find_potential_labels_limits_number_of_labels(self):
+        fs = RecordsCollector.__new__(RecordsCollector) # do not init
+
+        voc = ["a", "aa", "aaa"]
+        labels = fs.find_potential_labels("a"*40, voc, max_candidates=5)
+
+        self.assertEqual(len(labels), 5)
+
+    def test_find_potential_labels_prefers_labels_with_bigrams(self):
+        fs = RecordsCollector.__new__(RecordsCollector) # do not init
+
+        voc = ["net", "ne", "tprofit", "profit"]
+        labels = fs.find_potential_labels(
+            "NETPROFIT", voc, bigrams={("net", "profit")}, max_candidates=1
+        )
+
+        self.assertEqual(labels, ["NET PROFIT"])
         
     def test_adjust_table_fixes_broken_labels(self):
         spec = self.get_records_spec()
@@ -234,6 +410,15 @@ class RecordsCollectorTest(unittest.TestCase):
         self.assertEqual(table[2][0], "Label2")
         self.assertEqual(table[3][0], "Label3")
         self.assertEqual(table[4][0], "Label4")
+
+    def test_adjust_table_does_not_modify_table(self):
+        spec = self.get_records_spec()
+        table = UnevenTable("I.    Label1   20   120")
+
+        rc = RecordsCollector.__new__(RecordsCollector)
+        rc.adjust_table(table, spec)
+
+        self.assertEqual(table[0][0], "I.")
         
     def test_identify_records_declared_in_specification(self):
         spec = self.get_records_spec()
@@ -327,9 +512,31 @@ class RecordsCollectorTest(unittest.TestCase):
         spec = self.get_records_spec()
         
         rc = RecordsCollector(UnevenTable(""), spec)
-        
+
         self.assertEqual(len(rc), 0)
-        
+
+    def test_identify_record_with_label_broken_into_two_rows(self):
+        spec = self.get_records_spec()
+        table = UnevenTable("""
+        REVENUE      100  200
+        NET
+        PROFIT        10   20
+        """)
+
+        rc = RecordsCollector(table, spec)
+
+        self.assertEqual(rc["NET_PROFIT"], [10, 20])
+        self.assertEqual(rc.records_map["NET_PROFIT"], (2, 3))
+
+    def test_spec_without_ngrams_is_ignored(self):
+        spec = self.get_records_spec()
+        spec.append({"name": "EMPTY", "ngrams": []})
+
+        rc = RecordsCollector(UnevenTable("NET PROFIT  10   12"), spec)
+
+        self.assertEqual(len(rc), 1)
+        self.assertEqual(rc["NET_PROFIT"], [10, 12])
+
 
 class FinancialStatementTest(unittest.TestCase):
 
@@ -477,4 +684,166 @@ class FinancialReportTest(unittest.TestCase):
         
         fr = FinancialReport(io.StringIO(text_table))
         
-        self.assertEqual(fr.timerange, 3)
\ No newline at end of file
+        self.assertEqual(fr.timerange, 3)
+
+
+class ExtractAllTest(unittest.TestCase):
+
+    def create_report(self):
+        pages = [
+            "Raport roczny",
+            "              2016-12-31   2015-12-31\nAktywa razem  300  200",
+            "              2016-12-31   2015-12-31\nZysk netto    120  100",
+            "              2016-12-31   2015-12-31\nPrzeplywy netto  10  20"
+        ]
+        spec = {
+            "bls": [{ "name": "ASSETS", "ngrams": [NGram("aktywa")] }],
+            "ics": [{ "name": "NETPROFIT", "ngrams": [NGram("zysk")] }],
+            "cfs": [{ "name": "NETCASH", "ngrams": [NGram("przeplywy")] }]
+        }
+        report = FinancialReport(
+            pages, timestamp=date(2016, 12, 31), timerange=12, 
+            records_spec=spec
+        )
+        report.__dict__.update(bls_pages=[1], ics_pages=[2], cfs_pages=[3])
+        return report
+
+    def test_statements_are_created_at_once(self):
+        report = self.create_report()
+        with mock.patch.object(
+            FinancialReport, "get_voc", autospec=True, return_value=set()
+        ) as voc_mock:
+            statements = report.extract_all()
+        self.assertEqual(voc_mock.call_count, 1)
+        self.assertEqual(statements["bls"]["ASSETS"], [300, 200])
+        self.assertEqual(statements["cfs"].rows_map, {6: "NETCASH"})
+        self.assertIs(report.ics, statements["ics"])
+
+    def test_statements_are_created_by_executor(self):
+        report = self.create_report()
+        with ProcessPoolExecutor(2) as executor:
+            statements = report.extract_all(executor)
+        expected = self.create_report()
+        for name in ("bls", "ics", "cfs"):
+            self.assertEqual(statements[name], getattr(expected, name))
+            self.assertEqual(
+                statements[name].records_map, 
+                getattr(expected, name).records_map
+            )
+            self.assertEqual(statements[name].names, [
+                (12, (2016, 12, 31)), (12, (2015, 12, 31))
+            ])
+
+    def test_stages_of_workers_are_profiled(self):
+        report = self.create_report()
+        report.profiler = Profiler()
+        with ProcessPoolExecutor(2) as executor:
+            report.extract_all(executor)
+        stats = report.profiler.as_dict()
+        self.assertEqual(stats["create_statement"]["calls"], 3)
+        self.assertEqual(stats["identify_records"]["calls"], 3)
+
+    def test_broken_executor_is_replaced(self):
+        executor = get_executor(1)
+        self.assertIs(get_executor(1), executor)
+        self.assertIsNot(get_executor(2), executor)
+        executor._broken = True
+        self.assertIsNot(get_executor(1), executor)
+        shutdown_executors()
+
+    def test_created_statements_are_not_created_again(self):
+        report = self.create_report()
+        ics = report.ics
+        with mock.patch.object(
+            FinancialReport, "create_financial_statement", autospec=True
+        ) as create_mock:
+            statements = report.extract_all()
+        self.assertEqual(create_mock.call_count, 2)
+        self.assertIs(statements["ics"], ics)
+
+
+class CompaniesSpecTest(unittest.TestCase):
+
+    def get_companies(self):
+        return [
+            { "isin": "PL0001", "repr": "Polski Koncern Naftowy ORLEN S.A." },
+            { "isin": "PL0002", "repr": "Bank Handlowy" },
+            { "isin": "PL0002", "repr": "Citi (Handlowy)" }
+        ]
+
+    def create_report(self, text):
+        return FinancialReport(text, timestamp=date(2016, 12, 31), timerange=12)
+
+    def test_count_companies_in_one_pass(self):
+        spec = CompaniesSpec(self.get_companies())
+        counts = spec.count_companies(
+            "POLSKI KONCERN NAFTOWY ORLEN SA\nbank handlowy, Bank Handlowy"
+        )
+        self.assertEqual(counts, [1, 2, 0])
+
+    def test_names_with_special_chars_are_searched_with_patterns(self):
+        spec = CompaniesSpec(self.get_companies())
+        self.assertEqual(list(spec.patterns), [2])
+        self.assertEqual(spec.count_companies("Citi Handlowy"), [0, 0, 1])
+
+    def test_recognize_company_with_compiled_spec(self):
+        report = self.create_report("Raport Polski Koncern Naftowy ORLEN S.A.")
+        company = report.recognize_company(CompaniesSpec(self.get_companies()))
+        self.assertEqual(company["isin"], "PL0001")
+
+    def test_recognize_company_on_the_base_of_ngrams(self):
+        report = self.create_report("Raport\x0cBank\x0cHandlowy")
+        spec = self.get_companies()
+        self.assertEqual(report.recognize_company(spec)["isin"], "PL0002")
+        self.assertIs(
+            report.recognize_company(CompaniesSpec(spec)), spec[1]
+        )
+
+
+class ProfilerTest(unittest.TestCase):
+
+    def test_times_of_repeated_stages_are_summed(self):
+        profiler = Profiler()
+        for _ in range(3):
+            with profiler.stage("test"):
+                pass
+        self.assertEqual(profiler.stats["test"]["calls"], 3)
+        self.assertNotIn("memory_peak", profiler.stats["test"])
+
+    def test_peaks_of_memory_of_nested_stages(self):
+        profiler = Profiler(trace_memory=True)
+        with profiler.stage("outer"):
+            with profiler.stage("inner"):
+                data = bytearray(2**20)
+            del data
+            with profiler.stage("empty"):
+                pass
+        stats = profiler.as_dict()
+        self.assertGreaterEqual(stats["inner"]["memory_peak"], 2**20)
+        self.assertGreaterEqual(stats["outer"]["memory_peak"], 2**20)
+        self.assertLess(stats["empty"]["memory_peak"], 2**20)
+
+    def test_stages_of_report_are_profiled(self):
+        profiler = Profiler()
+        report = FinancialReport(
+            "Raport kwartalny za okres zakonczony 2015-12-31", 
+            profiler=profiler
+        )
+        self.assertEqual(
+            list(profiler.stats), 
+            ["read_pages", "recognize_timestamp", "recognize_timerange"]
+        )
+        self.assertIs(report.profiler, profiler)
+
+    def test_stages_of_statement_are_profiled(self):
+        profiler = Profiler()
+        spec = [{ "name": "REVENUE", "ngrams": [NGram("revenue")] }]
+        FinancialStatement(
+            "        2015-12-31  2014-12-31\nREVENUE  100  200", spec, 
+            profiler=profiler
+        )
+        self.assertEqual(
+            list(profiler.stats), 
+            ["adjust_table", "identify_records", "remove_note_column", 
+             "identify_names"]
+        )
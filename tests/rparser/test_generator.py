@@ -0,0 +1,76 @@
+from datetime import date
+import unittest
+
+from rparser.core import FinancialStatement, FinancialReport
+from rparser.generator import (
+    generate_statement, generate_report, create_records_spec,
+    score_statement, shift_date
+)
+
+
+class GenerateStatementTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.spec = create_records_spec()
+
+    def parse(self, truth, timestamp=date(2016, 12, 31), timerange=12):
+        return FinancialStatement(
+            truth.text, self.spec["ics"], timestamp=timestamp,
+            timerange=timerange
+        )
+
+    def test_the_same_seed_gives_the_same_statement(self):
+        self.assertEqual(
+            generate_statement("cfs", seed=7), generate_statement("cfs", seed=7)
+        )
+
+    def test_statement_is_parsed_according_to_ground_truth(self):
+        truth = generate_statement("ics", rows=20, split_labels=0, seed=1)
+        scores = score_statement(self.parse(truth), truth)
+        self.assertGreater(scores["values"], 0.8)
+        self.assertTrue(scores["names"])
+        self.assertTrue(scores["uom"])
+
+    def test_columns_of_quarterly_statement(self):
+        truth = generate_statement(
+            "ics", periods=3, uom=1000000, timestamp=date(2016, 3, 31),
+            timerange=3, seed=2
+        )
+        self.assertEqual(
+            truth.names,
+            [(3, (2016, 3, 31)), (3, (2015, 3, 31)), (3, (2014, 3, 31))]
+        )
+        self.assertIn("01.01.2016-31.03.2016", truth.text)
+        self.assertEqual(self.parse(truth, date(2016, 3, 31), 3).uom, 10**6)
+
+    def test_labels_are_split_into_two_rows(self):
+        truth = generate_statement(
+            "bls", rows=10, split_labels=1, note_column=False, noise=0, seed=3
+        )
+        self.assertGreater(len(truth.text.split("\n")), 7 + 10)
+        self.assertNotIn("Nota", truth.text)
+
+    def test_shift_date_returns_the_last_day_of_month(self):
+        self.assertEqual(shift_date(date(2016, 12, 31), -12), date(2015, 12, 31))
+        self.assertEqual(shift_date(date(2016, 3, 31), -1), date(2016, 2, 29))
+        self.assertEqual(shift_date(date(2016, 11, 30), 1), date(2016, 12, 31))
+
+
+class GenerateReportTest(unittest.TestCase):
+
+    def test_statements_are_on_given_pages(self):
+        truth = generate_report(pages=8, seed=5, rows=15)
+        self.assertEqual(len(truth.text.split("\x0c")), 8)
+        for name, pages in truth.statements_pages.items():
+            self.assertEqual(
+                truth.pages[pages[0]], truth.statements[name].text
+            )
+
+    def test_timestamp_and_timerange_of_report_are_recognized(self):
+        truth = generate_report(
+            pages=5, seed=6, timestamp=date(2016, 9, 30), timerange=3
+        )
+        report = FinancialReport(truth.text)
+        self.assertEqual(report.timestamp, date(2016, 9, 30))
+        self.assertEqual(report.timerange, 3)
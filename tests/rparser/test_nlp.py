@@ -1,7 +1,11 @@
 import unittest
+import pickle
 
 
-from rparser.nlp import cos_similarity, NGram
+from rparser.nlp import (
+	cos_similarity, NGram, WordSegmenter, CosSimilarityIndex, find_ngrams,
+	is_noise_token, AhoCorasick
+)
 
 
 class CosSimilarityTest(unittest.TestCase):
@@ -16,6 +20,25 @@ class CosSimilarityTest(unittest.TestCase):
 		self.assertAlmostEqual(cos_similarity(t1, t2), 0)
 
 
+class CosSimilarityIndexTest(unittest.TestCase):
+
+	def test_similarity_with_all_sets_of_collection(self):
+		index = CosSimilarityIndex([("one", "two"), ("one",), ("three",)])
+		csims = index.similarity(["one", "two"])
+		self.assertEqual(len(csims), 3)
+		self.assertAlmostEqual(csims[0], 1)
+		self.assertAlmostEqual(csims[1], cos_similarity(["one"], ["one", "two"]))
+		self.assertAlmostEqual(csims[2], 0)
+
+	def test_count_common_tokens(self):
+		index = CosSimilarityIndex([("one", "two"), ("one",), ("three",)])
+		self.assertEqual(list(index.count_common({"one", "two", "four"})), [2, 1, 0])
+
+	def test_similarity_with_empty_set_is_zero(self):
+		index = CosSimilarityIndex([(), ("one",)])
+		self.assertEqual(list(index.similarity(["one"])), [0, 1])
+
+
 class NGramTest(unittest.TestCase):
 
 	def test_for_marging_two_ngrams(self):
@@ -28,4 +51,104 @@ class NGramTest(unittest.TestCase):
 		n1 = NGram("one", "two")
 		n1 += ("three", "four")
 		self.assertEqual(len(n1), 4)
-		self.assertEqual(n1, NGram("one", "two", "three", "four"))
\ No newline at end of file
+		self.assertEqual(n1, NGram("one", "two", "three", "four"))
+
+	def test_ngram_is_equal_to_tuple_of_tokens(self):
+		self.assertEqual(NGram("one", "two"), ("one", "two"))
+		self.assertEqual(NGram("one"), "one")
+		self.assertEqual(hash(NGram("one", "two")), hash(NGram("one", "two")))
+
+	def test_adding_tokens_does_not_modify_ngram(self):
+		n1 = NGram("one")
+		n2 = n1
+		n2 += ("two",)
+		self.assertEqual(n1, NGram("one"))
+
+	def test_pickle_ngram(self):
+		n1 = NGram("one", "two")
+		self.assertEqual(pickle.loads(pickle.dumps(n1)), n1)
+
+	def test_restore_ngram_from_state_of_previous_version(self):
+		# state of NGram pickled in rparser/cls/*.pkl
+		n1 = NGram.__new__(NGram)
+		n1.__setstate__({"_tokens": ["one", "two"]})
+		self.assertEqual(n1, NGram("one", "two"))
+		self.assertEqual(hash(n1), hash(NGram("one", "two")))
+
+
+class FindNGramsTest(unittest.TestCase):
+
+	def test_find_unigrams(self):
+		ngrams = find_ngrams("Zysk netto (strata) 2016", n=1)
+		self.assertEqual(ngrams, [NGram("zysk"), NGram("netto"), NGram("strata")])
+
+	def test_find_bigrams(self):
+		ngrams = find_ngrams("Zysk netto za okres", n=2)
+		self.assertEqual(ngrams, [NGram("zysk", "netto"), NGram("netto", "okres")])
+
+	def test_return_tuples(self):
+		ngrams = find_ngrams("Zysk netto", n=2, return_tuples=True)
+		self.assertEqual(ngrams, [("zysk", "netto")])
+
+	def test_remove_numbers_dates_stop_words_and_punctuation(self):
+		ngrams = find_ngrams("na dzień 31.12.2016 , -120 May zysk", n=1)
+		self.assertEqual(ngrams, [NGram("dzień"), NGram("zysk")])
+
+	def test_equal_ngrams_are_shared(self):
+		ngrams = find_ngrams("zysk netto zysk", n=1)
+		self.assertIs(ngrams[0], ngrams[2])
+
+	def test_is_noise_token(self):
+		self.assertTrue(is_noise_token("oraz"))
+		self.assertTrue(is_noise_token("(120)"))
+		self.assertTrue(is_noise_token("march"))
+		self.assertTrue(is_noise_token("2016-12"))
+		self.assertFalse(is_noise_token("zysk"))
+
+
+class AhoCorasickTest(unittest.TestCase):
+
+	def test_count_occurrences_of_all_patterns(self):
+		automaton = AhoCorasick(["he", "she", "his", "hers"])
+		self.assertEqual(automaton.count("ushers and his"), [1, 1, 1, 1])
+
+	def test_matching_is_case_insensitive(self):
+		automaton = AhoCorasick(["Orlen SA"])
+		self.assertEqual(automaton.count("ORLEN SA, orlen sa"), [2])
+
+	def test_overlapping_occurrences_are_not_counted(self):
+		automaton = AhoCorasick(["aa", "a"])
+		self.assertEqual(automaton.count("aaa"), [1, 3])
+
+	def test_empty_pattern_is_never_found(self):
+		self.assertEqual(AhoCorasick(["", "a"]).count("aa"), [0, 2])
+
+
+class WordSegmenterTest(unittest.TestCase):
+
+	def test_segment_string_into_words(self):
+		segmenter = WordSegmenter(["net", "profit", "loss"])
+		self.assertEqual(segmenter.segment("netprofit"), [("net", "profit")])
+
+	def test_matching_words_is_case_insensitive(self):
+		segmenter = WordSegmenter(["net", "profit"])
+		self.assertEqual(segmenter.segment("NetPROFIT"), [("Net", "PROFIT")])
+
+	def test_chars_not_beginning_any_word_are_skipped(self):
+		segmenter = WordSegmenter(["net", "profit"])
+		self.assertEqual(segmenter.segment("xnetyprofitz"), [("net", "profit")])
+
+	def test_return_all_segmentations(self):
+		segmenter = WordSegmenter(["a", "ab", "b"])
+		self.assertCountEqual(
+			segmenter.segment("ab"), [("a", "b"), ("ab",)]
+		)
+
+	def test_string_without_words_returns_empty_list(self):
+		segmenter = WordSegmenter(["net", "profit"])
+		self.assertEqual(segmenter.segment("xyz"), [])
+
+	def test_number_of_segmentations_is_limited(self):
+		segmenter = WordSegmenter(["a", "aa"])
+		segmentations = segmenter.segment("a"*100, max_candidates=3)
+		self.assertEqual(len(segmentations), 3)
@@ -0,0 +1,47 @@
+import unittest
+import tempfile
+import os
+
+from rparser.pagestore import PageStore
+
+
+class PageStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempdir.name, "report.pages")
+        self.pages = [ "Strona 1\nZysk netto", "", "Środki pieniężne\n\n100" ]
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_pages_are_read_from_file(self):
+        with PageStore.write(self.path, iter(self.pages)) as pages:
+            self.assertEqual(len(pages), 3)
+            self.assertEqual(list(pages), self.pages)
+            self.assertEqual(pages[-1], "Środki pieniężne\n\n100")
+            self.assertEqual(pages[1:], self.pages[1:])
+            with self.assertRaises(IndexError):
+                pages[3]
+
+    def test_file_info_is_stored_with_pages(self):
+        PageStore.write(self.path, self.pages, {"Pages": "3"}).close()
+        with PageStore(self.path) as pages:
+            self.assertEqual(pages.file_info, {"Pages": "3"})
+
+    def test_first_rows_of_pages(self):
+        with PageStore.write(self.path, self.pages) as pages:
+            self.assertEqual(
+                [ pages.get_first_row(page) for page in range(4) ],
+                [0, 2, 3, 6]
+            )
+
+    def test_empty_document(self):
+        with PageStore.write(self.path, []) as pages:
+            self.assertEqual(len(pages), 0)
+
+    def test_other_files_are_rejected(self):
+        with open(self.path, "wb") as file:
+            file.write(b"x" * 64)
+        with self.assertRaises(ValueError):
+            PageStore(self.path)
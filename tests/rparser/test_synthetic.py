@@ -2,11 +2,14 @@ import unittest
 from unittest import mock
 from collections import UserDict
 
+import numpy as np
+
 from rparser.synthetic import (
     RecordsDataset, FormulaComponent, Timeframe, TimeframeSpec,
     DatasetNotFoundError, Formula, create_inverted_mapping,
     extend_formula_with_timeframe,  remove_duplicate_formulas,
-    create_synthetic_records, Record, create_formulas_transformations
+    create_synthetic_records, Record, create_formulas_transformations,
+    FormulasArray
 )
 
 
@@ -370,6 +373,45 @@ class TestUtils(unittest.TestCase):
         self.assertEqual(records[0].spec, "TOTAL_ASSETS")
         self.assertEqual(records[0].value, 100)
         
+    def test_csr_creates_records_from_long_chain_of_formulas(self):
+        formulas = list()
+        for index in range(1, 5000):
+            formula = Formula(spec=index)
+            formula.add_component(FormulaComponent(spec=index - 1, sign=1))
+            formula.add_component(FormulaComponent(spec="ONE", sign=1))
+            formulas.append(formula)
+        dataset = ExtDictRecordsDataset({
+            0: {"value": 0, "synthetic": False},
+            "ONE": {"value": 1, "synthetic": False}
+        })
+
+        records = create_synthetic_records(
+            0, dataset, create_inverted_mapping(formulas)
+        )
+
+        self.assertEqual(len(records), 4999)
+        self.assertEqual(records[-1], Record(4999, 4999, False))
+
+    def test_csr_creates_records_in_depth_first_order(self):
+        formulas = [
+            Formula("B", [FormulaComponent("A", 1), FormulaComponent("C", 1)]),
+            Formula("D", [FormulaComponent("A", 1), FormulaComponent("E", 1)]),
+            Formula("F", [FormulaComponent("B", 1), FormulaComponent("D", 1)])
+        ]
+        dataset = ExtDictRecordsDataset({
+            spec: {"value": 1, "synthetic": False} for spec in "ACE"
+        })
+
+        records = create_synthetic_records(
+            "A", dataset, create_inverted_mapping(formulas)
+        )
+
+        self.assertEqual(
+            records, 
+            [Record("B", 2, False), Record("D", 2, False), 
+             Record("F", 4, False)]
+        )
+
     def test_create_formulas_transformations(self):
          formula = self.create_default_formula()
          
@@ -380,4 +422,75 @@ class TestUtils(unittest.TestCase):
          formula_ca = next(filter(lambda item: item.spec == "CURRENT_ASSETS", 
                                   new_formulas))
          formula_fa = next(filter(lambda item: item.spec == "FIXED_ASSETS", 
-                                  new_formulas))
\ No newline at end of file
+                                  new_formulas))
+
+
+class FormulasArrayTest(unittest.TestCase):
+
+    def create_formulas(self):
+        formula = Formula("TOTAL_ASSETS", [
+            FormulaComponent("CURRENT_ASSETS", 1), 
+            FormulaComponent("FIXED_ASSETS", 1)
+        ])
+        return [formula] + create_formulas_transformations([formula])
+
+    def test_missing_values_are_computed_for_all_entities(self):
+        formulas = FormulasArray(self.create_formulas())
+        values = formulas.create_array(3)
+        columns = [ formulas.columns[spec] for spec in 
+                    ("TOTAL_ASSETS", "CURRENT_ASSETS", "FIXED_ASSETS") ]
+        values[:, columns] = [
+            [np.nan, 60, 40], [100, np.nan, 30], [np.nan, np.nan, 10]
+        ]
+
+        computed = formulas.compute(values)
+
+        np.testing.assert_array_equal(
+            values[:, columns], 
+            [[100, 60, 40], [100, 70, 30], [np.nan, np.nan, 10]]
+        )
+        np.testing.assert_array_equal(
+            computed[:, columns], 
+            [[True, False, False], [False, True, False], [False] * 3]
+        )
+
+    def test_values_are_computed_from_computed_values(self):
+        formulas = FormulasArray([
+            Formula(index, [FormulaComponent(index - 1, 1), 
+                            FormulaComponent("ONE", 1)])
+            for index in range(1, 100)
+        ])
+        values = formulas.create_array(2)
+        values[:, formulas.columns[0]] = [0, 10]
+        values[:, formulas.columns["ONE"]] = [1, -1]
+
+        formulas.compute(values)
+
+        np.testing.assert_array_equal(
+            values[:, formulas.columns[99]], [99, -89]
+        )
+
+    def test_downstream_columns(self):
+        formulas = FormulasArray([
+            Formula(index, [FormulaComponent(index - 1, 1), 
+                            FormulaComponent("ONE", 1)])
+            for index in range(1, 5)
+        ])
+
+        downstream = formulas.get_downstream([formulas.columns[2]])
+
+        self.assertEqual(
+            downstream, set(formulas.columns[index] for index in (3, 4))
+        )
+
+    def test_only_formulas_of_given_columns_are_computed(self):
+        formulas = FormulasArray(self.create_formulas())
+        values = formulas.create_array(1)
+        columns = [ formulas.columns[spec] for spec in 
+                    ("TOTAL_ASSETS", "CURRENT_ASSETS", "FIXED_ASSETS") ]
+        values[:, columns] = [[np.nan, np.nan, 40]]
+        values[0, formulas.columns["TOTAL_ASSETS"]] = 100
+
+        formulas.compute(values, [formulas.columns["FIXED_ASSETS"]])
+
+        self.assertTrue(np.isnan(values[0, formulas.columns["CURRENT_ASSETS"]]))
@@ -1,8 +1,85 @@
 import unittest
 import unittest.mock as mock
 from datetime import datetime
+import tempfile
+import sys
+import os
+
+import numpy as np
+
+from rparser.utils import (
+	convert_to_number, pdfinfo, determine_timerange, find_dates, 
+	get_date_scanner, read_pdf, read_pdf_pages, split_text_into_columns,
+	convert_to_numbers, convert_rows_to_numbers
+)
+
+
+# Fake pdftotext: prints pages (separated with form feed) of text file,
+# sleeps on pages containing "SLEEP".
+FAKE_PDFTOTEXT = """#!{python}
+import sys, time
+args = sys.argv[1:]
+pages = open(args[0]).read().split("\\x0c")
+first = int(args[args.index("-f") + 1]) if "-f" in args else 1
+last = int(args[args.index("-l") + 1]) if "-l" in args else len(pages)
+for page in pages[first-1:last]:
+	if "SLEEP" in page: time.sleep(10)
+	sys.stdout.write(page + "\\x0c")
+"""
+
+
+class FakePdftotextTestCase(unittest.TestCase):
+
+	def setUp(self):
+		self.tempdir = tempfile.TemporaryDirectory()
+		script = os.path.join(self.tempdir.name, "pdftotext")
+		with open(script, "w") as file:
+			file.write(FAKE_PDFTOTEXT.format(python=sys.executable))
+		os.chmod(script, 0o755)
+		path = self.tempdir.name + os.pathsep + os.environ.get("PATH", "")
+		self.env_patcher = mock.patch.dict(os.environ, {"PATH": path})
+		self.env_patcher.start()
+
+	def tearDown(self):
+		self.env_patcher.stop()
+		self.tempdir.cleanup()
+
+	def create_pdf(self, pages):
+		path = os.path.join(self.tempdir.name, "test.pdf")
+		with open(path, "w") as file:
+			file.write("\x0c".join(pages))
+		return path
+
+
+class ReadPdfTest(FakePdftotextTestCase):
+
+	def test_read_pdf_returns_output_of_pdftotext(self):
+		path = self.create_pdf(["Page 1", "Page 2"])
+		output, _ = read_pdf(path)
+		self.assertEqual(output, b"Page 1\x0cPage 2\x0c")
+
+	def test_read_pdf_raises_error_when_output_exceeds_max_size(self):
+		path = self.create_pdf(["Page 1", "Page 2"])
+		with self.assertRaises(OSError):
+			read_pdf(path, max_size=5)
+
+	def test_read_pdf_raises_error_after_timeout(self):
+		path = self.create_pdf(["Page 1", "SLEEP"])
+		with self.assertRaises(OSError):
+			read_pdf(path, timeout=0.5)
+
+	def test_read_pdf_pages_returns_ranges_of_pages_in_order(self):
+		pages = ["Page {}".format(index) for index in range(1, 8)]
+		path = self.create_pdf(pages)
+		outputs = list(read_pdf_pages(path, 7, pages_per_task=3))
+		self.assertEqual(len(outputs), 3)
+		self.assertEqual(b"".join(outputs), read_pdf(path)[0])
+
+	def test_read_pdf_pages_limits_size_of_whole_output(self):
+		path = self.create_pdf(["Page 1", "Page 2", "Page 3"])
+		with self.assertRaises(OSError):
+			list(read_pdf_pages(path, 3, pages_per_task=1, max_size=10))
 
-from rparser.utils import convert_to_number, pdfinfo, determine_timerange
 
 
 class DetermineTimerangeTest(unittest.TestCase):
@@ -48,6 +125,104 @@ class DetermineTimerangeTest(unittest.TestCase):
 		self.assertEqual(output[0], 12)			
 
 
+class FindDatesTest(unittest.TestCase):
+
+	def test_find_dates_in_different_forms(self):
+		text = "I kwartał 2016\n30 września 2016\n31.12.2015\nczerwca 2016"
+		dates = [ date for date, _, _ in find_dates(text) ]
+		self.assertEqual(dates, [
+			(2016, 3, 31), (2016, 9, 30), (2015, 12, 31), (2016, 6, None)
+		])
+
+	def test_flag_marks_full_dates(self):
+		text = "30.06.2016   31.12   2015"
+		flags = [ flag for _, _, flag in find_dates(text) ]
+		self.assertEqual(flags, [1, 0, 0])
+
+	def test_spans_refer_to_text_without_dates_found_earlier(self):
+		text = "2015 30.06.2016 2016"
+		output = find_dates(text)
+		self.assertEqual(output, [
+			((2015, None, None), (0, 4), 0),
+			((2016, 6, 30), (5, 15), 1),
+			((2016, None, None), (6, 10), 0)
+		])
+
+	def test_dates_in_other_lines_are_not_shifted(self):
+		text = "30.06.2016 2015\n2014"
+		output = find_dates(text)
+		self.assertEqual(output[-1], ((2014, None, None), (6, 10), 0))
+
+	def test_find_dates_accepts_days_pattern(self):
+		text = "15.06.2016 30.06.2016"
+		dates = [ date for date, _, _ in find_dates(text, re_days=r"(30)") ]
+		self.assertIn((2016, 6, 30), dates)
+		self.assertNotIn((2016, 6, 15), dates)
+
+	def test_all_days_finds_dates_found_with_default_days(self):
+		text = "31 grudnia 2015\nI kwartał 2016\n15.06.2016 30.06.2016"
+		dates = [ date for date, _, _ in find_dates(text, all_days=True) ]
+		for date, _, flag in find_dates(text):
+			if flag: # full dates
+				self.assertIn(date, dates)
+		self.assertIn((2016, 6, 15), dates)
+
+	def test_text_without_dates_returns_empty_list(self):
+		self.assertEqual(find_dates("Przychody ze sprzedaży   1 234  5 678"), [])
+
+	def test_scanner_is_shared_for_the_same_days_pattern(self):
+		self.assertIs(get_date_scanner(r"(30|31)"), get_date_scanner(r"(30|31)"))
+
+
+class SplitTextIntoColumnsTest(unittest.TestCase):
+
+	def test_split_rows_at_widest_gaps(self):
+		text = (
+			"Zysk netto          2016          2015\n"
+			"Aktywa razem         120           100\n"
+			"Pasywa razem         300           200"
+		)
+		cols = split_text_into_columns(text)
+		self.assertEqual(len(cols), 3)
+		self.assertEqual([col.strip() for col in cols[1]], ["2016", "120", "300"])
+		self.assertEqual([col.strip() for col in cols[2]], ["2015", "100", "200"])
+
+	def test_empty_rows_are_skipped(self):
+		text = "Zysk         2016          2015\n\nStrata        120           100"
+		cols = split_text_into_columns(text)
+		self.assertEqual(len(cols[0]), 2)
+
+	def test_series_of_less_than_three_columns_is_not_a_break(self):
+		cols = split_text_into_columns("a  b  c\nd  e  f")
+		self.assertEqual(cols, [["a  b  c", "d  e  f"]])
+
+
+class ConvertToNumbersTest(unittest.TestCase):
+
+	def test_convert_cells_into_array_and_mask(self):
+		values, mask = convert_to_numbers(["1 234,5", "(3.140)", "-", "Nota"])
+		self.assertEqual(mask.tolist(), [True, True, True, False])
+		self.assertEqual(values[:3].tolist(), [1234.5, -3140, 0])
+		self.assertTrue(np.isnan(values[3]))
+
+	def test_convert_negative_numbers(self):
+		values, mask = convert_to_numbers(["-12", "(12)", "- 1 000"])
+		self.assertEqual(values.tolist(), [-12, -12, -1000])
+
+	def test_convert_rows_aligned_to_left(self):
+		values, mask = convert_rows_to_numbers([["Zysk", "12", "10"], ["5"], []])
+		self.assertEqual(values.shape, (3, 3))
+		self.assertEqual(
+			mask.tolist(), 
+			[[False, True, True], [True, False, False], [False, False, False]]
+		)
+		self.assertEqual(values[0, 1:].tolist(), [12, 10])
+
+	def test_convert_empty_table(self):
+		values, mask = convert_rows_to_numbers([])
+		self.assertEqual(values.shape, (0, 0))
+
+
 @unittest.skip
 class Convert2numberTest(unittest.TestCase):
 